@@ -3,8 +3,13 @@ import datetime
 import logging
 from importlib.metadata import version
 
+from .caching.geocode_cache import GeocodeCache
+from .caching.journey_cache import JourneyCache
+from .point_iterator.dead_zone_index import DeadZoneIndex
+from .point_iterator.service_area import load_service_area
 from .requesters.bvg_rest_requester import BVGRestRequester
 from .requesters.oeffi_requester import OeffiRequester
+from .requesters.raptor_requester import RaptorRequester
 from .settings import Settings
 
 settings = Settings()
@@ -18,14 +23,20 @@ BVG_V6_URL = "https://v6.bvg.transport.rest"
 VBB_V6_URL = "https://v6.vbb.transport.rest"
 BVG_V6_URL_LOCAL = f"http://{settings.bvg_api_container_name}:3000"
 
-REQUESTERS = [BVGRestRequester(url) for url in [BVG_V6_URL_LOCAL]]
-REQUESTERS = [requester for requester in REQUESTERS if requester.is_responding()]
+REQUESTER_URLS = [BVG_V6_URL_LOCAL] + ([BVG_V6_URL, VBB_V6_URL] if settings.use_public_requesters else [])
+REQUESTERS = [BVGRestRequester(url) for url in REQUESTER_URLS]
 
 AUTHKEY = ""
 if AUTHKEY != "":
     requester = OeffiRequester(AUTHKEY)
     REQUESTERS.append(requester)
+if settings.gtfs_path:
+    REQUESTERS.append(RaptorRequester(settings.gtfs_path))
 
+GEOCODE_CACHE = GeocodeCache(settings.geocode_cache_size, settings.geocode_cache_ttl, settings.geocode_cache_path)
+SERVICE_AREA = load_service_area(settings.service_area_path) if settings.service_area_path else None
+DEAD_ZONES = DeadZoneIndex(settings.dead_zone_radius)  # filled with destinations without stations on startup
+JOURNEY_CACHE = JourneyCache(settings.journey_cache_size, settings.journey_cache_ttl, settings.journey_cache_grid_size)
 
 TRAVELLING_DAYTIME = datetime.datetime.today().replace(hour=12, minute=0, second=0) + datetime.timedelta(days=1)
 while TRAVELLING_DAYTIME.weekday() != 0:
@@ -0,0 +1 @@
+"""This module contains the caches which spare requests to the requesters"""
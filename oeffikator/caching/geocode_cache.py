@@ -0,0 +1,125 @@
+"""This module includes the geocoding cache which is shared by all requesters."""
+import json
+import os
+import sqlite3
+import time
+
+from oeffikator.caching.ttl_cache import TTLCache
+
+
+class GeocodeCache:
+    """A cache for geocoded locations (address and coordinates) keyed on the normalized location description.
+    Locations are kept in an in-memory LRU cache. If a path is given, they are additionally persisted
+    in a local SQLite database, so they survive restarts and can be shared by several app replicas.
+
+    Attributes:
+        memory (TTLCache): the in-memory LRU cache
+        ttl (float): the time to live of a cached location (in seconds)
+        path (str): the path to the SQLite database, empty if locations are only cached in memory
+        disk_hits (int): the number of lookups which missed the memory but found the location on disk
+    """
+
+    def __init__(self, max_size: int, ttl: float, path: str = "") -> None:
+        """
+        Args:
+            max_size (int): the maximum number of locations held in memory
+            ttl (float): the time to live of a cached location (in seconds)
+            path (str): the path to the SQLite database, empty if locations should only be cached in memory
+        """
+        self.memory = TTLCache(max_size, ttl)
+        self.ttl = ttl
+        self.path = path
+        self.disk_hits = 0
+        self._connection: sqlite3.Connection | None = None
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Normalizes a location description, e.g. "  Alexanderplatz   1" and "alexanderplatz 1" are the same
+
+        Args:
+            query (str): the location description
+
+        Returns:
+            str: the normalized location description
+        """
+        return " ".join(query.lower().split())
+
+    def get(self, query: str) -> dict | None:
+        """Get the cached location for a location description
+
+        Args:
+            query (str): the location description
+
+        Returns:
+            dict | None: the location (with address, latitude and longitude) or None if not cached
+        """
+        key = self.normalize(query)
+        location = self.memory.get(key)
+        if location is None and self.path:
+            row = (
+                self._get_connection()
+                .execute("SELECT location, created_at FROM geocodes WHERE query = ?", (key,))
+                .fetchone()
+            )
+            if row is not None and time.time() - row[1] < self.ttl:
+                location = json.loads(row[0])
+                self.disk_hits += 1
+                self.memory.set(key, location, ttl=self.ttl - (time.time() - row[1]))
+        return location
+
+    def set(self, query: str, location: dict) -> None:
+        """Caches the location of a location description
+
+        Args:
+            query (str): the location description
+            location (dict): the location as returned by a requester (requires address, latitude and longitude)
+        """
+        key = self.normalize(query)
+        location = {
+            "address": location["address"],
+            "latitude": location["latitude"],
+            "longitude": location["longitude"],
+        }
+        self.memory.set(key, location)
+        if self.path:
+            with self._get_connection() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO geocodes (query, location, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(location), time.time()),
+                )
+
+    def get_statistics(self) -> dict:
+        """Get the statistics of the cache
+
+        Returns:
+            dict: the number of hits (in memory or on disk), misses and evictions from memory
+        """
+        statistics = self.memory.get_statistics()
+        statistics["hits"] += self.disk_hits
+        statistics["misses"] -= self.disk_hits
+        statistics["disk_hits"] = self.disk_hits
+        statistics["is_persistent"] = bool(self.path)
+        return statistics
+
+    def close(self) -> None:
+        """Closes the connection to the SQLite database (if opened)"""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Opens the connection to the SQLite database on first usage (and creates the table if needed)
+
+        Returns:
+            sqlite3.Connection: the connection
+        """
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")  # allows several app replicas to use the same file
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS geocodes (query TEXT PRIMARY KEY, location TEXT NOT NULL, created_at REAL)"
+            )
+        return self._connection
@@ -0,0 +1,230 @@
+"""This module includes the journey cache which deduplicates identical (also concurrent) journey requests."""
+import asyncio
+import datetime
+from typing import Awaitable, Callable
+
+from oeffikator.caching.ttl_cache import TTLCache
+
+
+class JourneyCache:
+    """A cache for journeys keyed on the origin, the destination snapped to a grid and the departure time.
+    Identical requests which are in flight at the same time are only sent once: all callers await the same
+    (shared) upstream request (singleflight).
+
+    Attributes:
+        memory (TTLCache): the in-memory LRU cache
+        grid_size (float): the size of the grid cells (in degree) the destinations are snapped to
+        deduplicated_requests (int): the number of requests which awaited an identical request in flight
+    """
+
+    def __init__(self, max_size: int, ttl: float, grid_size: float) -> None:
+        """
+        Args:
+            max_size (int): the maximum number of journeys held in memory
+            ttl (float): the time to live of a cached journey (in seconds)
+            grid_size (float): the size of the grid cells (in degree) the destinations are snapped to
+
+        Raises:
+            ValueError: if the grid size is not positive
+        """
+        if grid_size <= 0:
+            raise ValueError(f"The grid size needs to be positive. You provided: {grid_size}")
+        self.memory = TTLCache(max_size, ttl)
+        self.grid_size = grid_size
+        self.deduplicated_requests = 0
+        self._in_flight: dict[tuple, asyncio.Future] = {}
+
+    def get_key(self, origin: dict, destination: dict, start_date: datetime.datetime) -> tuple:
+        """Get the cache key of a journey
+
+        Args:
+            origin (dict): origin with longitude and latitude
+            destination (dict): destination with longitude and latitude (will be snapped to the grid)
+            start_date (datetime.datetime): the departure time
+
+        Returns:
+            tuple: the key
+        """
+        return (
+            round(float(origin["longitude"]), 6),
+            round(float(origin["latitude"]), 6),
+            round(float(destination["longitude"]) / self.grid_size),
+            round(float(destination["latitude"]) / self.grid_size),
+            start_date.isoformat(),
+        )
+
+    async def get_or_request(
+        self,
+        origin: dict,
+        destination: dict,
+        start_date: datetime.datetime,
+        request: Callable[[], Awaitable[dict]],
+    ) -> tuple[dict, bool]:
+        """Get the journey from the cache. If not cached, it is requested (once, even if called concurrently).
+
+        Args:
+            origin (dict): origin with longitude and latitude
+            destination (dict): destination with longitude and latitude
+            start_date (datetime.datetime): the departure time
+            request (Callable[[], Awaitable[dict]]): requests the journey if not cached
+
+        Returns:
+            tuple[dict, bool]: the journey and if it was taken from the cache (or a shared request)
+            instead of being requested for this call
+        """
+        key = self.get_key(origin, destination, start_date)
+        journey = self.memory.get(key)
+        if journey is not None:
+            return journey, True
+        if key in self._in_flight:
+            self.deduplicated_requests += 1
+            # shield the shared request, the cancellation of one caller should not cancel it for all
+            return await asyncio.shield(self._in_flight[key]), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            journey = await request()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            future.exception()  # mark as retrieved, otherwise asyncio complains if nobody else awaited it
+            raise
+        finally:
+            del self._in_flight[key]
+        self.memory.set(key, journey)
+        future.set_result(journey)
+        return journey, False
+
+    async def get_or_request_many(
+        self,
+        origin: dict,
+        destinations: list[dict],
+        start_date: datetime.datetime,
+        request_many: Callable[[list[dict]], Awaitable[list[dict | Exception]]],
+    ) -> list[tuple[dict | Exception, bool]]:
+        """Get the journeys to several destinations from the cache. The journeys which are neither cached nor
+        in flight are requested with a single (bulk) request. Destinations sharing a key are requested only once.
+
+        Args:
+            origin (dict): origin with longitude and latitude
+            destinations (list[dict]): destinations with longitude and latitude
+            start_date (datetime.datetime): the departure time
+            request_many (Callable[[list[dict]], Awaitable[list[dict | Exception]]]): requests the journeys
+            to the given destinations, returning the error instead of a journey if a single journey failed
+
+        Returns:
+            list[tuple[dict | Exception, bool]]: per destination, the journey (or the error of its request) and
+            if it was taken from the cache (or a shared request) instead of being requested for this call
+        """
+        keys = [self.get_key(origin, destination, start_date) for destination in destinations]
+        results, shared_requests, missing_destinations = self._split_by_availability(keys, destinations)
+
+        results.update(await self._request_missing(missing_destinations, request_many))
+        for key, future in shared_requests.items():
+            try:
+                results[key] = (await asyncio.shield(future), True)
+            except Exception as error:  # pylint: disable=W0718
+                results[key] = (error, True)
+
+        journeys = []
+        requested_keys = set()
+        for key in keys:  # destinations sharing a key with a previous one are considered cached
+            journeys.append((results[key][0], results[key][1] or key in requested_keys))
+            requested_keys.add(key)
+        return journeys
+
+    async def _request_missing(
+        self,
+        missing_destinations: dict[tuple, dict],
+        request_many: Callable[[list[dict]], Awaitable[list[dict | Exception]]],
+    ) -> dict[tuple, tuple[dict | Exception, bool]]:
+        """Requests the missing journeys at once and registers them as in flight meanwhile
+
+        Args:
+            missing_destinations (dict[tuple, dict]): the missing destinations per key
+            request_many (Callable[[list[dict]], Awaitable[list[dict | Exception]]]): requests the journeys
+
+        Raises:
+            ValueError: if the number of requested journeys does not match the number of destinations
+
+        Returns:
+            dict[tuple, tuple[dict | Exception, bool]]: the journey (or the error of its request) per key
+        """
+        if not missing_destinations:
+            return {}
+        loop = asyncio.get_running_loop()
+        futures = {key: loop.create_future() for key in missing_destinations}
+        self._in_flight.update(futures)
+        try:
+            journeys = await request_many(list(missing_destinations.values()))
+            if len(journeys) != len(futures):  # the journeys could not be assigned to their destinations
+                raise ValueError(f"{len(journeys)} journeys were returned for {len(futures)} destinations.")
+        except asyncio.CancelledError:
+            for future in futures.values():
+                future.cancel()
+            raise
+        except Exception as error:
+            for future in futures.values():
+                future.set_exception(error)
+                future.exception()  # mark as retrieved, otherwise asyncio complains if nobody else awaited it
+            raise
+        finally:
+            for key in futures:
+                del self._in_flight[key]
+        results = {}
+        for (key, future), journey in zip(futures.items(), journeys):
+            if isinstance(journey, Exception):
+                future.set_exception(journey)
+                future.exception()
+            else:
+                self.memory.set(key, journey)
+                future.set_result(journey)
+            results[key] = (journey, False)
+        return results
+
+    def _split_by_availability(
+        self, keys: list[tuple], destinations: list[dict]
+    ) -> tuple[dict[tuple, tuple[dict, bool]], dict[tuple, asyncio.Future], dict[tuple, dict]]:
+        """Splits the destinations (by their keys) into cached ones, ones in flight and missing ones.
+        Keys occurring several times are only considered once.
+
+        Args:
+            keys (list[tuple]): the keys of the destinations
+            destinations (list[dict]): the destinations
+
+        Returns:
+            tuple[dict[tuple, tuple[dict, bool]], dict[tuple, asyncio.Future], dict[tuple, dict]]: the cached
+            journeys, the requests in flight and the missing destinations (each per key)
+        """
+        cached_journeys: dict[tuple, tuple[dict, bool]] = {}
+        shared_requests: dict[tuple, asyncio.Future] = {}
+        missing_destinations: dict[tuple, dict] = {}
+        for key, destination in zip(keys, destinations):
+            if key in cached_journeys or key in shared_requests or key in missing_destinations:
+                self.deduplicated_requests += 1
+                continue
+            journey = self.memory.get(key)
+            if journey is not None:
+                cached_journeys[key] = (journey, True)
+            elif key in self._in_flight:
+                self.deduplicated_requests += 1
+                shared_requests[key] = self._in_flight[key]
+            else:
+                missing_destinations[key] = destination
+        return cached_journeys, shared_requests, missing_destinations
+
+    def get_statistics(self) -> dict:
+        """Get the statistics of the cache
+
+        Returns:
+            dict: the number of hits, misses, evictions as well as the number of requests in flight
+            and deduplicated requests
+        """
+        return {
+            **self.memory.get_statistics(),
+            "in_flight": len(self._in_flight),
+            "deduplicated_requests": self.deduplicated_requests,
+        }
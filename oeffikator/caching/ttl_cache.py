@@ -0,0 +1,92 @@
+"""This module includes an in-memory LRU cache whose entries expire after a time to live."""
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class TTLCache:
+    """An in-memory least recently used (LRU) cache. Entries expire after the time to live (ttl).
+    If the cache is full, the least recently used entry is evicted.
+
+    Attributes:
+        max_size (int): the maximum number of entries
+        ttl (float): the time to live of an entry (in seconds)
+        hits (int): the number of lookups which found a valid entry
+        misses (int): the number of lookups which did not find a valid entry
+        evictions (int): the number of entries which were evicted because the cache was full
+        expirations (int): the number of entries which were removed because they expired
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        """
+        Args:
+            max_size (int): the maximum number of entries
+            ttl (float): the time to live of an entry (in seconds)
+
+        Raises:
+            ValueError: if the maximum size is lower than 1 or the time to live is not positive
+        """
+        if max_size < 1:
+            raise ValueError(f"The cache needs to hold at least one entry. You provided: {max_size}")
+        if ttl <= 0:
+            raise ValueError(f"The time to live needs to be positive. You provided: {ttl}")
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any | None:
+        """Get the entry for a key (and mark it as recently used)
+
+        Args:
+            key (Hashable): the key of the entry
+
+        Returns:
+            Any | None: the cached value, None if it is not cached (anymore)
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None) -> None:
+        """Caches a value. Evicts the least recently used entry if the cache is full.
+
+        Args:
+            key (Hashable): the key of the entry
+            value (Any): the value to cache
+            ttl (float | None): the time to live of this entry (in seconds), defaults to the cache's one
+        """
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_statistics(self) -> dict:
+        """Get the statistics of the cache
+
+        Returns:
+            dict: the size of the cache and the number of hits, misses, evictions and expirations
+        """
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
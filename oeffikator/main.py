@@ -1,24 +1,65 @@
 """Main module of the oeffikator app, providing the actual FastAPI / Uvicorn app."""
-import asyncio
+import io
+from collections import defaultdict
+from contextlib import asynccontextmanager
 
 import numpy as np
 from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, Response
-from shapely import from_wkt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from oeffikator.point_iterator.error_driven_point_iterator import ErrorDrivenPointIterator
 from oeffikator.point_iterator.grid_point_iterator import GridPointIterator
-from oeffikator.point_iterator.triangular_iterator_interface import TriangularPointIterator
-from oeffikator.requests import request_location, request_trip
+from oeffikator.point_iterator.point_iterator_interface import PointIteratorInterface
+from oeffikator.requesters.circuit_breaker import RequesterUnavailableError
+from oeffikator.requests import (
+    get_request_capacity,
+    request_location,
+    request_reachable_stops,
+    request_trip,
+    request_trips,
+)
+
+from . import DEAD_ZONES, GEOCODE_CACHE, JOURNEY_CACHE, REQUESTERS, SERVICE_AREA, __version__, logger, settings
+from .sql_app import COORDINATE_DECIMALS, crud, models, schemas
+from .sql_app.database import SessionLocal, engine, get_db
+from .sql_app.migrations import run_migrations
+
+REQUESTS_PER_SAMPLED_POINT = 1  # requesting the journey (the destination is not geocoded)
+CANDIDATES_PER_DESTINATION = 10  # points sampled per new destination at most (known ones and dead zones are skipped)
+MAXIMUM_EMPTY_BATCHES = 10  # consecutive batches without new destinations, until the sampling of an origin stops
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """Creates (or migrates) the database tables, loads the dead zones and opens the pooled sessions of the requesters
+    on startup. Closes them (as well as the caches and the database connections) on shutdown.
+
+    Args:
+        _ (FastAPI): the app
+    """
+    async with engine.begin() as connection:
+        await connection.run_sync(models.Base.metadata.create_all)
+        await run_migrations(connection)
+    async with SessionLocal() as database:
+        DEAD_ZONES.add(await crud.get_invalid_destinations(database))
+    for requester in REQUESTERS:
+        await requester.open_session(
+            connection_limit=settings.connection_limit,
+            connection_limit_per_host=settings.connection_limit_per_host,
+            dns_cache_ttl=settings.dns_cache_ttl,
+        )
+    yield
+    for requester in REQUESTERS:
+        await requester.close_session()
+    GEOCODE_CACHE.close()
+    await engine.dispose()
 
-from . import __version__, logger, settings
-from .sql_app import crud, models, schemas
-from .sql_app.database import engine, get_db
 
-models.Base.metadata.create_all(bind=engine)
 # create App
 app = FastAPI(
     title="Oeffikator",
     version=__version__,
+    lifespan=lifespan,
 )
 
 
@@ -37,7 +78,6 @@ def requests_trips(
     origin_description: str,
     background_tasks: BackgroundTasks,
     number_of_trips: int = 1,
-    database: Session = Depends(get_db),
 ) -> dict:
     """Creates background task for the requesting of trips
 
@@ -49,13 +89,14 @@ def requests_trips(
         a list of trips with information on the duration, origin and destination
     """
     logger.info("Here")
-    background_tasks.add_task(get_trips, origin_description, number_of_trips, database)
+    background_tasks.add_task(get_trips, origin_description, number_of_trips)
     logger.info("there")
     return {"message": "Trips requested in the background"}
 
 
-async def get_trips(origin_description: str, number_of_trips: int, database: Session):
-    """Requests the creation of a number of trips for a given location
+async def get_trips(origin_description: str, number_of_trips: int):
+    """Requests the creation of a number of trips for a given location.
+    It runs in the background, thus it uses its own database session (and not the one of the request).
 
     Args:
         origin_description (str): description of the location
@@ -64,67 +105,227 @@ async def get_trips(origin_description: str, number_of_trips: int, database: Ses
     Returns:
         a list of trips with information on the duration, origin and destination
     """
+    async with SessionLocal() as database:
+        await _get_trips(origin_description, number_of_trips, database)
+
+
+async def _get_trips(origin_description: str, number_of_trips: int, database: AsyncSession):
+    """Requests the creation of a number of trips for a given location (see `get_trips`)
+
+    Args:
+        origin_description (str): description of the location
+        number_of_trips (int): number of requested trips
+        database (AsyncSession): database
+    """
     origin = await get_location(origin_description, database)
-    known_trips = get_all_trips(origin.id, has_invalid_trips=True, database=database)
-    if len(known_trips) < 9:
-        iterator = GridPointIterator(
-            (
-                settings.max_west,
-                settings.max_east,
-                settings.max_south,
-                settings.max_north,
-            ),
-            points_per_axis=3,
+    known_trips = await crud.get_all_trips(database, origin.id, has_invalid_trips=True)
+    new_trips = []
+    if not known_trips and any(requester.supports_reachable_stops for requester in REQUESTERS):
+        new_trips = await seed_trips_with_reachable_stops(origin, database)
+        known_trips = await crud.get_all_trips(database, origin.id, has_invalid_trips=True)
+    known_coordinates = [(trip.destination_longitude, trip.destination_latitude) for trip in known_trips]
+    known_destinations = {
+        (round(longitude, COORDINATE_DECIMALS), round(latitude, COORDINATE_DECIMALS))
+        for longitude, latitude in known_coordinates
+    }
+    iterator = GridPointIterator(
+        (
+            settings.max_west,
+            settings.max_east,
+            settings.max_south,
+            settings.max_north,
+        ),
+        points_per_axis=3,
+        service_area=SERVICE_AREA,
+    )
+    # the grid points outside the service area or within dead zones are skipped, the triangles need at least 3 points
+    if len(known_trips) >= max(3, len(iterator.points) - np.sum(DEAD_ZONES.contains(iterator.points))):
+        iterator = ErrorDrivenPointIterator(
+            np.array(known_coordinates),
+            # invalid trips have no duration to interpolate
+            np.array([trip.duration if trip.duration >= 0 else np.nan for trip in known_trips]),
+            SERVICE_AREA,
+            DEAD_ZONES,
         )
-    else:
-        iterator = TriangularPointIterator(
-            np.array(
+    empty_batches = 0
+    while len(new_trips) < number_of_trips and iterator.has_points_remaining():
+        # size the batch according to the requests the requesters can handle right now (but at least one point)
+        batch_size = min(number_of_trips - len(new_trips), max(1, get_request_capacity() // REQUESTS_PER_SAMPLED_POINT))
+        destination_coordinates = get_new_destinations(iterator, known_destinations, batch_size)
+        if not destination_coordinates:
+            # all candidates of the batch were known or within dead zones (e.g. a lake), the next ones may not be
+            empty_batches += 1
+            if empty_batches >= MAXIMUM_EMPTY_BATCHES:
+                logger.info("No new destinations left to sample (outside of dead zones).")
+                break
+            continue
+        empty_batches = 0
+        logger.info("Computing %d new trips", len(destination_coordinates))
+        try:
+            trips = await get_trips_from_coordinates(origin, destination_coordinates, database)
+        except RequesterUnavailableError as error:
+            logger.warning("All trips of the batch failed. Stopping to request trips: %s", error)
+            break
+        new_trips += [trip for trip in trips.values() if trip.duration >= 0]
+        # the missing station may be the one close to the origin instead, unless the origin reaches any destination
+        if new_trips or any(trip.duration >= 0 for trip in known_trips):
+            # the dead zones are added first, so the triangles at the new points are prioritized with them
+            DEAD_ZONES.add(
                 [
-                    [float(from_wkt(trip.destination.geom).x), float(from_wkt(trip.destination.geom).y)]
-                    for trip in known_trips
-                ],
+                    coordinates
+                    for coordinates, trip in trips.items()
+                    if trip.invalid_reason == schemas.InvalidReason.NO_STATION_NEARBY.value
+                ]
             )
-        )
-    new_trips = []
-    while len(new_trips) < number_of_trips and iterator.has_points_remaining():
-        tasks = []
-        while iterator.has_points_remaining() and len(tasks) + len(new_trips) < number_of_trips:
-            destination_coordiantes = next(iterator)
-            tasks.append(
-                asyncio.ensure_future(get_trip_from_coordinates(origin, known_trips, destination_coordiantes, database))
+        if isinstance(iterator, ErrorDrivenPointIterator):
+            durations = {coordinates: trip.duration for coordinates, trip in trips.items() if trip.duration >= 0}
+            iterator.set_durations(
+                destination_coordinates, [durations.get(coordinates, np.nan) for coordinates in destination_coordinates]
             )
-        tmp_trips = await asyncio.gather(*tasks)
-        new_trips += [trip for trip in tmp_trips if trip is not None and trip.duration >= 0]
 
 
-async def get_trip_from_coordinates(
-    origin: schemas.Location, known_trips: list[schemas.Trip], destination_coordiantes: np.ndarray, database: Session
-) -> schemas.Trip | None:
-    """Get the trip only given the coordinates of the destination
+def get_new_destinations(
+    iterator: PointIteratorInterface, known_destinations: set[tuple[float, float]], number_of_destinations: int
+) -> list[tuple[float, float]]:
+    """Gets the next destinations of the iterator which are not known yet (and registers them as known).
+    Points within dead zones are skipped before requesting them. The iterator samples at most
+    `CANDIDATES_PER_DESTINATION` points per destination, so fewer destinations may be returned.
+
+    Args:
+        iterator (PointIteratorInterface): the iterator sampling the destinations
+        known_destinations (set[tuple[float, float]]): (rounded) coordinates of the already known destinations
+        number_of_destinations (int): the maximum number of destinations
+
+    Returns:
+        list[tuple[float, float]]: longitude and latitude of the new destinations
+    """
+    destination_coordinates = []
+    remaining_candidates = CANDIDATES_PER_DESTINATION * number_of_destinations
+    while (
+        iterator.has_points_remaining()
+        and remaining_candidates > 0
+        and len(destination_coordinates) < number_of_destinations
+    ):
+        # the points of a batch are spread jointly by the iterator
+        points = iterator.next_batch(min(number_of_destinations - len(destination_coordinates), remaining_candidates))
+        if points.size == 0:
+            break
+        remaining_candidates -= len(points)
+        for (longitude, latitude), is_in_dead_zone in zip(points.tolist(), DEAD_ZONES.contains(points)):
+            destination_key = (round(longitude, COORDINATE_DECIMALS), round(latitude, COORDINATE_DECIMALS))
+            if destination_key not in known_destinations and not is_in_dead_zone:
+                known_destinations.add(destination_key)
+                destination_coordinates.append((longitude, latitude))
+    return destination_coordinates
+
+
+async def seed_trips_with_reachable_stops(origin: schemas.Location, database: AsyncSession) -> list[schemas.Trip]:
+    """Seeds a new origin with trips to all stops reachable from it (within the maximum duration)
+    using a single request. If this fails, the origin is sampled point by point as usual.
+
+    Args:
+        origin (schemas.Location): origin of the trips
+        database (AsyncSession): database
+
+    Returns:
+        list[schemas.Trip]: the created trips (empty if the reachable stops could not be requested)
+    """
+    logger.info("Seeding origin %d with reachable stops", origin.id)
+    try:
+        reachable_stops, request_id = await request_reachable_stops(origin, database)
+    except (RequesterUnavailableError, NotImplementedError, ValueError) as error:
+        logger.warning("Could not request reachable stops: %s", error)
+        return []
+    return await save_stop_trips(database, origin, {request_id: reachable_stops}, schemas.TripSource.REACHABLE)
+
+
+async def get_trips_from_coordinates(
+    origin: schemas.Location, destination_coordinates: list[tuple[float, float]], database: AsyncSession
+) -> dict[tuple[float, float], schemas.Trip]:
+    """Get the trips to several destinations only given their coordinates, requested in bulk.
+    The destinations are stored as locations with their coordinates only (without geocoding them).
+    Their addresses can be resolved later, if needed.
+    The requests, trips and stops on the way of the whole batch are saved within a single transaction.
 
     Args:
-        origin (schemas.Location): origin of the trip
-        known_trips (list[schemas.Trip]): already known trips
-        destination_coordiantes (np.ndarray): coordinates of the destination
-        database (Session): database
+        origin (schemas.Location): origin of the trips
+        destination_coordinates (list[tuple[float, float]]): longitude and latitude of the destinations
+        database (AsyncSession): database
+
+    Raises:
+        RequesterUnavailableError: if all trips failed
 
     Returns:
-        schemas.Trip | None: _description_
+        dict[tuple[float, float], schemas.Trip]: the created trips per coordinates of the destination
+        (without the ones which failed)
     """
-    logger.info(
-        "Computing new trip for destination coordinates %f, %f",
-        destination_coordiantes[0],
-        destination_coordiantes[1],
+    destinations = await get_or_create_locations(
+        database, {coordinates: None for coordinates in destination_coordinates}
     )
+    requested_trips = await request_trips(origin, list(destinations.values()), database)
+    failed_trips = [trip for trip in requested_trips if isinstance(trip, Exception)]
+    for error in failed_trips:
+        logger.warning("Could not compute trip: %s", error)
+    if failed_trips and len(failed_trips) == len(requested_trips):
+        raise RequesterUnavailableError(f"All {len(failed_trips)} trips failed.")
+    requested_trips = [trip for trip in requested_trips if not isinstance(trip, Exception)]
+    trips = await crud.create_trips(database, requested_trips, commit=False)
+    stopovers = defaultdict(list)
+    for requested_trip in requested_trips:
+        stopovers[requested_trip.request_id] += requested_trip.stopovers
+    await save_stop_trips(database, origin, stopovers, schemas.TripSource.STOPOVER)
+    trips_per_destination = {trip.destination_id: trip for trip in trips}
+    return {
+        coordinates: trips_per_destination[location.id]
+        for coordinates, location in destinations.items()
+        if location.id in trips_per_destination
+    }
+
+
+async def get_or_create_locations(
+    database: AsyncSession, names: dict[tuple[float, float], str | None], commit: bool = True
+) -> dict[tuple[float, float], models.Location]:
+    """Gets the locations at the given coordinates. Locations which are not known yet are created
+    (all at once, without geocoding them). Their (stop) names are not used as addresses,
+    since stops sharing a name would be merged into one location otherwise.
 
-    destination = await get_location(f"{destination_coordiantes[0]} {destination_coordiantes[1]}", database)
+    Args:
+        database (AsyncSession): database
+        names (dict[tuple[float, float], str | None]): the (optional) stop name per coordinates of a location
+        commit (bool): if the created locations shall be committed (otherwise the caller commits them)
 
-    if destination.geom not in [trip.destination.geom for trip in known_trips]:
-        return await get_trip(origin.id, destination.id, database)
+    Returns:
+        dict[tuple[float, float], models.Location]: the location per coordinates (in the order of the names)
+    """
+    known_locations = {
+        (round(location.lon, COORDINATE_DECIMALS), round(location.lat, COORDINATE_DECIMALS)): location
+        for location in await crud.get_locations_by_coordinates(database, list(names))
+    }
+    new_coordinates = [
+        (longitude, latitude)
+        for longitude, latitude in names
+        if (round(longitude, COORDINATE_DECIMALS), round(latitude, COORDINATE_DECIMALS)) not in known_locations
+    ]
+    new_locations = await crud.create_locations(
+        database,
+        [
+            schemas.LocationCreate(name=names[coordinates], geom=f"POINT({coordinates[0]} {coordinates[1]})")
+            for coordinates in new_coordinates
+        ],
+        commit=commit,
+    )
+    for (longitude, latitude), location in zip(new_coordinates, new_locations):
+        known_locations[(round(longitude, COORDINATE_DECIMALS), round(latitude, COORDINATE_DECIMALS))] = location
+    return {
+        (longitude, latitude): known_locations[
+            (round(longitude, COORDINATE_DECIMALS), round(latitude, COORDINATE_DECIMALS))
+        ]
+        for longitude, latitude in names
+    }
 
 
 @app.get("/location/{location_description}", response_model=schemas.Location | None)
-async def get_location(location_description: str, database: Session = Depends(get_db)) -> schemas.Location:
+async def get_location(location_description: str, database: AsyncSession = Depends(get_db)) -> schemas.Location:
     """Get location for given description. If not known yet, a location will be created.
 
     Args:
@@ -135,22 +336,19 @@ async def get_location(location_description: str, database: Session = Depends(ge
     """
     location_description = location_description.lower()
     logger.info("Using origin with following description: %s", location_description)
-    db_location = crud.get_location_by_alias(database, location_description)
+    db_location = await crud.get_location_by_alias(database, location_description)
 
     if db_location is None:
         logger.info("Location description not known")
-        location = await request_location(location_description, database)
-        db_location = crud.get_location_by_address(database, location.address)
-
-        if db_location is None:
-            logger.info("Address of Location not known")
-            logger.info("Saving address")
-            db_location = crud.create_location(database, location)
-        else:
-            logger.info("Address of Location is already known. No location created.")
-
-        logger.info("Saving alias")
-        crud.create_alias(database, schemas.LocationAliasCreate(address_alias=location_description), db_location.id)
+        try:
+            location = await request_location(location_description, database)
+        except RequesterUnavailableError as error:
+            raise HTTPException(status_code=503, detail=f"The location could not be requested: {error}") from error
+        logger.info("Saving address and alias (an existing location with the same address is reused)")
+        db_location = await crud.create_location(database, location, commit=False)  # committed with the alias
+        await crud.create_alias(
+            database, schemas.LocationAliasCreate(address_alias=location_description), db_location.id
+        )
     else:
         logger.info("Location description is already known. No location created.")
 
@@ -160,8 +358,34 @@ async def get_location(location_description: str, database: Session = Depends(ge
     return db_location
 
 
+@app.get("/address/{location_id}", response_model=schemas.Location)
+async def get_address(location_id: int, database: AsyncSession = Depends(get_db)) -> schemas.Location:
+    """Get the location including its address. Locations which were created from coordinates only
+    (e.g. sampled destinations) are geocoded the first time their address is asked for.
+
+    Args:
+        location_id (int): id of the location
+
+    Returns:
+        Location information like address of coordinates
+    """
+    location = await crud.get_location_by_id(database, location_id)
+    if location is None:
+        raise HTTPException(status_code=422, detail=f"The location id ({location_id}) is not known")
+    if location.address is None:
+        logger.info("Resolving address of location %d", location_id)
+        try:
+            requested_location = await request_location(f"{location.lon} {location.lat}", database)
+        except RequesterUnavailableError as error:
+            raise HTTPException(status_code=503, detail=f"The address could not be requested: {error}") from error
+        location = await crud.update_location_address(database, location, requested_location.address)
+    return location
+
+
 @app.get("/trip/{origin_id}/{destination_id}", response_model=schemas.Trip | None)
-async def get_trip(origin_id: int, destination_id: int, database: Session = Depends(get_db)) -> schemas.Trip | None:
+async def get_trip(
+    origin_id: int, destination_id: int, database: AsyncSession = Depends(get_db)
+) -> schemas.Trip | None:
     """Get trip duration for a trip from the origin to the destination
 
     Args:
@@ -171,10 +395,10 @@ async def get_trip(origin_id: int, destination_id: int, database: Session = Depe
     Returns:
         a trip with information on the duration, origin and destination
     """
-    origin = crud.get_location_by_id(database, origin_id)
+    origin = await crud.get_location_by_id(database, origin_id)
     if origin is None:
         raise HTTPException(status_code=422, detail=f"The location id of the origin ({origin_id}) is not known")
-    destination = crud.get_location_by_id(database, destination_id)
+    destination = await crud.get_location_by_id(database, destination_id)
     if destination is None:
         raise HTTPException(
             status_code=422, detail=f"The location id of the destination ({destination_id}) is not known"
@@ -184,26 +408,84 @@ async def get_trip(origin_id: int, destination_id: int, database: Session = Depe
     logger.info("  - Destination: %s", destination.address)
 
     logger.info("Checking if trip exists in database")
-    trip = crud.get_trip(database, origin_id, destination_id)
+    trip = await crud.get_trip(database, origin_id, destination_id)
     if trip is not None:
         logger.info("Trip already in database")
     else:
         logger.info("Requesting trip time computation")
-        requested_trip = await request_trip(origin, destination, database)
+        try:
+            requested_trip = await request_trip(origin, destination, database)
+        except RequesterUnavailableError as error:
+            raise HTTPException(status_code=503, detail=f"The trip could not be requested: {error}") from error
         if requested_trip.duration == -1:
             logger.info("Trip is not available")
         else:
             logger.info("Creating trip")
-        trip = crud.create_trip(database, requested_trip)
+        trip = await crud.create_trip(database, requested_trip, commit=False)  # committed with the stops
+        await save_stop_trips(
+            database, origin, {requested_trip.request_id: requested_trip.stopovers}, schemas.TripSource.STOPOVER
+        )
 
     return trip
 
 
-@app.get("/all_trips/{origin_id}", response_model=list[schemas.Trip])
-def get_all_trips(
-    origin_id: int, has_invalid_trips: bool = False, database: Session = Depends(get_db)
+async def save_stop_trips(
+    database: AsyncSession,
+    origin: schemas.Location,
+    stopovers: dict[int | None, list[schemas.StopoverCreate]],
+    source: schemas.TripSource,
 ) -> list[schemas.Trip]:
-    """Get all trip durations for an origin
+    """Saves stops with known durations (e.g. the stops on the way of a journey) as additional trips
+    from the origin (without further requests). Stops which already have a trip from the origin
+    (or are the origin itself) are skipped. The trips (and everything added to the session before)
+    are committed at once.
+
+    Args:
+        database (AsyncSession): database
+        origin (schemas.Location): origin of the trips
+        stopovers (dict[int | None, list[schemas.StopoverCreate]]): the stops with their duration
+        per id of the request which returned them
+        source (schemas.TripSource): the provenance of the stops
+
+    Returns:
+        list[schemas.Trip]: the created trips
+    """
+    unique_stopovers = {}
+    for request_id, request_stopovers in stopovers.items():
+        for stopover in request_stopovers:
+            key = (round(stopover.longitude, COORDINATE_DECIMALS), round(stopover.latitude, COORDINATE_DECIMALS))
+            if key not in unique_stopovers or stopover.duration < unique_stopovers[key][0].duration:
+                unique_stopovers[key] = (stopover, request_id)
+    if not unique_stopovers:
+        await database.commit()
+        return []
+
+    locations = await get_or_create_locations(
+        database, {coordinates: stopover.name for coordinates, (stopover, _) in unique_stopovers.items()}, commit=False
+    )
+
+    known_destination_ids = (await crud.get_destination_ids(database, origin.id)) | {origin.id}
+    trips = [
+        schemas.TripCreate(
+            duration=stopover.duration,
+            origin=origin,
+            destination=locations[key],
+            request_id=request_id,
+            source=source,
+        )
+        for key, (stopover, request_id) in unique_stopovers.items()
+        if locations[key].id not in known_destination_ids
+    ]
+    logger.info("Saving %d stops (%s) as additional trips", len(trips), source.value)
+    return await crud.create_trips(database, trips)
+
+
+@app.get("/all_trips/{origin_id}", response_model=list[schemas.Trip])
+async def get_all_trips(
+    origin_id: int, has_invalid_trips: bool = False, database: AsyncSession = Depends(get_db)
+) -> list[dict]:
+    """Get all trip durations for an origin. The trips are built from plain rows (see `crud.get_all_trips`),
+    the origin is converted only once for all of them.
 
     Args:
         origin_id (int): location id of the origin
@@ -212,7 +494,7 @@ def get_all_trips(
     Returns:
         a list of trips with information on the duration, origin and destination
     """
-    origin = crud.get_location_by_id(database, origin_id)
+    origin = await crud.get_location_by_id(database, origin_id)
     if origin is None:
         raise HTTPException(status_code=422, detail=f"The location id of the origin ({origin_id}) is not known")
 
@@ -220,16 +502,98 @@ def get_all_trips(
     logger.info("  - Origin:      %s", origin.address)
 
     logger.info("Getting all known trips")
-    trips = crud.get_all_trips(database, origin_id, has_invalid_trips)
+    trips = await crud.get_all_trips(database, origin_id, has_invalid_trips)
+
+    origin_dict = schemas.Location.model_validate(origin).model_dump()
+    return [
+        {
+            "id": trip.id,
+            "duration": trip.duration,
+            "request_id": trip.request_id,
+            "source": trip.source,
+            "invalid_reason": trip.invalid_reason,
+            "origin": origin_dict,
+            "destination": {
+                "id": trip.destination_id,
+                "address": trip.destination_address,
+                "name": trip.destination_name,
+                "request_id": trip.destination_request_id,
+                "geom": f"POINT ({trip.destination_longitude} {trip.destination_latitude})",
+                "lon": trip.destination_longitude,
+                "lat": trip.destination_latitude,
+            },
+        }
+        for trip in trips
+    ]
+
+
+@app.get(
+    "/all_trips/{origin_id}/npz",
+    response_class=Response,
+    responses={200: {"content": {"application/octet-stream": {}}, "description": "the trips as .npz archive"}},
+)
+async def get_all_trips_npz(
+    origin_id: int, has_invalid_trips: bool = False, database: AsyncSession = Depends(get_db)
+) -> Response:
+    """Get all trip durations for an origin as columnar (NumPy .npz) archive, which is much smaller and faster
+    to load than the JSON trips. It can be loaded with `numpy.load`.
 
-    return trips
+    Args:
+        origin_id (int): location id of the origin
+        has_invalid_trips (bool): if trips which we are not able to compute trips to shall be returned too
+                                  the duration of these trips is set to -1
+    Returns:
+        Response: the archive with the arrays origin (longitude and latitude, float32), destination_id (int32),
+        longitude and latitude (of the destinations, float32) and duration (in minutes, int16)
+    """
+    origin = await crud.get_location_by_id(database, origin_id)
+    if origin is None:
+        raise HTTPException(status_code=422, detail=f"The location id of the origin ({origin_id}) is not known")
+
+    logger.info("Getting all known trips of origin %d as columns", origin_id)
+    trips = await crud.get_all_trips(database, origin_id, has_invalid_trips)
+
+    buffer = io.BytesIO()
+    np.savez(
+        buffer,
+        origin=np.array([origin.lon, origin.lat], dtype=np.float32),
+        destination_id=np.array([trip.destination_id for trip in trips], dtype=np.int32),
+        longitude=np.array([trip.destination_longitude for trip in trips], dtype=np.float32),
+        latitude=np.array([trip.destination_latitude for trip in trips], dtype=np.float32),
+        duration=np.array([trip.duration for trip in trips], dtype=np.int16),
+    )
+    return Response(
+        content=buffer.getvalue(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="trips_{origin_id}.npz"'},
+    )
+
+
+@app.get("/requester-stats/", status_code=200)
+def get_requester_statistics() -> Response:
+    """Get the load balancing statistics of all requesters (request capacity, requests in flight, latency, errors)
+
+    Returns:
+        Response: the statistics for each requester
+    """
+    return {"requesters": [requester.get_statistics() for requester in REQUESTERS]}
+
+
+@app.get("/cache-stats/", status_code=200)
+def get_cache_statistics() -> Response:
+    """Get the statistics of the caches which spare requests (hits, misses, evictions, ...)
+
+    Returns:
+        Response: the statistics for each cache
+    """
+    return {"geocode": GEOCODE_CACHE.get_statistics(), "journey": JOURNEY_CACHE.get_statistics()}
 
 
 @app.get("/total-requests/", status_code=200)
-def get_total_number_of_requests(database: Session = Depends(get_db)) -> Response:
+async def get_total_number_of_requests(database: AsyncSession = Depends(get_db)) -> Response:
     """Check how many requests where made up to this point
 
     Returns:
         Response: the response to the alive statement with current version
     """
-    return {"number_of_total_requests": crud.get_number_of_total_requests(database)}
+    return {"number_of_total_requests": await crud.get_number_of_total_requests(database)}
@@ -0,0 +1,8 @@
+"""This module contains the point iterators and their constants"""
+
+INITIAL_POINT_CAPACITY = 1024  # the number of points the buffer of the triangular point iterator starts with
+# the number of skipped (neighbouring) triangles per point of a batch, until the triangular point iterator stops
+# looking for triangles without shared points (and continues after inserting the points found so far)
+SKIPPED_TRIANGLES_PER_BATCH_POINT = 3
+# added to the duration variance (in minutes²) of a triangle, so triangles with equal durations are refined by area
+MINIMUM_DURATION_VARIANCE = 1.0
@@ -0,0 +1,74 @@
+"""This module contains the dead zone index. Dead zones are the surroundings of destinations which could not be
+reached since no station is nearby, sampling points there would most likely fail again."""
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class DeadZoneIndex:
+    """A spatial index (KD-tree) of the destinations without a station nearby (of all origins).
+    A point is within a dead zone if such a destination is within the radius around it.
+    A degree of longitude is shorter than one of latitude (by the cosine of the latitude), so the longitudes
+    are scaled accordingly to keep the dead zones circular. The tree is rebuilt lazily, once new destinations
+    were added and the index is queried.
+
+    Attributes:
+        radius (float): the radius (in degree of latitude) of a dead zone around an invalid destination
+    """
+
+    def __init__(self, radius: float) -> None:
+        """
+        Args:
+            radius (float): the radius (in degree of latitude) of a dead zone around an invalid destination
+
+        Raises:
+            ValueError: if the radius is negative
+        """
+        if radius < 0:
+            raise ValueError(f"The radius must not be negative. You provided: {radius}")
+        self.radius = radius
+        self._destinations = np.empty((0, 2))
+        self._tree: cKDTree | None = None
+
+    def __len__(self) -> int:
+        return len(self._destinations)
+
+    def add(self, destinations: np.ndarray) -> None:
+        """Adds destinations of invalid trips
+
+        Args:
+            destinations (np.ndarray): longitude and latitude of the destinations, shape (n, 2)
+        """
+        destinations = np.array(destinations, dtype=float).reshape(-1, 2)
+        if len(destinations):
+            self._destinations = np.concatenate([self._destinations, destinations])
+            self._tree = None
+
+    def contains(self, points: np.ndarray) -> np.ndarray:
+        """Checks which points are within a dead zone
+
+        Args:
+            points (np.ndarray): longitude and latitude of the points, shape (n, 2)
+
+        Returns:
+            np.ndarray: per point, true if it is within a dead zone
+        """
+        points = np.array(points, dtype=float).reshape(-1, 2)
+        if not self._destinations.size or not self.radius:
+            return np.zeros(len(points), dtype=bool)
+        if self._tree is None:
+            self._tree = cKDTree(self.__scale_longitudes(self._destinations))
+        distances, _ = self._tree.query(self.__scale_longitudes(points), distance_upper_bound=self.radius)
+        return distances <= self.radius
+
+    @staticmethod
+    def __scale_longitudes(points: np.ndarray) -> np.ndarray:
+        """Scales the longitudes by the cosine of the latitudes, so that the (euclidean) distances are
+        approximately proportional to the distances on the ground
+
+        Args:
+            points (np.ndarray): longitude and latitude of the points, shape (n, 2)
+
+        Returns:
+            np.ndarray: the scaled longitude and the latitude of the points, shape (n, 2)
+        """
+        return np.column_stack([points[:, 0] * np.cos(np.radians(points[:, 1])), points[:, 1]])
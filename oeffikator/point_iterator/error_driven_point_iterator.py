@@ -0,0 +1,102 @@
+"""This module contains the error driven point iterator. It refines the triangles where the durations of the corners
+differ the most, i.e. where an interpolation of the durations (as in the heatmap) is probably the least accurate."""
+import numpy as np
+from shapely.geometry.base import BaseGeometry
+
+from oeffikator.point_iterator import MINIMUM_DURATION_VARIANCE
+from oeffikator.point_iterator.dead_zone_index import DeadZoneIndex
+from oeffikator.point_iterator.triangular_iterator_interface import TriangularPointIterator
+
+
+class ErrorDrivenPointIterator(TriangularPointIterator):
+    """A triangular point iterator which prioritizes the triangles by their area times the variance of the durations
+    at their corners. Hence, it samples sharp changes of the duration (e.g. along rail lines) more densely
+    than regions with similar durations.
+    The durations of the generated points are unknown until they are set (see `set_durations`).
+
+    Args:
+        TriangularPointIterator: the triangular point iterator, whose priority of the triangles is replaced
+
+    Attributes:
+        points (np.ndarray): All 2D points
+    """
+
+    def __init__(
+        self,
+        initial_points: np.ndarray,
+        durations: np.ndarray,
+        service_area: BaseGeometry | None = None,
+        dead_zones: DeadZoneIndex | None = None,
+    ) -> None:
+        """
+
+        Args:
+            initial_points (np.ndarray): initial points to start of with (at least three)
+            durations (np.ndarray): the duration to each initial point (NaN if unknown, e.g. for invalid trips)
+            service_area (BaseGeometry | None): the (multi)polygon new points shall be within
+            dead_zones (DeadZoneIndex | None): the dead zones new points shall not be within
+
+        Raises:
+            ValueError: initial points need to be 2-dimensional and need to be at least 3 and there needs to be
+            a duration per initial point
+        """
+        durations = np.array(durations, dtype=float)
+        if durations.shape != initial_points.shape[:1]:
+            raise ValueError(f"We need one duration per initial point. You provided: {durations.shape}")
+        self._durations = durations  # grows with the point buffer, NaN for unknown durations
+        self._unknown_point_indices: dict[tuple[float, float], int] = {}  # the generated points without duration
+        super().__init__(initial_points, service_area, dead_zones)
+
+    def set_durations(self, points: list[tuple[float, float]], durations: list[float]) -> None:
+        """Sets the durations of generated points, the triangles at these points are prioritized anew
+
+        Args:
+            points (list[tuple[float, float]]): the points (as returned by the iterator)
+            durations (list[float]): the duration to each point (NaN if unknown, e.g. for invalid trips)
+
+        Raises:
+            KeyError: if a point was not generated by the iterator or its duration was already set
+        """
+        indices = set()
+        for point, duration in zip(points, durations):
+            index = self._unknown_point_indices.pop(tuple(point))
+            self._durations[index] = duration
+            indices.add(index)
+        triangle_ids = sorted(set().union(*(self._point_triangles[index] for index in indices)))
+        triangles = [self._triangles[triangle_id] for triangle_id in triangle_ids]
+        for triangle_id in triangle_ids:
+            self._remove_triangle(triangle_id)
+        self._add_triangles(triangles)
+
+    def _get_priorities(self, triangles: np.ndarray) -> np.ndarray:
+        """Get the priorities of triangles: the area times the variance of the known durations at the corners
+
+        Args:
+            triangles (np.ndarray): the indices of the triangles' points (counterclockwise), shape (n, 3)
+
+        Returns:
+            np.ndarray: the priority of each triangle
+        """
+        durations = self._durations[triangles]
+        is_known = ~np.isnan(durations)
+        number_of_durations = np.maximum(np.sum(is_known, 1), 1)
+        durations = np.where(is_known, durations, 0.0)
+        means = np.sum(durations, 1) / number_of_durations
+        variances = np.sum(np.where(is_known, (durations - means[:, None]) ** 2, 0.0), 1) / number_of_durations
+        return super()._get_priorities(triangles) * (variances + MINIMUM_DURATION_VARIANCE)
+
+    def _append_point(self, point: np.ndarray) -> int:
+        """Appends a point (with an unknown duration) to the buffer
+
+        Args:
+            point (np.ndarray): the point
+
+        Returns:
+            int: the index of the point
+        """
+        index = super()._append_point(point)
+        if index == len(self._durations):
+            self._durations = np.concatenate([self._durations, np.full(len(self._durations), np.nan)])
+        self._durations[index] = np.nan
+        self._unknown_point_indices[tuple(point.tolist())] = index
+        return index
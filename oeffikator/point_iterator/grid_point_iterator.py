@@ -1,6 +1,8 @@
 """This module contains the grid point iterator which is based on the idea
 that points are generated with euqally along a grid in a rectangular space."""
 import numpy as np
+import shapely
+from shapely.geometry.base import BaseGeometry
 
 from oeffikator.point_iterator.point_iterator_interface import PointIteratorInterface
 
@@ -15,12 +17,13 @@ class GridPointIterator(PointIteratorInterface):
         points (tuple[floats]): points which form the grid and which will be iterated over
     """
 
-    def __init__(self, bounding_box: tuple[float], points_per_axis: int):
+    def __init__(self, bounding_box: tuple[float], points_per_axis: int, service_area: BaseGeometry | None = None):
         """
         Args:
             bounding_box (tuple[float]): a bounding box which defines the grid. It needs following format:
             west, east, south, north (i.e. bounding_box[0] > bounding_box[1] or bounding_box[2] > bounding_box[3])
             points_per_axis (int): the number of points for both axis, e.g. if 3, 3*3 points will be generated
+            service_area (BaseGeometry | None): if given, the grid points outside of this (multi)polygon are skipped
 
         Raises:
             ValueError: if bounding box does not contain 4 elements in the west-east-south-north format
@@ -43,6 +46,11 @@ class GridPointIterator(PointIteratorInterface):
         for longitude in np.linspace(bounding_box[0], bounding_box[1], points_per_axis):
             for latitude in np.linspace(bounding_box[2], bounding_box[3], points_per_axis):
                 self.points.append([longitude, latitude])
+        if service_area is not None:
+            shapely.prepare(service_area)
+            longitudes, latitudes = np.array(self.points).T
+            is_inside = shapely.contains_xy(service_area, longitudes, latitudes)
+            self.points = [point for point, is_point_inside in zip(self.points, is_inside) if is_point_inside]
         self.points_used = 0
 
     def __iter__(self):
@@ -56,6 +64,19 @@ class GridPointIterator(PointIteratorInterface):
             raise StopIteration("Your reached the end of the point Grid.")
         return point
 
+    def next_batch(self, number_of_points: int) -> np.ndarray:
+        """Returns the next points of the grid at once (fewer if the end of the grid is reached)
+
+        Args:
+            number_of_points (int): the number of points
+
+        Returns:
+            np.ndarray: the points, shape (number of points, 2)
+        """
+        points = self.points[self.points_used : self.points_used + number_of_points]
+        self.points_used += len(points)
+        return np.array(points, dtype=float).reshape(-1, 2)
+
     def has_points_remaining(self) -> bool:
         """Method to check if the end of the iterator is reached
 
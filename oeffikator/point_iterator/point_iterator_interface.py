@@ -19,6 +19,21 @@ class PointIteratorInterface(ABC):
             list | np.ndarray: the next point in the generator
         """
 
+    def next_batch(self, number_of_points: int) -> np.ndarray:
+        """Method which returns the next points at once (fewer if the iterator ends before).
+        Iterators can override it to spread the points of a batch jointly.
+
+        Args:
+            number_of_points (int): the number of points
+
+        Returns:
+            np.ndarray: the points, shape (number of points, 2)
+        """
+        points = []
+        while len(points) < number_of_points and self.has_points_remaining():
+            points.append(next(self))
+        return np.array(points, dtype=float).reshape(-1, 2)
+
     @abstractmethod
     def has_points_remaining(self) -> bool:
         """Method for determining if an iterator still has points to iterate.
@@ -0,0 +1,36 @@
+"""This module loads the service area, i.e. the (multi)polygon within which the point iterators sample points
+(e.g. Berlin without its lakes and forests, where no station is nearby)."""
+import json
+
+import shapely
+from shapely.geometry import shape
+from shapely.geometry.base import BaseGeometry
+
+
+def load_service_area(path: str) -> BaseGeometry:
+    """Loads the service area from a GeoJSON file (a geometry, a feature or a feature collection).
+    The polygons of all features are united.
+
+    Args:
+        path (str): path of the GeoJSON file (in EPSG:4326)
+
+    Raises:
+        ValueError: if the file does not contain (multi)polygons
+
+    Returns:
+        BaseGeometry: the (prepared) service area
+    """
+    with open(path, encoding="utf-8") as file:
+        geojson = json.load(file)
+    if geojson.get("type") == "FeatureCollection":
+        geometries = [feature["geometry"] for feature in geojson["features"]]
+    elif geojson.get("type") == "Feature":
+        geometries = [geojson["geometry"]]
+    else:
+        geometries = [geojson]
+    geometries = [shape(geometry) for geometry in geometries]
+    if not geometries or any(geometry.geom_type not in ("Polygon", "MultiPolygon") for geometry in geometries):
+        raise ValueError(f"The service area needs to consist of (multi)polygons. You provided: {path}")
+    service_area = shapely.union_all(geometries)
+    shapely.prepare(service_area)
+    return service_area
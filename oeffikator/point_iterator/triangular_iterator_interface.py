@@ -1,11 +1,22 @@
 """This module contains the triangular point iterator. The underlying idea is that we can create a set of triangles
 between points (size at least 3). The traingle with the largest area probably covers some space which is
 lesser densly populated by points. Hence, we set the point here."""
+import heapq
+from collections import defaultdict
+from types import MappingProxyType
+from typing import Mapping
+
 import numpy as np
+import shapely
 from scipy.spatial import Delaunay
+from shapely.geometry.base import BaseGeometry
 
+from oeffikator.point_iterator import INITIAL_POINT_CAPACITY, SKIPPED_TRIANGLES_PER_BATCH_POINT
+from oeffikator.point_iterator.dead_zone_index import DeadZoneIndex
 from oeffikator.point_iterator.point_iterator_interface import PointIteratorInterface
 
+# pylint: disable=R0902
+
 
 class TriangularPointIterator(PointIteratorInterface):
     """A point iterator which is based on the idea that one can create a set of traingles for a given list of points.
@@ -13,6 +24,12 @@ class TriangularPointIterator(PointIteratorInterface):
     The center (=mean of the point coordinates) of teh largest traingle is returned.
     The iterator keeps track of the point list, meaning it adds each new point to the list of points.
 
+    The (Delaunay) triangulation is computed once and then updated incrementally (Bowyer-Watson): a new point
+    only replaces the triangles whose circumcircle contains it. The triangles are kept in a max-heap of their areas.
+    Ties are broken by the southernmost (then westernmost) center, independent of the order of the triangles.
+    Triangles outside of the service area or whose center is within a dead zone (if given) get the priority zero.
+    Centers outside of the service area are snapped into the part of their triangle within it.
+
     Args:
         PointIteratorInterface: interface which defines abstract methods for a point iterator
 
@@ -20,12 +37,20 @@ class TriangularPointIterator(PointIteratorInterface):
         points (np.ndarray): All 2D points
     """
 
-    def __init__(self, initial_points: np.ndarray) -> None:
+    def __init__(
+        self,
+        initial_points: np.ndarray,
+        service_area: BaseGeometry | None = None,
+        dead_zones: DeadZoneIndex | None = None,
+    ) -> None:
         """
 
         Args:
             initial_points (np.ndarray): initial points to start of with. Since the class is based
             on the idea of triangles it requires at least three points.
+            service_area (BaseGeometry | None): the (multi)polygon new points shall be within
+            dead_zones (DeadZoneIndex | None): the dead zones new points shall not be within
+            (it may grow while iterating, it is considered for the triangles created afterwards)
 
         Raises:
             ValueError: initial points need to be 2-dimensional and need to be at least 3.
@@ -36,21 +61,335 @@ class TriangularPointIterator(PointIteratorInterface):
             raise ValueError("We need at least three values to create traignles/generate new points.")
         if initial_points.shape[1] != 2:
             raise ValueError("Second dimension should be 2.")
-        self.points = initial_points
+        # the points live in a growable buffer, only the first `_number_of_points` are set
+        self._points = np.empty((max(INITIAL_POINT_CAPACITY, 2 * initial_points.shape[0]), 2))
+        self._points[: initial_points.shape[0]] = initial_points
+        self._number_of_points = initial_points.shape[0]
+        self._triangles: dict[int, tuple[int, int, int]] = {}  # the point indices (counterclockwise) per triangle id
+        self._edges: dict[tuple[int, int], int] = {}  # the triangle id per directed (counterclockwise) edge
+        self._point_triangles: dict[int, set[int]] = defaultdict(set)  # the ids of the triangles at each point
+        self._heap: list[tuple[float, float, float, int]] = []  # may contain removed triangles (skipped lazily)
+        self._next_triangle_id = 0
+        self._service_area = service_area
+        self._dead_zones = dead_zones
+        if service_area is not None:
+            shapely.prepare(service_area)
+        self._add_triangles(Delaunay(self.points).simplices)
+
+    @property
+    def points(self) -> np.ndarray:
+        """All 2D points (the initial ones and the generated ones)
+
+        Returns:
+            np.ndarray: the points (a view on the buffer)
+        """
+        return self._points[: self._number_of_points]
+
+    @property
+    def triangles(self) -> Mapping[int, tuple[int, int, int]]:
+        """The triangles of the (Delaunay) triangulation of all points
+
+        Returns:
+            Mapping[int, tuple[int, int, int]]: the point indices (counterclockwise) per triangle id (read-only)
+        """
+        return MappingProxyType(self._triangles)
+
+    @property
+    def priorities(self) -> dict[int, float]:
+        """The priorities of the triangles which may be chosen next (not the ones whose center was chosen already)
+
+        Returns:
+            dict[int, float]: the priority per triangle id
+        """
+        return {entry[-1]: -entry[0] for entry in self._heap if entry[-1] in self._triangles}
+
+    def get_triangles_at(self, index: int) -> frozenset[int]:
+        """Get the triangles which have a point as corner
+
+        Args:
+            index (int): the index of the point
+
+        Returns:
+            frozenset[int]: the ids of the triangles
+        """
+        return frozenset(self._point_triangles.get(index, ()))
 
     def __iter__(self):
         return self
 
     def __next__(self) -> np.ndarray:
-        tri = Delaunay(self.points)
-        triangles = self.points[tri.simplices]
-        areas = self.__get_area(triangles)
-        largest_triangle = triangles[np.argpartition(areas, -1)][-1]
-        # compute the "center" of the triangle
-        new_point = np.mean(largest_triangle, 0)
-        self.points = np.vstack([self.points, new_point])
+        new_point = np.full(2, np.nan)
+        while np.isnan(new_point).any():  # triangles outside the service area are skipped
+            triangle_id = self._pop_largest_triangle()
+            # compute the "center" of the triangle
+            new_point = self._get_centers([triangle_id])[0]
+        self._insert_point(new_point, triangle_id)
         return new_point
 
+    def next_batch(self, number_of_points: int) -> np.ndarray:
+        """Returns the centers of the largest triangles which share no point with each other (so the points of
+        a batch are spread instead of clustering within a region). If there are not enough such triangles
+        among the largest ones, the remaining points are chosen after inserting the first ones.
+        All points are inserted into the same triangulation, which is not recomputed.
+
+        Args:
+            number_of_points (int): the number of points
+
+        Returns:
+            np.ndarray: the points, shape (number of points, 2)
+        """
+        points = []
+        while len(points) < number_of_points:
+            triangle_ids = self._pop_spread_triangles(number_of_points - len(points))
+            if not triangle_ids:
+                break
+            centers = self._get_centers(triangle_ids)
+            for center, triangle_id in zip(centers, triangle_ids):
+                if np.isnan(center).any():  # the triangle is outside the service area
+                    continue
+                # the triangle may have been replaced by inserting a previous center of the batch
+                self._insert_point(center, triangle_id if triangle_id in self._triangles else self.locate(center))
+                points.append(center)
+        return np.array(points, dtype=float).reshape(-1, 2)
+
+    def has_points_remaining(self) -> bool:
+        return True
+
+    def _get_priorities(self, triangles: np.ndarray) -> np.ndarray:
+        """Get the priorities of triangles, the center of the triangle with the highest priority is the next point
+
+        Args:
+            triangles (np.ndarray): the indices of the triangles' points (counterclockwise), shape (n, 3)
+
+        Returns:
+            np.ndarray: the priority of each triangle, here its area (zero if it is outside the service area
+            or its center is within a dead zone)
+        """
+        areas = self.__get_area(self._points[triangles])
+        centers = np.mean(self._points[triangles], 1)
+        if self._service_area is not None:
+            is_inside = shapely.contains_xy(self._service_area, centers[:, 0], centers[:, 1])
+            # a triangle whose center is outside may still overlap the service area (e.g. at a concave border)
+            polygons = shapely.polygons(self._points[triangles[~is_inside]])
+            is_inside[~is_inside] = shapely.intersects(self._service_area, polygons) & ~shapely.touches(
+                self._service_area, polygons
+            )
+            areas = np.where(is_inside, areas, 0.0)
+        if self._dead_zones is not None:
+            areas = np.where(self._dead_zones.contains(centers), 0.0, areas)
+        return areas
+
+    def _get_centers(self, triangle_ids: list[int]) -> np.ndarray:
+        """Get the centers (=mean of the corners) of triangles. A center outside of the service area is snapped
+        into the part of its triangle within the service area (its centroid or, if this is outside as well,
+        a point on its surface), so it is still strictly within the triangle.
+
+        Args:
+            triangle_ids (list[int]): the ids of the triangles
+
+        Returns:
+            np.ndarray: the center of each triangle (NaN if the triangle is outside the service area), shape (n, 2)
+        """
+        triangles = self._points[[self._triangles[triangle_id] for triangle_id in triangle_ids]].reshape(-1, 3, 2)
+        centers = np.mean(triangles, 1)
+        if self._service_area is None:
+            return centers
+        is_outside = ~shapely.contains_xy(self._service_area, centers[:, 0], centers[:, 1])
+        if not is_outside.any():
+            return centers
+        parts = shapely.intersection(shapely.polygons(triangles[is_outside]), self._service_area)
+        snapped_centers = np.full((len(parts), 2), np.nan)
+        has_area = shapely.area(parts) > 0
+        part_centers = shapely.centroid(parts[has_area])
+        is_part_center_outside = ~shapely.contains(parts[has_area], part_centers)
+        part_centers[is_part_center_outside] = shapely.point_on_surface(parts[has_area][is_part_center_outside])
+        snapped_centers[has_area] = shapely.get_coordinates(part_centers)
+        centers[is_outside] = snapped_centers
+        return centers
+
+    def _pop_largest_triangle(self) -> int:
+        """Removes the triangle with the highest priority from the heap (it stays part of the triangulation)
+
+        Raises:
+            StopIteration: if there are no triangles (e.g. if all points are on a line)
+
+        Returns:
+            int: the id of the triangle
+        """
+        while self._heap:
+            triangle_id = heapq.heappop(self._heap)[-1]
+            if triangle_id in self._triangles:
+                return triangle_id
+        raise StopIteration("There are no triangles left.")
+
+    def _pop_spread_triangles(self, number_of_triangles: int) -> list[int]:
+        """Removes the triangles with the highest priorities from the heap, skipping triangles which share a point
+        with an already chosen one. Once too many triangles were skipped, the search stops
+        (so small, remote triangles are not preferred over large, neighbouring ones).
+        Triangles without priority are only chosen if there is no other one.
+
+        Args:
+            number_of_triangles (int): the maximum number of triangles
+
+        Returns:
+            list[int]: the ids of the triangles (at least one if there are triangles)
+        """
+        triangle_ids = []
+        used_points: set[int] = set()
+        skipped_entries = []
+        maximum_skipped_entries = SKIPPED_TRIANGLES_PER_BATCH_POINT * number_of_triangles
+        while self._heap and len(triangle_ids) < number_of_triangles and len(skipped_entries) < maximum_skipped_entries:
+            entry = heapq.heappop(self._heap)
+            triangle = self._triangles.get(entry[-1])
+            if triangle is None:
+                continue
+            if triangle_ids and entry[0] >= 0:  # no priority (e.g. outside the service area), wait for the next round
+                skipped_entries.append(entry)
+                break
+            if used_points.isdisjoint(triangle):
+                triangle_ids.append(entry[-1])
+                used_points.update(triangle)
+            else:
+                skipped_entries.append(entry)
+        for entry in skipped_entries:
+            heapq.heappush(self._heap, entry)
+        return triangle_ids
+
+    def locate(self, point: np.ndarray) -> int:
+        """Finds the triangle containing a point by walking from the newest triangle towards the point
+
+        Args:
+            point (np.ndarray): the point (within the convex hull of the points)
+
+        Returns:
+            int: the id of the triangle
+        """
+        point_x, point_y = point.tolist()
+        triangle_id = self._next_triangle_id - 1  # the newest triangle was not replaced yet
+        while True:
+            first, second, third = self._triangles[triangle_id]
+            for start, end in ((first, second), (second, third), (third, first)):
+                (start_x, start_y), (end_x, end_y) = self._points[[start, end]].tolist()
+                neighbour = self._edges.get((end, start))
+                # the point is right of the (counterclockwise) edge, i.e. beyond it
+                if (end_x - start_x) * (point_y - start_y) - (end_y - start_y) * (point_x - start_x) < 0 and (
+                    neighbour is not None
+                ):
+                    triangle_id = neighbour
+                    break
+            else:
+                return triangle_id
+
+    def _add_triangles(self, triangles: np.ndarray) -> None:
+        """Adds triangles to the triangulation and its heap
+
+        Args:
+            triangles (np.ndarray): the indices of the triangles' points, shape (n, 3)
+        """
+        triangles = np.array(triangles, dtype=np.int64).reshape(-1, 3)
+        is_clockwise = self.__get_area(self._points[triangles]) < 0
+        triangles[is_clockwise] = triangles[is_clockwise][:, [0, 2, 1]]
+        centers = np.mean(self._points[triangles], 1)
+        priorities = self._get_priorities(triangles)
+        entries = []
+        for triangle, priority, (longitude, latitude) in zip(triangles.tolist(), priorities.tolist(), centers.tolist()):
+            first, second, third = triangle
+            triangle_id = self._next_triangle_id
+            self._next_triangle_id += 1
+            self._triangles[triangle_id] = (first, second, third)
+            self._edges[(first, second)] = self._edges[(second, third)] = self._edges[(third, first)] = triangle_id
+            self._point_triangles[first].add(triangle_id)
+            self._point_triangles[second].add(triangle_id)
+            self._point_triangles[third].add(triangle_id)
+            entries.append((-priority, latitude, longitude, triangle_id))
+        if len(entries) > len(self._heap):  # e.g. the initial triangulation
+            self._heap.extend(entries)
+            heapq.heapify(self._heap)
+        else:
+            for entry in entries:
+                heapq.heappush(self._heap, entry)
+
+    def _remove_triangle(self, triangle_id: int) -> None:
+        """Removes a triangle from the triangulation (its heap entry is skipped once popped)
+
+        Args:
+            triangle_id (int): the id of the triangle
+        """
+        first, second, third = self._triangles.pop(triangle_id)
+        for edge in ((first, second), (second, third), (third, first)):
+            del self._edges[edge]
+        for index in (first, second, third):
+            self._point_triangles[index].discard(triangle_id)
+
+    def _insert_point(self, point: np.ndarray, triangle_id: int) -> None:
+        """Inserts a point into the triangulation (Bowyer-Watson). Starting from the triangle containing the point,
+        all connected triangles whose circumcircle contains the point are replaced by triangles between
+        the point and the boundary of the removed area.
+
+        Args:
+            point (np.ndarray): the new point
+            triangle_id (int): the id of the triangle containing the point
+        """
+        index = self._append_point(point)
+        cavity = {triangle_id}
+        unvisited = [triangle_id]
+        boundary = []
+        while unvisited:
+            first, second, third = self._triangles[unvisited.pop()]
+            for start, end in ((first, second), (second, third), (third, first)):
+                neighbour = self._edges.get((end, start))
+                if neighbour in cavity:
+                    continue
+                if neighbour is not None and self.__is_in_circumcircle(self._triangles[neighbour], index):
+                    cavity.add(neighbour)
+                    unvisited.append(neighbour)
+                else:
+                    boundary.append((start, end))
+        for cavity_triangle_id in cavity:
+            self._remove_triangle(cavity_triangle_id)
+        self._add_triangles([(index, start, end) for start, end in boundary])
+
+    def _append_point(self, point: np.ndarray) -> int:
+        """Appends a point to the buffer (which is doubled if full)
+
+        Args:
+            point (np.ndarray): the point
+
+        Returns:
+            int: the index of the point
+        """
+        if self._number_of_points == self._points.shape[0]:
+            points = np.empty((2 * self._points.shape[0], 2))
+            points[: self._number_of_points] = self.points
+            self._points = points
+        self._points[self._number_of_points] = point
+        self._number_of_points += 1
+        return self._number_of_points - 1
+
+    def __is_in_circumcircle(self, triangle: tuple[int, int, int], index: int) -> bool:
+        """Checks if a point is (strictly) within the circumcircle of a (counterclockwise) triangle
+
+        Args:
+            triangle (tuple[int, int, int]): the indices of the triangle's points
+            index (int): the index of the point
+
+        Returns:
+            bool: true, if the point is within the circumcircle
+        """
+        point_x, point_y = self._points[index].tolist()
+        (first_x, first_y), (second_x, second_y), (third_x, third_y) = (
+            (x - point_x, y - point_y) for x, y in self._points[list(triangle)].tolist()
+        )
+        first_norm = first_x**2 + first_y**2
+        second_norm = second_x**2 + second_y**2
+        third_norm = third_x**2 + third_y**2
+        determinant = (
+            first_x * (second_y * third_norm - second_norm * third_y)
+            - first_y * (second_x * third_norm - second_norm * third_x)
+            + first_norm * (second_x * third_y - second_y * third_x)
+        )
+        return determinant > 0
+
     def __get_area(self, triangles: np.ndarray) -> np.ndarray:
         """Compute the area for a given set of triangles.
 
@@ -60,10 +399,8 @@ class TriangularPointIterator(PointIteratorInterface):
         Returns:
             np.ndarray: the area for each of the given triangles
         """
-        first = np.multiply(triangles[:, 0, 0], np.subtract(triangles[:, 1, 1], triangles[:, 2, 1]))
-        second = np.multiply(triangles[:, 1, 0], np.subtract(triangles[:, 2, 1], triangles[:, 0, 1]))
-        third = np.multiply(triangles[:, 2, 0], np.subtract(triangles[:, 0, 1], triangles[:, 1, 1]))
+        triangles = np.asarray(triangles)
+        first = np.multiply(triangles[..., 0, 0], np.subtract(triangles[..., 1, 1], triangles[..., 2, 1]))
+        second = np.multiply(triangles[..., 1, 0], np.subtract(triangles[..., 2, 1], triangles[..., 0, 1]))
+        third = np.multiply(triangles[..., 2, 0], np.subtract(triangles[..., 0, 1], triangles[..., 1, 1]))
         return 0.5 * np.add(np.add(first, second), third)
-
-    def has_points_remaining(self) -> bool:
-        return True
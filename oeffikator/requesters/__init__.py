@@ -2,4 +2,24 @@
 from aiohttp import ClientTimeout
 
 RESPONSE_TIMEOUT = ClientTimeout(total=60)  # in seconds
-CHECK_FOR_REQUESTER_AVAILABILITY_IN_SECS = 1 * 24 * 60 * 60  # once per day
+ATTEMPT_TIMEOUT = ClientTimeout(total=10)  # in seconds, for each single attempt of a request
+MAX_ATTEMPTS = 3  # attempts of a request before it is considered failed
+BACKOFF_BASE_IN_SECS = 0.5  # the (jittered) backoff doubles with each attempt ...
+BACKOFF_MAX_IN_SECS = 8  # ... but never exceeds this
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5  # consecutive failures after which a requester is not used anymore ...
+CIRCUIT_BREAKER_RECOVERY_TIME_IN_SECS = 30  # ... until a probe request is allowed again after this time
+RATE_LIMIT_PERIOD_IN_SECS = 60  # request rates are defined per minute
+CONNECTION_LIMIT = 100  # simultaneously open connections of one requester's session
+CONNECTION_LIMIT_PER_HOST = 30  # simultaneously open connections to the same host
+DNS_CACHE_TTL_IN_SECS = 5 * 60
+DEFAULT_LATENCY_IN_SECS = 1.0  # assumed latency of a requester before it sent its first request
+STATISTICS_SMOOTHING_FACTOR = 0.2  # weight of the newest request in the moving averages of latency and error rate
+WALKING_SPEED_IN_METERS_PER_SEC = 1.2  # used by the local routing (access, egress and transfers between stops)
+MAX_WALKING_DISTANCE_IN_METERS = 500
+MAX_NUMBER_OF_TRANSFERS = 5  # the rounds of the local routing are the number of transfers plus one
+MAX_SERVICE_REQUESTS_PER_BATCH = 25  # HAFAS service requests (e.g. trip searches) packed into a single mgate call
+CONCURRENCY_INITIAL_WINDOW = 4  # requests a requester may have in flight at the same time, adapted to its load ...
+CONCURRENCY_MIN_WINDOW = 1
+CONCURRENCY_MAX_WINDOW = 64
+CONCURRENCY_DECREASE_FACTOR = 0.5  # ... the window is multiplied by this on timeouts, 429 or 5xx responses ...
+CONCURRENCY_LATENCY_TOLERANCE = 2.0  # ... and only grows while the latency stays below this multiple of the minimum
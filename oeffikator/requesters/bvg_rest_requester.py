@@ -2,8 +2,8 @@
 import datetime
 
 import pytz
-import requests
 
+from oeffikator.requesters.circuit_breaker import RequesterResponseError, RequesterUnavailableError
 from oeffikator.requesters.requester_interface import RequesterInterface
 
 
@@ -19,11 +19,16 @@ class BVGRestRequester(RequesterInterface):
     """
 
     request_rate = 100
+    supports_reachable_stops = True
 
     def __init__(self, url) -> None:
         super().__init__()
         self.url = url  # https://v5.bvg.transport.rest/locations
 
+    @property
+    def name(self) -> str:
+        return f"{type(self).__name__}({self.url})"
+
     async def query_location(self, query: str, amount_of_results: int = 1) -> dict:
         params = (
             ("query", query),
@@ -38,7 +43,6 @@ class BVGRestRequester(RequesterInterface):
             raise TypeError(
                 f"It seems that the requester is not available. The requests raised an error: {error}"
             ) from error
-        self.past_requests.append({"time": datetime.datetime.now()})
         return response[0]
 
     async def get_journey(
@@ -46,18 +50,20 @@ class BVGRestRequester(RequesterInterface):
     ) -> dict:
         start_date = start_date.replace(tzinfo=pytz.timezone("Europe/Budapest")).astimezone(datetime.timezone.utc)
         params = (
-            ("from.address", origin["address"]),
+            ("from.address", self.__get_address(origin)),
             ("from.latitude", origin["latitude"]),
             ("from.longitude", origin["longitude"]),
-            ("to.address", destination["address"]),
+            ("to.address", self.__get_address(destination)),
             ("to.latitude", destination["latitude"]),
             ("to.longitude", destination["longitude"]),
             ("departure", start_date.strftime("%Y-%m-%dT%H:00+00:00")),
             ("results", str(amount_of_results)),
             ("stopovers", "true"),
         )
-        response = await self.get(f"{self.url}/journeys", params=params)
-        self.past_requests.append({"time": datetime.datetime.now()})
+        try:
+            response = await self.get(f"{self.url}/journeys", params=params)
+        except RequesterResponseError as error:  # the api explains missing connections with an error status
+            response = error.content
         journey = self.__process_response(response)
         journey["origin"] = {"longitude": origin["longitude"], "latitude": origin["latitude"]}
         journey["destination"] = {
@@ -66,15 +72,70 @@ class BVGRestRequester(RequesterInterface):
         }
         return journey
 
+    async def get_reachable_stops(self, origin: dict, max_duration: int, start_date: datetime) -> list[dict]:
+        start_date = start_date.replace(tzinfo=pytz.timezone("Europe/Budapest")).astimezone(datetime.timezone.utc)
+        params = (
+            ("address", self.__get_address(origin)),
+            ("latitude", origin["latitude"]),
+            ("longitude", origin["longitude"]),
+            ("maxDuration", str(max_duration)),
+            ("when", start_date.strftime("%Y-%m-%dT%H:00+00:00")),
+        )
+        response = await self.get(f"{self.url}/stops/reachable-from", params=params)
+        if isinstance(response, dict):  # newer versions of the api wrap the result
+            response = response.get("reachable", [])
+        stops = []
+        for reachable in response:
+            for stop in reachable["stations"]:
+                stops.append(
+                    {
+                        "longitude": stop["location"]["longitude"],
+                        "latitude": stop["location"]["latitude"],
+                        "name": stop.get("name"),
+                        "duration": int(reachable["duration"]),
+                    }
+                )
+        return stops
+
+    def __get_address(self, location: dict) -> str:
+        """The api requires an address for locations given by coordinates. For locations without one
+        (e.g. not geocoded destinations), the coordinates are used as address, the routing relies on them anyway.
+
+        Args:
+            location (dict): location with (optional) address, latitude and longitude
+
+        Returns:
+            str: the address
+        """
+        if location.get("address"):
+            return location["address"]
+        return f"{location['longitude']} {location['latitude']}"
+
     def __process_response(self, response: dict) -> dict:
         """Method to standardize the api response and make it usable
 
         Args:
-            response (dict): api respons (as json)
+            response (dict): api response (as json)
+
+        Raises:
+            RequesterUnavailableError: if the response is neither a journey nor says that there is no connection
+            (e.g. an error of the api)
 
         Returns:
             dict: json which is simpler to handle and process
         """
+        message = str(response.get("msg", "")) if isinstance(response, dict) else ""
+        has_found_no_connection = "No connection found" in message or (
+            isinstance(response, dict) and response.get("journeys") == []
+        )
+        has_no_station_nearby = "no stations found close" in message
+        if has_found_no_connection or has_no_station_nearby:
+            return {
+                "arrivalTime": None,
+                "stopovers": None,
+                "noConnectionFound": has_found_no_connection,
+                "noStationFoundNearby": has_no_station_nearby,
+            }
         stopsovers = []
         try:
             for leg in response["journeys"][0]["legs"]:
@@ -84,28 +145,20 @@ class BVGRestRequester(RequesterInterface):
                             longitude = stop["stop"]["location"]["longitude"]
                             latitude = stop["stop"]["location"]["latitude"]
                             atime = stop["arrival"][11:19].replace(":", "")
-                            stopsovers.append({"longitude": longitude, "latitude": latitude, "time": atime})
+                            stopsovers.append(
+                                {
+                                    "longitude": longitude,
+                                    "latitude": latitude,
+                                    "time": atime,
+                                    "name": stop["stop"].get("name"),
+                                }
+                            )
             destination = response["journeys"][0]["legs"][-1]
             arrival_time = destination["arrival"][11:19].replace(":", "")
             destination = {
                 "longitude": destination["destination"]["longitude"],
                 "latitude": destination["destination"]["latitude"],
             }
-        except KeyError:
-            print("Something went wrong. The response looks like: ", response)
-            has_found_no_connection: bool = "msg" in response.keys() and "No connection found" in response["msg"]
-            has_no_station_nearby: bool = "msg" in response.keys() and "no stations found close" in response["msg"]
-            return {
-                "arrivalTime": None,
-                "stopovers": None,
-                "noConnectionFound": has_found_no_connection,
-                "noStationFoundNearby": has_no_station_nearby,
-            }
+        except (KeyError, IndexError, TypeError) as error:
+            raise RequesterUnavailableError(f"{self.name} did not respond with a journey: {response}") from error
         return {"arrivalTime": arrival_time, "stopovers": stopsovers}
-
-    def _check_response(self) -> bool:
-        try:
-            response = requests.get(f"{self.url}/locations?query=alexanderplatz&results=1", timeout=1)
-        except requests.exceptions.ReadTimeout:
-            return False
-        return response.status_code // 100 == 2
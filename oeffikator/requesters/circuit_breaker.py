@@ -0,0 +1,129 @@
+"""This module includes the circuit breaker which protects the app from waiting on unresponsive requesters."""
+import time
+from enum import Enum
+from typing import Callable
+
+from oeffikator.requesters import CIRCUIT_BREAKER_FAILURE_THRESHOLD, CIRCUIT_BREAKER_RECOVERY_TIME_IN_SECS
+
+
+class RequesterUnavailableError(Exception):
+    """Raised if a requester does not (properly) respond or its circuit breaker is open."""
+
+
+class RequesterResponseError(RequesterUnavailableError):
+    """Raised if a requester responds with an error status which is no sign of overload (e.g. 400 or 404).
+    Apis may explain the error in the body of the response, so it is kept.
+
+    Attributes:
+        status (int): the http status of the response
+        content (dict | list | None): the body of the response (as json), None if it is no json
+    """
+
+    def __init__(self, message: str, status: int, content: dict | list | None) -> None:
+        """
+        Args:
+            message (str): the error message
+            status (int): the http status of the response
+            content (dict | list | None): the body of the response (as json), None if it is no json
+        """
+        super().__init__(message)
+        self.status = status
+        self.content = content
+
+
+class CircuitState(Enum):
+    """The states of a circuit breaker"""
+
+    CLOSED = "closed"  # requests pass
+    OPEN = "open"  # requests fail fast
+    HALF_OPEN = "half_open"  # a single probe request passes to check if the requester recovered
+
+
+class CircuitBreaker:
+    """A circuit breaker which opens after a number of consecutive failures. While open, requests fail fast.
+    After the recovery time, it lets a single probe request pass (half-open). If the probe succeeds, it closes again,
+    otherwise it opens for another recovery time.
+
+    Attributes:
+        failure_threshold (int): the number of consecutive failures after which the circuit opens
+        recovery_time (float): the time (in seconds) after which an open circuit lets a probe request pass
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+        recovery_time: float = CIRCUIT_BREAKER_RECOVERY_TIME_IN_SECS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            failure_threshold (int): the number of consecutive failures after which the circuit opens
+            recovery_time (float): the time (in seconds) after which an open circuit lets a probe request pass
+            clock (Callable[[], float]): the monotonic clock (in seconds) the recovery time is measured by
+
+        Raises:
+            ValueError: if the failure threshold is lower than 1
+        """
+        if failure_threshold < 1:
+            raise ValueError(f"The failure threshold needs to be at least 1. You provided: {failure_threshold}")
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.consecutive_failures = 0
+        self._clock = clock
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._is_probing = False
+
+    @property
+    def state(self) -> CircuitState:
+        """The current state. An open circuit turns half-open once the recovery time passed.
+
+        Returns:
+            CircuitState: the current state
+        """
+        if self._state == CircuitState.OPEN and self._clock() - self._opened_at >= self.recovery_time:
+            self._state = CircuitState.HALF_OPEN
+            self._is_probing = False
+        return self._state
+
+    def is_available(self) -> bool:
+        """Checks if a request would pass right now (without registering one)
+
+        Returns:
+            bool: true, if the circuit is closed or half-open without a running probe
+        """
+        state = self.state
+        return state == CircuitState.CLOSED or (state == CircuitState.HALF_OPEN and not self._is_probing)
+
+    def allow_request(self) -> bool:
+        """Registers a request if it may pass. In the half-open state, only a single probe request passes.
+
+        Returns:
+            bool: true, if the request may be sent
+        """
+        if not self.is_available():
+            return False
+        if self._state == CircuitState.HALF_OPEN:
+            self._is_probing = True
+        return True
+
+    def release_probe(self) -> None:
+        """Releases the probe of a request which ended without an outcome (e.g. since it was cancelled),
+        so another probe request may pass. Nothing happens if the request recorded its outcome already."""
+        if self._state == CircuitState.HALF_OPEN:
+            self._is_probing = False
+
+    def record_success(self) -> None:
+        """Registers a successful request, which closes the circuit"""
+        self.consecutive_failures = 0
+        self._state = CircuitState.CLOSED
+        self._is_probing = False
+
+    def record_failure(self) -> None:
+        """Registers a failed request, which opens the circuit if the failure threshold is reached
+        or the failed request was a probe"""
+        self.consecutive_failures += 1
+        if self._state == CircuitState.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self._state = CircuitState.OPEN
+            self._opened_at = self._clock()
+            self._is_probing = False
@@ -0,0 +1,121 @@
+"""This module includes the adaptive concurrency limiter which protects the apis from too many parallel requests."""
+import asyncio
+import time
+
+from oeffikator.requesters import (
+    CONCURRENCY_DECREASE_FACTOR,
+    CONCURRENCY_INITIAL_WINDOW,
+    CONCURRENCY_LATENCY_TOLERANCE,
+    CONCURRENCY_MAX_WINDOW,
+    CONCURRENCY_MIN_WINDOW,
+)
+
+# pylint: disable=R0902,R0913,R0917
+
+
+class ConcurrencyLimiter:
+    """An adaptive concurrency limiter (AIMD: additive increase, multiplicative decrease). It limits the number
+    of requests in flight to a window. With each successful request whose latency stays close to the minimum
+    latency seen so far, the window grows by one request per window (additive increase). On signs of overload
+    (timeouts, 429 or 5xx responses), it shrinks by the decrease factor (multiplicative decrease). Requests which
+    were sent before the last decrease do not decrease it again, so a burst of failures only counts once.
+    Callers exceeding the window wait (without blocking the event loop) for a free slot.
+
+    Attributes:
+        window (float): the current number of requests which may be in flight at the same time
+        min_window (float): the lower bound of the window
+        max_window (float): the upper bound of the window
+        decrease_factor (float): the factor the window is multiplied with on overload
+        latency_tolerance (float): the window only grows while the latency is below this multiple of the minimum
+        in_use (int): the number of requests currently in flight
+        waiting (int): the number of requests currently waiting for a free slot (queue depth)
+    """
+
+    def __init__(
+        self,
+        initial_window: float = CONCURRENCY_INITIAL_WINDOW,
+        min_window: float = CONCURRENCY_MIN_WINDOW,
+        max_window: float = CONCURRENCY_MAX_WINDOW,
+        decrease_factor: float = CONCURRENCY_DECREASE_FACTOR,
+        latency_tolerance: float = CONCURRENCY_LATENCY_TOLERANCE,
+    ) -> None:
+        """
+        Args:
+            initial_window (float): the number of requests which may be in flight at the same time initially
+            min_window (float): the lower bound of the window
+            max_window (float): the upper bound of the window
+            decrease_factor (float): the factor the window is multiplied with on overload
+            latency_tolerance (float): the window only grows while the latency is below this multiple of the minimum
+
+        Raises:
+            ValueError: if the bounds of the window are not valid or the decrease factor is not within (0, 1)
+        """
+        if not 1 <= min_window <= initial_window <= max_window:
+            raise ValueError(
+                "The windows need to fulfill 1 <= min_window <= initial_window <= max_window. "
+                f"You provided: {min_window}, {initial_window}, {max_window}"
+            )
+        if not 0 < decrease_factor < 1:
+            raise ValueError(f"The decrease factor needs to be within (0, 1). You provided: {decrease_factor}")
+        self.window = float(initial_window)
+        self.min_window = min_window
+        self.max_window = max_window
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.in_use = 0
+        self.waiting = 0
+        self._min_latency = float("inf")
+        self._last_decrease = float("-inf")
+        self._condition = asyncio.Condition()
+
+    def has_free_slot(self) -> bool:
+        """Checks if a request could be sent right now
+
+        Returns:
+            bool: true, if less requests than the window are in flight
+        """
+        return self.in_use < int(self.window)
+
+    async def acquire(self) -> float:
+        """Waits (asynchronously) for a free slot and occupies it
+
+        Returns:
+            float: the start time of the request, to be passed to `release`
+        """
+        async with self._condition:
+            self.waiting += 1
+            try:
+                await self._condition.wait_for(self.has_free_slot)
+            finally:
+                self.waiting -= 1
+            self.in_use += 1
+        return time.monotonic()
+
+    async def release(self, start_time: float, has_failed: bool, is_overloaded: bool) -> None:
+        """Frees the slot of a finished request and adapts the window to its outcome
+
+        Args:
+            start_time (float): the start time returned by `acquire`
+            has_failed (bool): if the request failed
+            is_overloaded (bool): if the request failed due to overload (timeout, 429 or 5xx response)
+        """
+        async with self._condition:
+            self.in_use -= 1
+            if is_overloaded:
+                if start_time > self._last_decrease:
+                    self.window = max(self.min_window, self.window * self.decrease_factor)
+                    self._last_decrease = time.monotonic()
+            elif not has_failed:
+                latency = time.monotonic() - start_time
+                self._min_latency = min(self._min_latency, latency)
+                if latency <= self._min_latency * self.latency_tolerance:
+                    self.window = min(self.max_window, self.window + 1 / self.window)
+            self._condition.notify_all()
+
+    def as_dict(self) -> dict:
+        """The state of the limiter as dictionary (e.g. for an api response)
+
+        Returns:
+            dict: the window, the requests in flight and the queue depth
+        """
+        return {"concurrency_window": self.window, "concurrency_in_use": self.in_use, "queue_depth": self.waiting}
@@ -2,6 +2,8 @@
 import datetime
 import json
 
+from oeffikator.requesters import MAX_SERVICE_REQUESTS_PER_BATCH
+from oeffikator.requesters.circuit_breaker import RequesterUnavailableError
 from oeffikator.requesters.requester_interface import RequesterInterface
 
 
@@ -17,6 +19,7 @@ class OeffiRequester(RequesterInterface):
     """
 
     request_rate = 100
+    supports_geocoding = False
 
     def __init__(self, key: str):
         """
@@ -31,6 +34,7 @@ class OeffiRequester(RequesterInterface):
             raise ValueError(f"The oeffi requester will not work without a key. You provided: '{key}'")
         self.__bvg_url = "http://bvg-apps-ext.hafas.de/bin/mgate.exe/mgate.exe"
         self.__key = key
+        self.__origin_lids: dict[tuple[float, float], str] = {}  # origins do not move, their lids are cached
 
     async def query_location(self, query: str, amount_of_results: int = 1) -> dict:
         raise NotImplementedError
@@ -38,119 +42,219 @@ class OeffiRequester(RequesterInterface):
     async def get_journey(
         self, origin: dict, destination: dict, start_date: datetime, amount_of_results: int = 1
     ) -> dict:
-        start_lid = await self.__get_lid(origin["longitude"], origin["latitude"])
-        dest = await self.__get_dest(destination["longitude"], destination["latitude"])
-        ext_id = dest[0]
-        dest_type = dest[1]
-        resp = await self.__request_data(
-            self.__create_json_trip(start_lid, dest_type, ext_id, start_date.strftime("%Y%m%d"))
+        return (await self.get_journeys(origin, [destination], start_date, amount_of_results))[0]
+
+    async def get_journeys(
+        self, origin: dict, destinations: list[dict], start_date: datetime, amount_of_results: int = 1
+    ) -> list[dict]:
+        """Queries the journeys from one origin to several destinations. Instead of three calls per journey,
+        the locations of all destinations (and of the origin, if not cached yet) are queried in one batched call,
+        followed by one batched call for all trip searches.
+
+        Args:
+            origin (dict): json dict with origin(/start) location information
+            destinations (list[dict]): json dicts with destination location information
+            start_date (datetime): start date and time when the journeys should take place
+            amount_of_results (int): the number of results which should be returned, usually 1
+
+        Returns:
+            list[dict]: the journeys in the order of the destinations
+        """
+        journeys = []
+        for index in range(0, len(destinations), MAX_SERVICE_REQUESTS_PER_BATCH - 1):  # one slot for the origin
+            batch = destinations[index : index + MAX_SERVICE_REQUESTS_PER_BATCH - 1]
+            journeys += await self.__get_journeys_batch(origin, batch, start_date, amount_of_results)
+        return journeys
+
+    async def __get_journeys_batch(
+        self, origin: dict, destinations: list[dict], start_date: datetime, amount_of_results: int
+    ) -> list[dict]:
+        """Queries the journeys to a batch of destinations (with two calls at most)
+
+        Args:
+            origin (dict): json dict with origin(/start) location information
+            destinations (list[dict]): json dicts with destination location information
+            start_date (datetime): start date and time when the journeys should take place
+            amount_of_results (int): the number of results which should be returned, usually 1
+
+        Returns:
+            list[dict]: the journeys in the order of the destinations
+        """
+        origin_key = (round(float(origin["longitude"]), 6), round(float(origin["latitude"]), 6))
+        locations = ([] if origin_key in self.__origin_lids else [origin]) + destinations
+        results = await self.__request_data(
+            [self.__create_geo_pos_request(location["longitude"], location["latitude"]) for location in locations]
         )
-        try:
-            arrival_time = resp["svcResL"][1]["res"]["outConL"][0]["arr"]["aTimeS"]
-        except IndexError:
-            return {"origin": origin, "destination": destination, "arrivalTime": None, "stopovers": None}
-        if arrival_time is None:
-            return {"origin": origin, "destination": destination, "arrivalTime": None, "stopovers": None}
-        return {"origin": origin, "destination": destination, "arrivalTime": arrival_time, "stopovers": None}
+        if origin_key not in self.__origin_lids:
+            origin_location = self.__get_first_location(results.pop(0))
+            if origin_location is None:
+                return [self.__create_journey(origin, destination, None) for destination in destinations]
+            self.__origin_lids[origin_key] = origin_location["lid"]
 
-    def _check_response(self) -> bool:
-        raise NotImplementedError
+        found_destinations = [
+            (destination, location)
+            for destination, location in zip(destinations, map(self.__get_first_location, results))
+            if location is not None
+        ]
+        arrival_times = {}
+        if found_destinations:
+            trip_results = await self.__request_data(
+                [
+                    self.__create_trip_search_request(
+                        self.__origin_lids[origin_key],
+                        location["type"],
+                        location["extId"],
+                        start_date,
+                        amount_of_results,
+                    )
+                    for _, location in found_destinations
+                ]
+            )
+            for (destination, _), result in zip(found_destinations, trip_results):
+                arrival_times[id(destination)] = self.__get_arrival_time(result)
+        return [
+            self.__create_journey(origin, destination, arrival_times.get(id(destination)))
+            for destination in destinations
+        ]
 
-    async def __request_data(self, json_string: str) -> dict:
-        """Request data from the API
+    @staticmethod
+    def __create_journey(origin: dict, destination: dict, arrival_time: str | None) -> dict:
+        """Creates the journey in the format all requesters share
 
         Args:
-            json_string (str): request string
+            origin (dict): json dict with origin(/start) location information
+            destination (dict): json dict with destination location information
+            arrival_time (str | None): the arrival time (HHMMSS), None if no journey was found
 
         Returns:
-            dict: response dict (json)
+            dict: the journey
         """
-        data = json.loads(json_string)
-        headers = {"Content-type": "application/json", "Accept": "text/plain"}
-        response = await self.post(self.__bvg_url, data=json.dumps(data), headers=headers)
-        self.past_requests.append({"time": datetime.datetime.now()})
-        return response
+        return {"origin": origin, "destination": destination, "arrivalTime": arrival_time, "stopovers": None}
 
-    async def __get_dest(self, longitude: float, latitude: float) -> tuple:
-        """Gets the response for a destination query
+    @staticmethod
+    def __get_first_location(result: dict) -> dict | None:
+        """Gets the first location of a LocGeoPos result
 
         Args:
-            longitude (float): Longitude (in ESPG:4326)
-            latitude (float): Latitude (in EPSG:4326)
+            result (dict): the result of the service request
 
         Returns:
-            tuple: response tuple of destination id and type
+            dict | None: the location (with lid, extId and type), None if the request failed or found nothing
         """
-        resp = await self.__request_data(self.__create_json_geo_loc(longitude, latitude))
-        ext_id = resp["svcResL"][1]["res"]["locL"][0]["extId"]
-        location_type = resp["svcResL"][1]["res"]["locL"][0]["type"]
-        return (ext_id, location_type)
+        try:
+            return result["res"]["locL"][0]
+        except (KeyError, IndexError, TypeError):
+            return None
 
-    async def __get_lid(self, longitude: float, latitude: float) -> dict:
-        """Gets the reponse of a lid query
+    @staticmethod
+    def __get_arrival_time(result: dict) -> str | None:
+        """Gets the arrival time of the first connection of a TripSearch result
 
         Args:
-            longitude (float): Longitude (in ESPG:4326)
-            latitude (float): Latitude (in EPSG:4326)
+            result (dict): the result of the service request
 
         Returns:
-            dict: response json
+            str | None: the arrival time (HHMMSS), None if the request failed or found no connection
         """
-        resp = await self.__request_data(self.__create_json_geo_loc(longitude, latitude))
-        return resp["svcResL"][1]["res"]["locL"][0]["lid"]
+        try:
+            return result["res"]["outConL"][0]["arr"]["aTimeS"]
+        except (KeyError, IndexError, TypeError):
+            return None
 
-    def __create_json_geo_loc(self, longitude: float, latitude: float) -> str:
-        """Create the body for a geo location requests
+    async def __request_data(self, service_requests: list[dict]) -> list[dict]:
+        """Request data from the API. All service requests are packed into a single call.
+
+        Args:
+            service_requests (list[dict]): the service requests (e.g. LocGeoPos or TripSearch)
+
+        Raises:
+            RequesterUnavailableError: if the API rejected the whole call (e.g. due to a wrong key)
+
+        Returns:
+            list[dict]: the results of the service requests (in the same order)
+        """
+        data = {
+            "auth": {"aid": self.__key, "type": "AID"},
+            "client": {"id": "BVG", "type": "AND"},
+            "ext": "BVG.1",
+            "ver": "1.18",
+            "lang": "eng",
+            "svcReqL": [{"meth": "ServerInfo", "req": {"getServerDateTime": True, "getTimeTablePeriod": False}}]
+            + service_requests,
+            "formatted": False,
+        }
+        headers = {"Content-type": "application/json", "Accept": "text/plain"}
+        response = await self.post(self.__bvg_url, data=json.dumps(data), headers=headers)
+        try:
+            return response["svcResL"][1:]  # the first result belongs to the ServerInfo request
+        except (KeyError, TypeError) as error:
+            message = response.get("err") if isinstance(response, dict) else response
+            raise RequesterUnavailableError(f"{self.name} rejected the request: {message}") from error
+
+    @staticmethod
+    def __create_geo_pos_request(longitude: float, latitude: float) -> dict:
+        """Create the service request for the location (lid, extId and type) closest to the coordinates
 
         Args:
             longitude (float): Longitude (in ESPG:4326)
             latitude (float): Latitude (in EPSG:4326)
 
         Returns:
-            str: body for a geo location request
+            dict: the LocGeoPos service request
         """
-        return str(
-            '{"auth":{"aid":'
-            f'"{self.__key}"'
-            ',"type":"AID"},"client":{"id":"BVG","type":"AND"},"ext":"BVG.1",'
-            '"ver":"1.18","lang":"eng","svcReqL":[{"meth":"ServerInfo","req":{"getServerDateTime":true,'
-            '"getTimeTablePeriod":false}},{"meth":"LocGeoPos","cfg":{"polyEnc":"GPA"},"req":{"ring":'
-            '{"cCrd":{"x":'
-            f"{int(float(longitude) * 10e5)}"
-            ',"y":'
-            f"{int(float(latitude) * 10e5)}"
-            '},"maxDist":20000},"getStops":true,"getPOIs":true,"maxLoc":1}}],"formatted":false}'
-        )
+        return {
+            "meth": "LocGeoPos",
+            "cfg": {"polyEnc": "GPA"},
+            "req": {
+                "ring": {
+                    "cCrd": {"x": int(float(longitude) * 10e5), "y": int(float(latitude) * 10e5)},
+                    "maxDist": 20000,
+                },
+                "getStops": True,
+                "getPOIs": True,
+                "maxLoc": 1,
+            },
+        }
 
-    def __create_json_trip(self, start_lid: str, dest_type: str, ext_id: str, start_date: str) -> str:
-        """Create the body for a trip requests
+    @staticmethod
+    def __create_trip_search_request(
+        start_lid: str, dest_type: str, ext_id: str, start_date: datetime, amount_of_results: int
+    ) -> dict:
+        """Create the service request for a trip
 
         Args:
-            x (float): Longitude (in ESPG:4326)
-            y (float): Latitude (in EPSG:4326)
-            dest_type (str):
-            ext_id (str):
-            start_date (str):
+            start_lid (str): the lid of the origin
+            dest_type (str): the location type of the destination
+            ext_id (str): the external id of the destination
+            start_date (datetime): start date and time of the trip
+            amount_of_results (int): the number of connections which should be returned
 
         Returns:
-            str: body for a trip request
+            dict: the TripSearch service request
         """
-        return str(
-            '{"auth":{"aid":"'
-            f"{self.__key}"
-            '}","type":"AID"},"client":{"id":"BVG","type":"AND"},"ext":"BVG.1"'
-            ',"ver":"1.18","lang":"eng","svcReqL":[{"meth":"ServerInfo","req":{"getServerDateTime":true,'
-            '"getTimeTablePeriod":false}},{"meth":"TripSearch","cfg":{"polyEnc":"GPA"},"req":{"depLocL":'
-            '[{"type":"P","lid":"'
-            f"{start_lid}"
-            '}"}],"arrLocL":[{"type":"'
-            f"{dest_type}"
-            '","extId":"'
-            f"{ext_id}"
-            '"}],"outDate":"'
-            f"{start_date}"
-            '","outTime":"120000",'
-            '"outFrwd":true,"gisFltrL":[{"mode":"FB","profile":{"type":"F","linDistRouting":false,"maxdist":2000},'
-            '"type":"M","meta":"foot_speed_normal"}],"getPolyline":true,"getPasslist":true,"getConGroups":false,'
-            '"getIST":false,"getEco":false,"extChgTime":-1}}],"formatted":false}'
-        )
+        return {
+            "meth": "TripSearch",
+            "cfg": {"polyEnc": "GPA"},
+            "req": {
+                "depLocL": [{"type": "P", "lid": start_lid}],
+                "arrLocL": [{"type": dest_type, "extId": ext_id}],
+                "outDate": start_date.strftime("%Y%m%d"),
+                "outTime": start_date.strftime("%H%M%S"),
+                "outFrwd": True,
+                "numF": amount_of_results,
+                "gisFltrL": [
+                    {
+                        "mode": "FB",
+                        "profile": {"type": "F", "linDistRouting": False, "maxdist": 2000},
+                        "type": "M",
+                        "meta": "foot_speed_normal",
+                    }
+                ],
+                "getPolyline": True,
+                "getPasslist": True,
+                "getConGroups": False,
+                "getIST": False,
+                "getEco": False,
+                "extChgTime": -1,
+            },
+        }
@@ -0,0 +1,499 @@
+"""This module includes the requester class which routes locally on a GTFS feed (instead of querying an api)."""
+import array
+import asyncio
+import contextlib
+import csv
+import datetime
+import io
+import os
+import zipfile
+from collections import defaultdict
+from typing import Iterator, TextIO
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from oeffikator.requesters import (
+    MAX_NUMBER_OF_TRANSFERS,
+    MAX_WALKING_DISTANCE_IN_METERS,
+    WALKING_SPEED_IN_METERS_PER_SEC,
+)
+from oeffikator.requesters.requester_interface import RequesterInterface
+
+METERS_PER_DEGREE = 111_320  # of latitude (and of longitude at the equator)
+UNREACHED = np.iinfo(np.int64).max
+
+# pylint: disable=R0902,R0914
+
+
+@contextlib.contextmanager
+def open_gtfs_table(path: str, name: str) -> Iterator[TextIO | None]:
+    """Opens a table of a GTFS feed
+
+    Args:
+        path (str): path to the GTFS feed, either a zip file or a directory
+        name (str): the name of the table, e.g. "stops"
+
+    Yields:
+        TextIO | None: the (csv) file of the table, None if the feed does not contain it
+    """
+    file_name = f"{name}.txt"
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as feed:
+            if file_name not in feed.namelist():
+                yield None
+                return
+            with feed.open(file_name) as file:
+                yield io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        return
+    file_path = os.path.join(path, file_name)
+    if not os.path.exists(file_path):
+        yield None
+        return
+    with open(file_path, encoding="utf-8-sig", newline="") as file:
+        yield file
+
+
+def read_gtfs_table(path: str, name: str) -> list[dict]:
+    """Reads a (small) table of a GTFS feed
+
+    Args:
+        path (str): path to the GTFS feed, either a zip file or a directory
+        name (str): the name of the table, e.g. "stops"
+
+    Returns:
+        list[dict]: the rows of the table, empty if the feed does not contain it
+    """
+    with open_gtfs_table(path, name) as file:
+        return [] if file is None else list(csv.DictReader(file))
+
+
+def read_gtfs_stop_times(path: str, trip_indices: dict[str, int], stop_indices: dict[str, int]) -> np.ndarray:
+    """Reads the stop times of a GTFS feed (usually by far its largest table) row by row into a compact array.
+    Stop times of unknown trips or stops are skipped.
+
+    Args:
+        path (str): path to the GTFS feed, either a zip file or a directory
+        trip_indices (dict[str, int]): the index per trip id
+        stop_indices (dict[str, int]): the index per stop id
+
+    Returns:
+        np.ndarray: per stop time, the index of the trip and the stop, the stop sequence, the arrival and
+        the departure (in seconds since midnight, -1 if not given), shape (number of stop times, 5)
+    """
+    columns = [array.array("q") for _ in range(5)]
+    trips, stops, sequences, arrivals, departures = columns
+    with open_gtfs_table(path, "stop_times") as file:
+        rows = csv.reader(file) if file is not None else iter([])
+        header = {column: index for index, column in enumerate(next(rows, []))}
+        trip_column, stop_column, sequence_column = (
+            header.get("trip_id"),
+            header.get("stop_id"),
+            header.get("stop_sequence"),
+        )
+        arrival_column, departure_column = header.get("arrival_time"), header.get("departure_time")
+        for row in rows:
+            trip = trip_indices.get(row[trip_column])
+            stop = stop_indices.get(row[stop_column])
+            if trip is None or stop is None:
+                continue
+            arrival = row[arrival_column].strip() if arrival_column is not None else ""
+            departure = row[departure_column].strip() if departure_column is not None else ""
+            arrival = arrival or departure
+            departure = departure or arrival
+            trips.append(trip)
+            stops.append(stop)
+            sequences.append(int(row[sequence_column]))
+            arrivals.append(parse_gtfs_time(arrival) if arrival else -1)
+            departures.append(parse_gtfs_time(departure) if departure else -1)
+    return np.stack([np.frombuffer(column, dtype=np.int64) for column in columns], axis=1).reshape(-1, 5)
+
+
+def parse_gtfs_time(time: str) -> int:
+    """Parses a GTFS time, which may exceed 24 hours for trips after midnight
+
+    Args:
+        time (str): the time in the format H:MM:SS or HH:MM:SS
+
+    Returns:
+        int: the seconds since midnight (of the service day)
+    """
+    hours, minutes, seconds = time.strip().split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+class RaptorRequester(RequesterInterface):
+    """A requester which routes locally on a GTFS feed with RAPTOR (Round-bAsed Public Transit Optimized Router).
+    The timetable is held in compact numpy arrays and every query is answered in-process, so it is neither
+    rate limited (besides a nominal request rate) nor dependent on a remote api. A single run computes the arrival
+    at all stops, which also answers one-to-all queries (all stops reachable from an origin).
+    It is not able to geocode locations.
+
+    Args:
+        RequesterInterface: interface which defines the abstract methods and properties of an requester class
+
+    Attributes:
+        request rate: the number of requests tolerated per minute (nominal, the routing is done in-process)
+        path: path to the GTFS feed (a zip file or a directory)
+    """
+
+    request_rate = 100_000
+    supports_geocoding = False
+    supports_reachable_stops = True
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): path to the GTFS feed, either a zip file or a directory
+
+        Raises:
+            ValueError: if the feed does not contain any stops
+        """
+        super().__init__()
+        self.path = path
+        self._active_services: dict[datetime.date, np.ndarray] = {}
+        self._load_stops()
+        self._load_services()
+        self._load_routes()
+
+    @property
+    def name(self) -> str:
+        return f"{type(self).__name__}({self.path})"
+
+    async def query_location(self, query: str, amount_of_results: int = 1) -> dict:
+        raise NotImplementedError(f"{self.name} is not able to geocode locations.")
+
+    async def get_journey(
+        self, origin: dict, destination: dict, start_date: datetime, amount_of_results: int = 1
+    ) -> dict:
+        return (await self.get_journeys(origin, [destination], start_date, amount_of_results))[0]
+
+    async def get_journeys(
+        self, origin: dict, destinations: list[dict], start_date: datetime, amount_of_results: int = 1
+    ) -> list[dict | Exception]:
+        """Queries the journeys from one origin to several destinations with a single (one-to-all) routing run
+
+        Args:
+            origin (dict): json dict with origin(/start) location information
+            destinations (list[dict]): json dicts with destination location information
+            start_date (datetime): start date and time when the journeys should take place
+            amount_of_results (int): the number of results which should be returned, usually 1
+
+        Returns:
+            list[dict | Exception]: the journeys in the order of the destinations
+        """
+        arrivals = await self.__route(origin, start_date)
+        return [
+            self.__get_journey_from_arrivals(arrivals, origin, destination, start_date) for destination in destinations
+        ]
+
+    async def get_reachable_stops(self, origin: dict, max_duration: int, start_date: datetime) -> list[dict]:
+        departure = self.__get_seconds_since_midnight(start_date)
+        arrivals = await self.__route(origin, start_date)
+        reached_stops = np.flatnonzero(arrivals <= departure + max_duration * 60)
+        return [
+            {
+                "longitude": float(self.stop_coordinates[stop, 0]),
+                "latitude": float(self.stop_coordinates[stop, 1]),
+                "name": self.stop_names[stop],
+                "duration": round(int(arrivals[stop] - departure) / 60),
+            }
+            for stop in reached_stops
+        ]
+
+    def get_arrivals(self, longitude: float, latitude: float, start_date: datetime.datetime) -> np.ndarray:
+        """Computes the earliest arrival at every stop (one-to-all) with RAPTOR. Each round extends the journeys
+        of the previous round by one more trip (scanning only routes serving stops improved in the previous round)
+        followed by a footpath to the stops nearby. A route is scanned for all of its trips and stops at once.
+
+        Args:
+            longitude (float): longitude of the origin
+            latitude (float): latitude of the origin
+            start_date (datetime.datetime): start date and time of the journeys
+
+        Returns:
+            np.ndarray: the earliest arrival (in seconds since midnight of the start date) at each stop,
+            `UNREACHED` for stops which can not be reached
+        """
+        departure = self.__get_seconds_since_midnight(start_date)
+        active_services = self.__get_active_services(start_date.date())
+        best_arrivals = np.full(len(self.stop_ids), UNREACHED, dtype=np.int64)
+        access_stops, access_times = self.__get_stops_nearby(longitude, latitude)
+        best_arrivals[access_stops] = departure + access_times
+        marked_stops = set(access_stops.tolist())
+
+        for _ in range(MAX_NUMBER_OF_TRANSFERS + 1):
+            routes = {}  # the route and the first index of a marked stop on it
+            for stop in marked_stops:
+                for route, index in self._stop_routes[stop]:
+                    routes[route] = min(index, routes.get(route, index))
+            previous_arrivals = best_arrivals.copy()
+            marked_stops = set()
+
+            for route, first_index in routes.items():
+                route_stops = self._route_stops[route][first_index:]
+                arrivals = self._route_arrivals[route][:, first_index:]
+                departures = self._route_departures[route][:, first_index:]
+                is_active = active_services[self._route_services[route]]
+                # a trip can be boarded at a stop reached in the previous round before it departs there and ...
+                previous_route_arrivals = previous_arrivals[route_stops]
+                is_boardable = (
+                    is_active[:, np.newaxis]
+                    & (previous_route_arrivals < UNREACHED)
+                    & (departures >= previous_route_arrivals)
+                )
+                # ... taken to any later stop, the earliest of these arrivals is the best one (of any trip)
+                is_on_board = np.logical_or.accumulate(is_boardable, axis=1)[:, :-1]
+                route_arrivals = np.min(np.where(is_on_board, arrivals[:, 1:], UNREACHED), axis=0, initial=UNREACHED)
+                route_stops = route_stops[1:]
+                improved = route_arrivals < best_arrivals[route_stops]
+                np.minimum.at(best_arrivals, route_stops[improved], route_arrivals[improved])
+                marked_stops.update(route_stops[improved].tolist())
+
+            for stop in list(marked_stops):
+                start, end = self._transfer_offsets[stop], self._transfer_offsets[stop + 1]
+                targets = self._transfer_targets[start:end]
+                arrivals = best_arrivals[stop] + self._transfer_times[start:end]
+                improved = arrivals < best_arrivals[targets]
+                best_arrivals[targets[improved]] = arrivals[improved]
+                marked_stops.update(targets[improved].tolist())
+
+            if not marked_stops:
+                break
+        return best_arrivals
+
+    def __get_journey_from_arrivals(
+        self, arrivals: np.ndarray, origin: dict, destination: dict, start_date: datetime.datetime
+    ) -> dict:
+        """Gets the journey to a destination from the arrivals at all stops (of a routing run from the origin).
+        The destination is reached by walking from the stops nearby or, if close enough, directly from the origin.
+
+        Args:
+            arrivals (np.ndarray): the earliest arrival at each stop (see `get_arrivals`)
+            origin (dict): json dict with origin(/start) location information
+            destination (dict): json dict with destination location information
+            start_date (datetime.datetime): start date and time of the journey
+
+        Returns:
+            dict: the journey
+        """
+        departure = self.__get_seconds_since_midnight(start_date)
+        egress_stops, egress_times = self.__get_stops_nearby(destination["longitude"], destination["latitude"])
+        arrival = UNREACHED
+        if egress_stops.size:
+            reached = arrivals[egress_stops] < UNREACHED
+            if reached.any():
+                arrival = int((arrivals[egress_stops][reached] + egress_times[reached]).min())
+        walking_time = self.__get_walking_times(
+            np.array([[float(origin["longitude"]), float(origin["latitude"])]]),
+            float(destination["longitude"]),
+            float(destination["latitude"]),
+        )[0]
+        if walking_time <= MAX_WALKING_DISTANCE_IN_METERS / WALKING_SPEED_IN_METERS_PER_SEC:
+            arrival = min(arrival, departure + int(walking_time))
+
+        journey = {
+            "origin": {"longitude": origin["longitude"], "latitude": origin["latitude"]},
+            "destination": {"longitude": float(destination["longitude"]), "latitude": float(destination["latitude"])},
+        }
+        if arrival == UNREACHED:  # a missing station close to the origin is no property of the destination
+            journey |= {
+                "arrivalTime": None,
+                "stopovers": None,
+                "noConnectionFound": bool(egress_stops.size),
+                "noStationFoundNearby": not egress_stops.size,
+            }
+            return journey
+        arrival_time = datetime.datetime.combine(start_date.date(), datetime.time()) + datetime.timedelta(
+            seconds=arrival
+        )
+        journey |= {
+            "arrivalTime": arrival_time.strftime("%H%M%S"),
+            "stopovers": [],
+            "duration": round((arrival - departure) / 60),  # in minutes
+        }
+        return journey
+
+    async def __route(self, origin: dict, start_date: datetime.datetime) -> np.ndarray:
+        """Runs the routing for an origin in a thread (keeping the event loop responsive) and tracks it
+        in the statistics of the requester
+
+        Args:
+            origin (dict): json dict with origin(/start) location information
+            start_date (datetime.datetime): start date and time of the journeys
+
+        Returns:
+            np.ndarray: the earliest arrival at each stop (see `get_arrivals`)
+        """
+        start_time = self.statistics.start_request()
+        try:
+            arrivals = await asyncio.to_thread(
+                self.get_arrivals, float(origin["longitude"]), float(origin["latitude"]), start_date
+            )
+        except Exception:
+            self.statistics.finish_request(start_time, has_failed=True)
+            raise
+        self.statistics.finish_request(start_time, has_failed=False)
+        return arrivals
+
+    @staticmethod
+    def __get_seconds_since_midnight(date: datetime.datetime) -> int:
+        """Gets the time of a date in seconds since midnight
+
+        Args:
+            date (datetime.datetime): the date
+
+        Returns:
+            int: the seconds since midnight
+        """
+        return date.hour * 3600 + date.minute * 60 + date.second
+
+    def __project(self, coordinates: np.ndarray) -> np.ndarray:
+        """Projects coordinates (longitude, latitude) to a plane in meters (equirectangular, good enough for a city)
+
+        Args:
+            coordinates (np.ndarray): the coordinates (shape: (n, 2))
+
+        Returns:
+            np.ndarray: the projected coordinates in meters (shape: (n, 2))
+        """
+        scale = np.array([METERS_PER_DEGREE * np.cos(np.radians(self._reference_latitude)), METERS_PER_DEGREE])
+        return np.asarray(coordinates, dtype=np.float64) * scale
+
+    def __get_walking_times(self, coordinates: np.ndarray, longitude: float, latitude: float) -> np.ndarray:
+        """Computes the walking times (beeline) from a location to several coordinates
+
+        Args:
+            coordinates (np.ndarray): the coordinates (shape: (n, 2))
+            longitude (float): longitude of the location
+            latitude (float): latitude of the location
+
+        Returns:
+            np.ndarray: the walking times in seconds
+        """
+        distances = np.linalg.norm(
+            self.__project(coordinates) - self.__project(np.array([[longitude, latitude]])), axis=1
+        )
+        return np.ceil(distances / WALKING_SPEED_IN_METERS_PER_SEC).astype(np.int64)
+
+    def __get_stops_nearby(self, longitude: float, latitude: float) -> tuple[np.ndarray, np.ndarray]:
+        """Gets the stops within walking distance of a location
+
+        Args:
+            longitude (float): longitude of the location
+            latitude (float): latitude of the location
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: the stops and the walking times to them (in seconds)
+        """
+        location = self.__project(np.array([[float(longitude), float(latitude)]]))[0]
+        stops = np.array(self._stop_tree.query_ball_point(location, MAX_WALKING_DISTANCE_IN_METERS), dtype=np.int64)
+        return stops, self.__get_walking_times(self.stop_coordinates[stops], float(longitude), float(latitude))
+
+    def __get_active_services(self, date: datetime.date) -> np.ndarray:
+        """Gets the services which operate on a date (according to the calendar and its exceptions)
+
+        Args:
+            date (datetime.date): the date
+
+        Returns:
+            np.ndarray: if each service operates on the date
+        """
+        if date not in self._active_services:
+            if not self._has_calendar:
+                is_active = np.ones(len(self._service_ids), dtype=bool)
+            else:
+                day = int(date.strftime("%Y%m%d"))
+                is_active = (
+                    self._service_weekdays[:, date.weekday()]
+                    & (self._service_periods[:, 0] <= day)
+                    & (day <= self._service_periods[:, 1])
+                )
+                for service, exception_type in self._service_exceptions.get(day, []):
+                    is_active[service] = exception_type == 1  # 1: service added, 2: service removed
+            self._active_services[date] = is_active
+        return self._active_services[date]
+
+    def _load_stops(self) -> None:
+        """Loads the stops and computes the footpaths between stops within walking distance
+
+        Raises:
+            ValueError: if the feed does not contain any stops
+        """
+        stops = [stop for stop in read_gtfs_table(self.path, "stops") if stop.get("stop_lat") and stop.get("stop_lon")]
+        if not stops:
+            raise ValueError(f"The GTFS feed does not contain any stops. You provided: {self.path}")
+        self.stop_ids = [stop["stop_id"] for stop in stops]
+        self.stop_names = [stop.get("stop_name") or None for stop in stops]
+        self.stop_coordinates = np.array([[float(stop["stop_lon"]), float(stop["stop_lat"])] for stop in stops])
+        self._stop_index = {stop_id: index for index, stop_id in enumerate(self.stop_ids)}
+        self._reference_latitude = float(self.stop_coordinates[:, 1].mean())
+        projected_stops = self.__project(self.stop_coordinates)
+        self._stop_tree = cKDTree(projected_stops)
+
+        pairs = self._stop_tree.query_pairs(MAX_WALKING_DISTANCE_IN_METERS, output_type="ndarray")
+        pairs = np.concatenate([pairs, pairs[:, ::-1]]).astype(np.int64)  # footpaths in both directions
+        pairs = pairs[np.argsort(pairs[:, 0], kind="stable")]
+        distances = np.linalg.norm(projected_stops[pairs[:, 0]] - projected_stops[pairs[:, 1]], axis=1)
+        self._transfer_targets = pairs[:, 1]
+        self._transfer_times = np.ceil(distances / WALKING_SPEED_IN_METERS_PER_SEC).astype(np.int64)
+        self._transfer_offsets = np.searchsorted(pairs[:, 0], np.arange(len(self.stop_ids) + 1))
+
+    def _load_services(self) -> None:
+        """Loads the services with their operating weekdays, periods and exceptions"""
+        calendar = read_gtfs_table(self.path, "calendar")
+        calendar_dates = read_gtfs_table(self.path, "calendar_dates")
+        self._has_calendar = bool(calendar or calendar_dates)
+        service_ids = {row["service_id"] for row in calendar} | {row["service_id"] for row in calendar_dates}
+        service_ids |= {trip["service_id"] for trip in read_gtfs_table(self.path, "trips")}
+        self._service_ids = sorted(service_ids)
+        self._service_index = {service_id: index for index, service_id in enumerate(self._service_ids)}
+
+        weekdays = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+        self._service_weekdays = np.zeros((len(self._service_ids), 7), dtype=bool)
+        self._service_periods = np.zeros((len(self._service_ids), 2), dtype=np.int64)  # empty periods by default
+        for row in calendar:
+            service = self._service_index[row["service_id"]]
+            self._service_weekdays[service] = [row[weekday] == "1" for weekday in weekdays]
+            self._service_periods[service] = [int(row["start_date"]), int(row["end_date"])]
+        self._service_exceptions: dict[int, list[tuple[int, int]]] = defaultdict(list)
+        for row in calendar_dates:
+            self._service_exceptions[int(row["date"])].append(
+                (self._service_index[row["service_id"]], int(row["exception_type"]))
+            )
+
+    def _load_routes(self) -> None:
+        """Loads the trips and groups them into routes. In the sense of RAPTOR, a route consists of all trips
+        serving exactly the same sequence of stops. Per route, the arrival and departure times are stored
+        as matrices (trips x stops) with the trips sorted by their departure."""
+        trips = read_gtfs_table(self.path, "trips")
+        trip_indices = {trip["trip_id"]: index for index, trip in enumerate(trips)}
+        trip_services = [self._service_index[trip["service_id"]] for trip in trips]
+        stop_times = read_gtfs_stop_times(self.path, trip_indices, self._stop_index)
+        stop_times = stop_times[np.lexsort((stop_times[:, 2], stop_times[:, 0]))]  # by trip, then by stop sequence
+
+        route_trips = defaultdict(list)
+        for trip_stop_times in np.split(stop_times, np.flatnonzero(np.diff(stop_times[:, 0])) + 1):
+            if len(trip_stop_times) < 2 or (trip_stop_times[:, 3] < 0).any():
+                continue  # trips without times at all of their stops (which would need interpolation) are skipped
+            route_trips[tuple(trip_stop_times[:, 1].tolist())].append(
+                (
+                    trip_stop_times[:, 4].tolist(),
+                    trip_stop_times[:, 3].tolist(),
+                    trip_services[trip_stop_times[0, 0]],
+                )
+            )
+
+        self._route_stops: list[np.ndarray] = []
+        self._route_arrivals: list[np.ndarray] = []
+        self._route_departures: list[np.ndarray] = []
+        self._route_services: list[np.ndarray] = []
+        self._stop_routes: list[list[tuple[int, int]]] = [[] for _ in self.stop_ids]
+        for route, (stops, trips) in enumerate(route_trips.items()):
+            trips.sort()
+            self._route_stops.append(np.array(stops, dtype=np.int64))
+            self._route_departures.append(np.array([departures for departures, _, _ in trips], dtype=np.int64))
+            self._route_arrivals.append(np.array([arrivals for _, arrivals, _ in trips], dtype=np.int64))
+            self._route_services.append(np.array([service for _, _, service in trips], dtype=np.int64))
+            for index, stop in enumerate(stops):
+                self._stop_routes[stop].append((route, index))
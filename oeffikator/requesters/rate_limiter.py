@@ -0,0 +1,105 @@
+"""This module includes the non-blocking rate limiter for the requesters."""
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from oeffikator.requesters import RATE_LIMIT_PERIOD_IN_SECS
+
+
+class TokenBucket:
+    """An asynchronous token bucket. It holds up to `rate` tokens which are refilled continously
+    within one period. Each request consumes one token; if none is left, the caller awaits the next one
+    without blocking the event loop.
+
+    Attributes:
+        rate (float): the number of requests tolerated per period (which is also the maximum number of tokens)
+        period (float): the period (in seconds) in which the bucket refills completly
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        period: float = RATE_LIMIT_PERIOD_IN_SECS,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable] = asyncio.sleep,
+    ) -> None:
+        """
+        Args:
+            rate (float): the number of requests tolerated per period
+            period (float): the period (in seconds) in which the bucket refills completly
+            clock (Callable[[], float]): the monotonic clock (in seconds) the tokens are refilled by
+            sleep (Callable[[float], Awaitable]): the function to wait (asynchronously) for the next token with
+
+        Raises:
+            ValueError: if the period is not positive
+        """
+        if period <= 0:
+            raise ValueError(f"The period of the token bucket needs to be positive. You provided: {period}")
+        self.rate = rate
+        self.period = period
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(rate)
+        self._last_refill = clock()
+        self._lock = asyncio.Lock()
+
+    @property
+    def capacity(self) -> float:
+        """The number of tokens (=requests) currently available without waiting.
+
+        Returns:
+            float: the current number of tokens
+        """
+        self._refill()
+        return self._tokens
+
+    def has_capacity(self) -> bool:
+        """Checks if at least one request could be sent right now
+
+        Returns:
+            bool: true, if a token is available
+        """
+        return self.capacity >= 1
+
+    def get_waiting_time(self) -> float:
+        """Computes how long one has to wait until the next token is available
+
+        Returns:
+            float: the waiting time in seconds (infinite if no requests are tolerated at all)
+        """
+        if self.capacity >= 1:
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (1 - self._tokens) * self.period / self.rate
+
+    def try_acquire(self) -> bool:
+        """Consumes a token if one is available right now
+
+        Returns:
+            bool: true, if a token was consumed
+        """
+        if not self.has_capacity():
+            return False
+        self._tokens -= 1
+        return True
+
+    async def acquire(self) -> None:
+        """Waits (asynchronously) until a token is available and consumes it
+
+        Raises:
+            ValueError: if the bucket does not tolerate any requests (rate of 0)
+        """
+        async with self._lock:
+            while not self.try_acquire():
+                waiting_time = self.get_waiting_time()
+                if waiting_time == float("inf"):
+                    raise ValueError("The token bucket does not tolerate any requests (rate <= 0).")
+                await self._sleep(waiting_time)
+
+    def _refill(self) -> None:
+        """Adds the tokens which were regained since the last refill (but never more than the rate)."""
+        now = self._clock()
+        regained_tokens = (now - self._last_refill) * self.rate / self.period
+        self._tokens = max(0.0, min(float(self.rate), self._tokens + regained_tokens))
+        self._last_refill = now
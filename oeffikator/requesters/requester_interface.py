@@ -1,22 +1,42 @@
 """This module includes interface which defines the broad structure for the to be implemented requesters."""
+import asyncio
 import datetime
+import random
 from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
-from aiohttp import ClientSession
+from aiohttp import ClientError, ClientResponse, ClientSession, TCPConnector
 
-from oeffikator.requesters import CHECK_FOR_REQUESTER_AVAILABILITY_IN_SECS, RESPONSE_TIMEOUT
+from oeffikator.requesters import (
+    ATTEMPT_TIMEOUT,
+    BACKOFF_BASE_IN_SECS,
+    BACKOFF_MAX_IN_SECS,
+    CONNECTION_LIMIT,
+    CONNECTION_LIMIT_PER_HOST,
+    DNS_CACHE_TTL_IN_SECS,
+    MAX_ATTEMPTS,
+    RESPONSE_TIMEOUT,
+)
+from oeffikator.requesters.circuit_breaker import CircuitBreaker, RequesterResponseError, RequesterUnavailableError
+from oeffikator.requesters.concurrency_limiter import ConcurrencyLimiter
+from oeffikator.requesters.rate_limiter import TokenBucket
+from oeffikator.requesters.requester_statistics import RequesterStatistics
 
 
 class RequesterInterface(ABC):
     """This interface defines the basic structure for requesters
     which can query data from public transport companies."""
 
+    supports_geocoding = True  # if the requester implements `query_location`
+    supports_reachable_stops = False  # if the requester implements `get_reachable_stops`
+
     def __init__(self) -> None:
-        self.past_requests = []
-        self.last_responding_check = datetime.datetime.now() - datetime.timedelta(
-            seconds=CHECK_FOR_REQUESTER_AVAILABILITY_IN_SECS
-        )
-        self._is_responding = False
+        self.rate_limiter = TokenBucket(self.request_rate)
+        self.statistics = RequesterStatistics()
+        self.circuit_breaker = CircuitBreaker()
+        self.concurrency_limiter = ConcurrencyLimiter()
+        self._session: ClientSession | None = None
 
     @property
     def request_rate(self) -> str:
@@ -30,6 +50,15 @@ class RequesterInterface(ABC):
         """
         raise NotImplementedError
 
+    @property
+    def name(self) -> str:
+        """A name to identify the requester, e.g. in logs and statistics
+
+        Returns:
+            str: the name of the requester
+        """
+        return type(self).__name__
+
     @abstractmethod
     async def query_location(self, query: str, amount_of_results: int) -> dict:
         """A method which queries the location given a input string (e.g. 'Brandenburger Tor').
@@ -59,6 +88,88 @@ class RequesterInterface(ABC):
             dict: a json with journes information, including most importantly the time, how lang a trip takes
         """
 
+    async def get_journeys(
+        self, origin: dict, destinations: list[dict], start_date: datetime, amount_of_results: int = 1
+    ) -> list[dict | Exception]:
+        """A method which queries the journeys from one origin to several destinations.
+        By default, the journeys are queried one by one (the number of concurrent requests is bounded
+        by the concurrency limiter). Requesters which are able to batch journeys natively should override it.
+
+        Args:
+            origin (dict): json dict with origin(/start) location information
+            destinations (list[dict]): json dicts with destination location information
+            start_date (datetime): start date and time when the journeys should take place
+            amount_of_results (int): the number of results which should be returned, usually 1
+
+        Returns:
+            list[dict | Exception]: the journeys in the order of the destinations,
+            the error instead of the journey if a single query failed
+        """
+        return await asyncio.gather(
+            *(self.get_journey(origin, destination, start_date, amount_of_results) for destination in destinations),
+            return_exceptions=True,
+        )
+
+    async def get_reachable_stops(self, origin: dict, max_duration: int, start_date: datetime) -> list[dict]:
+        """An optional method which queries all stops reachable from the origin within the maximum duration
+        (an isochrone) with a single request. Only available if `supports_reachable_stops` is set.
+
+        Args:
+            origin (dict): json dict with origin(/start) location information
+            max_duration (int): the maximum duration (in minutes) to reach a stop
+            start_date (datetime): start date and time when the journeys should take place
+
+        Raises:
+            NotImplementedError: if the requester does not support the query
+
+        Returns:
+            list[dict]: the reachable stops with longitude, latitude, name and duration (in minutes)
+        """
+        raise NotImplementedError(f"{self.name} does not support querying reachable stops.")
+
+    async def open_session(
+        self,
+        connection_limit: int = CONNECTION_LIMIT,
+        connection_limit_per_host: int = CONNECTION_LIMIT_PER_HOST,
+        dns_cache_ttl: int = DNS_CACHE_TTL_IN_SECS,
+    ) -> None:
+        """Opens a pooled, long-lived session which is reused for all following requests (keeping connections alive).
+        Should be called once the event loop is running, e.g. on app startup.
+
+        Args:
+            connection_limit (int): maximum number of simultaneously open connections
+            connection_limit_per_host (int): maximum number of simultaneously open connections to the same host
+            dns_cache_ttl (int): time (in seconds) resolved host names are cached
+        """
+        if self._session is not None and not self._session.closed:
+            return
+        connector = TCPConnector(
+            limit=connection_limit,
+            limit_per_host=connection_limit_per_host,
+            ttl_dns_cache=dns_cache_ttl,
+        )
+        self._session = ClientSession(connector=connector, timeout=RESPONSE_TIMEOUT)
+
+    async def close_session(self) -> None:
+        """Closes the pooled session (if opened), e.g. on app shutdown."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @asynccontextmanager
+    async def _get_session(self) -> AsyncIterator[ClientSession]:
+        """Provides the pooled session. If it was not opened (e.g. when used outside of the app),
+        a short-lived session is created for the single request instead.
+
+        Yields:
+            ClientSession: session to send the request with
+        """
+        if self._session is not None and not self._session.closed:
+            yield self._session
+        else:
+            async with ClientSession(timeout=RESPONSE_TIMEOUT) as session:
+                yield session
+
     async def get(self, url: str, params: tuple[tuple[str, str]]) -> dict:
         """Method to for "GET"
 
@@ -69,9 +180,7 @@ class RequesterInterface(ABC):
         Returns:
             dict: get respondse
         """
-        async with ClientSession(timeout=RESPONSE_TIMEOUT) as session:
-            async with session.get(url, params=params) as response:
-                return await response.json(content_type=None)
+        return await self._request("GET", url, params=params)
 
     async def post(self, url: str, data: str, headers: dict[str, str]) -> dict:
         """Method to for "POST"
@@ -84,39 +193,128 @@ class RequesterInterface(ABC):
         Returns:
             dict: post response
         """
-        async with ClientSession(timeout=RESPONSE_TIMEOUT) as session:
-            async with session.post(url, data=data, headers=headers) as response:
-                return await response.json(content_type=None)
+        return await self._request("POST", url, data=data, headers=headers)
 
-    def has_reached_request_limit(self) -> bool:
-        """Checks if the requester has reached it request limit per minute
+    async def _request(self, method: str, url: str, **kwargs) -> dict:
+        """Sends a request once the rate limit and the concurrency window allow it and keeps track of its latency
+        and outcome.
+        Failed attempts (connection errors, timeouts, 429 or 5xx responses or invalid json) are retried with a jittered
+        exponential backoff, as long as the circuit breaker lets them pass. The status is checked before the response
+        is parsed, so that e.g. an html error page of a 503 counts as overload.
+
+        Args:
+            method (str): the http method, e.g. "GET"
+            url (str): the url to send the request to
+            kwargs: additional arguments of the request (e.g. params, data or headers)
+
+        Raises:
+            RequesterUnavailableError: if the circuit breaker is open or all attempts failed
+            RequesterResponseError: if the api responded with an error status other than 429 or 5xx (not retried)
 
         Returns:
-            bool: true, if limit is reached, else false
+            dict: the response (as json)
         """
-        while self.past_requests and datetime.datetime.now() - self.past_requests[0]["time"] > datetime.timedelta(
-            seconds=60
-        ):
-            self.past_requests.pop(0)
-        return len(self.past_requests) > self.request_rate
+        last_error = None
+        for attempt in range(MAX_ATTEMPTS):
+            if attempt > 0:
+                await asyncio.sleep(random.uniform(0, min(BACKOFF_MAX_IN_SECS, BACKOFF_BASE_IN_SECS * 2**attempt)))
+            if self.circuit_breaker.is_available():  # do not use up the request budget if failing fast anyway
+                await self.rate_limiter.acquire()
+            if not self.circuit_breaker.allow_request():
+                raise RequesterUnavailableError(f"The circuit breaker of {self.name} is open.") from last_error
+            try:
+                limiter_start_time = await self.concurrency_limiter.acquire()
+            except BaseException:  # e.g. cancelled while waiting, a probe would block the circuit breaker otherwise
+                self.circuit_breaker.release_probe()
+                raise
+            start_time = self.statistics.start_request()
+            has_failed = True
+            is_overloaded = False
+            try:
+                async with self._get_session() as session:
+                    async with session.request(method, url, timeout=ATTEMPT_TIMEOUT, **kwargs) as response:
+                        if response.status == 429 or response.status >= 500:
+                            raise RequesterUnavailableError(f"{self.name} responded with status {response.status}")
+                        if response.status >= 400:
+                            raise RequesterResponseError(
+                                f"{self.name} responded with status {response.status}",
+                                response.status,
+                                await self.__parse_error_body(response),
+                            )
+                        content = await response.json(content_type=None)
+                        has_failed = False
+                        self.circuit_breaker.record_success()
+                        return content
+            except RequesterResponseError:  # a retry would not change the response
+                self.circuit_breaker.record_failure()
+                raise
+            except (ClientError, asyncio.TimeoutError, ValueError, RequesterUnavailableError) as error:
+                self.circuit_breaker.record_failure()
+                # timeouts, 429 and 5xx responses (raised as RequesterUnavailableError) indicate an overloaded api
+                is_overloaded = isinstance(error, (asyncio.TimeoutError, RequesterUnavailableError))
+                last_error = error
+            finally:
+                self.circuit_breaker.release_probe()  # if neither success nor failure were recorded (e.g. cancelled)
+                self.statistics.finish_request(start_time, has_failed)
+                await self.concurrency_limiter.release(limiter_start_time, has_failed, is_overloaded)
+        raise RequesterUnavailableError(f"{self.name} failed to respond after {MAX_ATTEMPTS} attempts.") from last_error
 
-    def is_responding(self) -> bool:
-        """A method to check if the requesters receives responses from the api.
+    @staticmethod
+    async def __parse_error_body(response: ClientResponse) -> dict | list | None:
+        """Parses the body of an error response, which apis may use to explain the error
+
+        Args:
+            response (ClientResponse): the error response
 
         Returns:
-            bool: true, if the api is responding
+            dict | list | None: the body (as json), None if it is no json
         """
-        if (
-            datetime.datetime.now() - self.last_responding_check
-        ).total_seconds() >= CHECK_FOR_REQUESTER_AVAILABILITY_IN_SECS:
-            self.last_responding_check = datetime.datetime.now()
-            self._is_responding = self._check_response()
-        return self._is_responding
+        try:
+            return await response.json(content_type=None)
+        except ValueError:
+            return None
 
-    @abstractmethod
-    def _check_response(self) -> bool:
-        """A method to check if the requesters receives responses from the api.
+    def get_routing_weight(self) -> float:
+        """The weight of the requester for load balancing: the higher, the better suited for the next request.
+        It prefers requesters with remaining request budget, a low latency, few requests in flight and few errors.
+
+        Returns:
+            float: the routing weight (not negative)
+        """
+        if self.rate_limiter.rate <= 0:
+            return 0.0
+        remaining_budget = self.rate_limiter.capacity / self.rate_limiter.rate
+        queued_requests = self.statistics.in_flight + self.concurrency_limiter.waiting
+        expected_latency = self.statistics.average_latency * (queued_requests + 1)
+        return remaining_budget * (1 - self.statistics.error_rate) / max(expected_latency, 1e-3)
+
+    def get_statistics(self) -> dict:
+        """Get the current statistics of the requester
+
+        Returns:
+            dict: the statistics, including the request capacity
+        """
+        return {
+            "requester": self.name,
+            "request_capacity": self.rate_limiter.capacity,
+            "circuit_state": self.circuit_breaker.state.value,
+            **self.statistics.as_dict(),
+            **self.concurrency_limiter.as_dict(),
+        }
+
+    def has_reached_request_limit(self) -> bool:
+        """Checks if the requester has reached it request limit per minute
+
+        Returns:
+            bool: true, if limit is reached, else false
+        """
+        return not self.rate_limiter.has_capacity()
+
+    def is_responding(self) -> bool:
+        """A method to check if the requesters receives responses from the api,
+        i.e. if its circuit breaker lets requests pass (probe requests included).
 
         Returns:
             bool: true, if the api is responding
         """
+        return self.circuit_breaker.is_available()
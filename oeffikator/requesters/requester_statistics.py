@@ -0,0 +1,72 @@
+"""This module includes the statistics a requester keeps about its own requests (used for load balancing)."""
+import time
+
+from oeffikator.requesters import DEFAULT_LATENCY_IN_SECS, STATISTICS_SMOOTHING_FACTOR
+
+
+class RequesterStatistics:
+    """Keeps track of the requests of a single requester: how many are in flight right now,
+    the moving average of the latency and the moving average of the error rate.
+
+    Attributes:
+        in_flight (int): the number of requests which are currently awaiting their response
+        average_latency (float): exponential moving average of the latency (in seconds)
+        error_rate (float): exponential moving average of failed requests (between 0 and 1)
+        number_of_requests (int): the total number of finished requests
+        number_of_errors (int): the total number of failed requests
+    """
+
+    def __init__(self, smoothing_factor: float = STATISTICS_SMOOTHING_FACTOR) -> None:
+        """
+        Args:
+            smoothing_factor (float): the weight of the newest observation in the moving averages
+
+        Raises:
+            ValueError: if the smoothing factor is not within (0, 1]
+        """
+        if not 0 < smoothing_factor <= 1:
+            raise ValueError(f"The smoothing factor needs to be within (0, 1]. You provided: {smoothing_factor}")
+        self.smoothing_factor = smoothing_factor
+        self.in_flight = 0
+        self.average_latency = DEFAULT_LATENCY_IN_SECS
+        self.error_rate = 0.0
+        self.number_of_requests = 0
+        self.number_of_errors = 0
+
+    def start_request(self) -> float:
+        """Registers a request which is about to be sent
+
+        Returns:
+            float: the start time of the request, to be passed to `finish_request`
+        """
+        self.in_flight += 1
+        return time.monotonic()
+
+    def finish_request(self, start_time: float, has_failed: bool) -> None:
+        """Registers a request which received its response (or failed)
+
+        Args:
+            start_time (float): the start time returned by `start_request`
+            has_failed (bool): if the request failed
+        """
+        latency = time.monotonic() - start_time
+        self.in_flight -= 1
+        self.number_of_requests += 1
+        self.number_of_errors += int(has_failed)
+        if not has_failed:  # failures are mostly timeouts or refused connections, their latency is not representative
+            self.average_latency += self.smoothing_factor * (latency - self.average_latency)
+        self.error_rate += self.smoothing_factor * (float(has_failed) - self.error_rate)
+
+    def as_dict(self) -> dict:
+        """The statistics as dictionary (e.g. for an api response)
+
+        Returns:
+            dict: the statistics
+        """
+        return {
+            "in_flight": self.in_flight,
+            "average_latency": self.average_latency,
+            "error_rate": self.error_rate,
+            "number_of_requests": self.number_of_requests,
+            "number_of_errors": self.number_of_errors,
+        }
@@ -1,88 +1,270 @@
 """Module which combines everything connected to the requesters"""
 import datetime
-import time
+from typing import Awaitable, Callable
 
-from shapely import from_wkt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from oeffikator import TRAVELLING_DAYTIME
+from oeffikator.requesters.circuit_breaker import RequesterUnavailableError
 from oeffikator.requesters.requester_interface import RequesterInterface
 
-from . import REQUESTERS, logger
+from . import GEOCODE_CACHE, JOURNEY_CACHE, REQUESTERS, logger, settings
 from .sql_app import crud, models, schemas
 
 # pylint: disable-msg=W0511
 
 
-async def get_requester() -> RequesterInterface:
-    """Simple function to get an available requester (=one which hasn't reached its request limit yet)
+async def get_requester(excluded_requesters: list[RequesterInterface] | None = None) -> RequesterInterface:
+    """Simple function to get the best suited requester for the next request. Only responding requesters
+    (=whose circuit breaker is not open) are considered. Among those with capacity left
+    (=which haven't reached their request limit yet), the one with the highest routing weight is chosen
+    (considering its remaining request budget, latency, requests in flight and error rate).
+    If all requesters reached their limit, the one which regains capacity first is returned.
+    Its requests then wait (without blocking) for a free slot.
+
+    Args:
+        excluded_requesters (list[RequesterInterface] | None): requesters which shall not be used (e.g. failed before)
 
     Raises:
-        ModuleNotFoundError: raises if no requester is available
-        (most probably because all have reached their request limit)
+        RequesterUnavailableError: raises if no requester is available at all
 
     Returns:
         RequesterInterface: an available requester
     """
-    available_requester = None
-    for _ in range(12):
-        for requester in REQUESTERS:
-            if not requester.has_reached_request_limit():
-                available_requester = requester
-                break
-        if available_requester is None:
-            logger.info("No requester seems to be avialble. Waiting a little bit ...")
-            time.sleep(5)
-    if available_requester is None:
-        raise ValueError("No requesters are available at the moment.")
-    return available_requester
-
-
-async def request_location(location_description: str, database: Session) -> schemas.LocationCreate:
-    """A function for querying location address, coordinates, etc. for given description
+    excluded_requesters = excluded_requesters or []
+    responding_requesters = [
+        requester for requester in REQUESTERS if requester.is_responding() and requester not in excluded_requesters
+    ]
+    if not responding_requesters:
+        raise RequesterUnavailableError("No requesters are available at the moment.")
+    available_requesters = [
+        requester for requester in responding_requesters if not requester.has_reached_request_limit()
+    ]
+    if not available_requesters:
+        logger.info("All requesters reached their request limit. Waiting for the next free slot ...")
+        return min(responding_requesters, key=lambda requester: requester.rate_limiter.get_waiting_time())
+    return max(available_requesters, key=lambda requester: requester.get_routing_weight())
+
+
+async def query_with_failover(
+    query: Callable[[RequesterInterface], Awaitable[dict | list]],
+    excluded_requesters: list[RequesterInterface] | None = None,
+) -> dict | list:
+    """Sends a query to the best suited requester. If this requester is unavailable,
+    the query fails over to the next requester until none is left.
+
+    Args:
+        query (Callable[[RequesterInterface], Awaitable[dict | list]]): the query to send with a given requester
+        excluded_requesters (list[RequesterInterface] | None): requesters which shall not be used
+        (e.g. which do not support the query)
+
+    Raises:
+        RequesterUnavailableError: if none of the requesters was able to answer the query
+
+    Returns:
+        dict | list: the response of the requester
+    """
+    failed_requesters = list(excluded_requesters or [])
+    while True:
+        requester = await get_requester(failed_requesters)
+        try:
+            return await query(requester)
+        except RequesterUnavailableError as error:
+            logger.info("Requester %s is unavailable (%s). Trying the next one ...", requester.name, error)
+            failed_requesters.append(requester)
+
+
+async def query_journeys_with_failover(
+    origin: dict, destinations: list[dict], start_date: datetime.datetime
+) -> list[dict | Exception]:
+    """Queries the journeys to several destinations in bulk. Bulk queries report an unavailable requester
+    per journey instead of raising, so the journeys which failed this way are retried with the next requester
+    until none is left.
+
+    Args:
+        origin (dict): json dict with origin(/start) location information
+        destinations (list[dict]): json dicts with destination location information
+        start_date (datetime.datetime): start date and time when the journeys should take place
+
+    Raises:
+        RequesterUnavailableError: if none of the requesters was able to answer any of the journeys
+
+    Returns:
+        list[dict | Exception]: the journeys in the order of the destinations,
+        the error instead of the journey if a single query failed
+    """
+    no_requester_error = RequesterUnavailableError("No requesters are available at the moment.")
+    journeys: list[dict | Exception] = [no_requester_error] * len(destinations)
+    pending_indices = list(range(len(destinations)))
+    failed_requesters = []
+    while pending_indices:
+        try:
+            requester = await get_requester(failed_requesters)
+        except RequesterUnavailableError:
+            if all(isinstance(journey, RequesterUnavailableError) for journey in journeys):
+                raise
+            break
+        try:
+            requested_journeys = await requester.get_journeys(
+                origin, [destinations[index] for index in pending_indices], start_date
+            )
+        except RequesterUnavailableError as error:
+            logger.info("Requester %s is unavailable (%s). Trying the next one ...", requester.name, error)
+            failed_requesters.append(requester)
+            continue
+        for index, journey in zip(pending_indices, requested_journeys):
+            journeys[index] = journey
+        pending_indices = [index for index in pending_indices if isinstance(journeys[index], RequesterUnavailableError)]
+        if pending_indices:
+            logger.info(
+                "Requester %s is unavailable for %d journeys. Trying the next one ...",
+                requester.name,
+                len(pending_indices),
+            )
+            failed_requesters.append(requester)
+    return journeys
+
+
+def get_request_capacity() -> int:
+    """Get the number of requests which can be sent right now over all requesters without waiting
+
+    Returns:
+        int: the number of available requests
+    """
+    return int(sum(requester.rate_limiter.capacity for requester in REQUESTERS))
+
+
+async def request_location(location_description: str, database: AsyncSession) -> schemas.LocationCreate:
+    """A function for querying location address, coordinates, etc. for given description.
+    Locations which were geocoded before are taken from the geocoding cache (without a request).
 
     Args:
         location_description (str): description of the location
-        database (Session): session to connected database
+        database (AsyncSession): session to connected database (the requests are registered in its transaction,
+        the caller commits them along with the created location or trips)
+
+    Raises:
+        RequesterUnavailableError: raises if no requester is available
 
     Returns:
         schemas.LocationCreate: information on the location and the corresponding request id
+        (None if taken from the cache)
     """
-    requester = await get_requester()
-    requested_location = await requester.query_location(location_description)
-    request = crud.create_request(database=database)
+    request_id = None
+    requested_location = GEOCODE_CACHE.get(location_description)
+    if requested_location is None:
+        requested_location = await query_with_failover(
+            lambda requester: requester.query_location(location_description),
+            excluded_requesters=[requester for requester in REQUESTERS if not requester.supports_geocoding],
+        )
+        GEOCODE_CACHE.set(location_description, requested_location)
+        request_id = (await crud.create_request(database=database, commit=False)).id
+    else:
+        logger.info("Location description found in geocoding cache")
     location = schemas.LocationCreate(
         address=requested_location["address"],
         geom=f"POINT({requested_location['longitude']} {requested_location['latitude']})",
-        request_id=request.id,
+        request_id=request_id,
     )
     return location
 
 
 async def request_trip(
-    origin: models.Location, destination: models.Location, database: Session
+    origin: models.Location, destination: models.Location, database: AsyncSession
 ) -> schemas.TripCreate | None:
-    """A function for querying location address, coordinates, etc. for given description
+    """A function for querying location address, coordinates, etc. for given description.
+    Journeys which were requested before (or are requested right now) for a close-by destination
+    are taken from the journey cache (without a request).
 
     Args:
         location_description (str): description of the location
-        database (Session): session to connected database
+        database (AsyncSession): session to connected database (the requests are registered in its transaction,
+        the caller commits them along with the created location or trips)
 
     Raises:
-        ModuleNotFoundError: raises if no requester is available
-        (most probably because all have reached their request limit)
+        RequesterUnavailableError: raises if no requester is available
 
     Returns:
-        schemas.TripCreate: information on the location and the corresponding request id
+        schemas.TripCreate: information on the location and the corresponding request id (None if taken from the cache)
+        as well as the stops on the way (which can be saved as additional trips)
     """
-    requester = await get_requester()
-    requested_trip = await requester.get_journey(
-        convert_location_to_requesters_dict(origin),
-        convert_location_to_requesters_dict(destination),
+    origin_dict = convert_location_to_requesters_dict(origin)
+    destination_dict = convert_location_to_requesters_dict(destination)
+    requested_trip, is_cached = await JOURNEY_CACHE.get_or_request(
+        origin_dict,
+        destination_dict,
         TRAVELLING_DAYTIME,
+        lambda: query_with_failover(
+            lambda requester: requester.get_journey(origin_dict, destination_dict, TRAVELLING_DAYTIME)
+        ),
     )
-    request = crud.create_request(database=database)
+    if is_cached:
+        logger.info("Journey found in journey cache")
+    request_id = None if is_cached else (await crud.create_request(database=database, commit=False)).id
+
+    return create_trip_from_journey(origin, destination, requested_trip, request_id)
 
+
+async def request_trips(
+    origin: models.Location, destinations: list[models.Location], database: AsyncSession
+) -> list[schemas.TripCreate | Exception]:
+    """A function for querying the trips from one origin to several destinations in bulk. The journeys which are
+    not cached are requested at once from a single requester (which may batch them natively).
+    Journeys whose requester turned out to be unavailable are retried with the next requester.
+    Single journeys may fail without failing the whole bulk.
+
+    Args:
+        origin (models.Location): the origin
+        destinations (list[models.Location]): the destinations
+        database (AsyncSession): session to connected database (the requests are registered in its transaction,
+        the caller commits them along with the created location or trips)
+
+    Raises:
+        RequesterUnavailableError: raises if no requester is available at all
+
+    Returns:
+        list[schemas.TripCreate | Exception]: per destination, information on the trip (see `request_trip`)
+        or the error if its journey could not be requested
+    """
+    origin_dict = convert_location_to_requesters_dict(origin)
+    destination_dicts = [convert_location_to_requesters_dict(destination) for destination in destinations]
+    requested_trips = await JOURNEY_CACHE.get_or_request_many(
+        origin_dict,
+        destination_dicts,
+        TRAVELLING_DAYTIME,
+        lambda missing_destinations: query_journeys_with_failover(
+            origin_dict, missing_destinations, TRAVELLING_DAYTIME
+        ),
+    )
+    number_of_requests = sum(
+        not is_cached for requested_trip, is_cached in requested_trips if not isinstance(requested_trip, Exception)
+    )
+    request_ids = iter(await crud.create_requests(database, number_of_requests, commit=False))
+    trips = []
+    for destination, (requested_trip, is_cached) in zip(destinations, requested_trips):
+        if isinstance(requested_trip, Exception):
+            trips.append(requested_trip)
+            continue
+        request_id = None if is_cached else next(request_ids)
+        trips.append(create_trip_from_journey(origin, destination, requested_trip, request_id))
+    return trips
+
+
+def create_trip_from_journey(
+    origin: models.Location, destination: models.Location, requested_trip: dict, request_id: int | None
+) -> schemas.TripCreate:
+    """Creates the trip from the journey returned by a requester
+
+    Args:
+        origin (models.Location): the origin
+        destination (models.Location): the destination
+        requested_trip (dict): the journey as returned by the requester
+        request_id (int | None): the id of the request (None if taken from the cache)
+
+    Returns:
+        schemas.TripCreate: information on the trip (duration is -1 if no journey was found)
+        as well as the stops on the way
+    """
     if (
         ("noConnectionFound" in requested_trip.keys() and requested_trip["noConnectionFound"])
         or ("noStationFoundNearby" in requested_trip.keys() and requested_trip["noStationFoundNearby"])
@@ -92,24 +274,106 @@ async def request_trip(
             duration=-1,
             origin=origin,
             destination=destination,
-            request_id=request.id,
+            request_id=request_id,
+            invalid_reason=(
+                schemas.InvalidReason.NO_STATION_NEARBY
+                if requested_trip.get("noStationFoundNearby")
+                else schemas.InvalidReason.NO_CONNECTION
+            ),
         )
         return trip
-    arrivale_time = datetime.datetime.strptime(requested_trip["arrivalTime"], "%H%M%S").time()
-    # TODO replace this hacky fix of adding one hour to the output. Why does this return an hour of difference
-    arrivale_time = datetime.datetime.combine(TRAVELLING_DAYTIME.date(), arrivale_time) + datetime.timedelta(hours=1)
-    duration = int((arrivale_time - TRAVELLING_DAYTIME).total_seconds() / 60)  # in minutes
-
+    stopovers = [
+        schemas.StopoverCreate(
+            longitude=stopover["longitude"],
+            latitude=stopover["latitude"],
+            name=stopover.get("name"),
+            duration=compute_duration(stopover["time"]),
+        )
+        for stopover in requested_trip.get("stopovers") or []
+    ]
     trip = schemas.TripCreate(
-        duration=duration,
+        # requesters which route locally know the duration, otherwise it is computed from the arrival time
+        duration=requested_trip.get("duration", compute_duration(requested_trip["arrivalTime"])),
         origin=origin,
         destination=destination,
-        request_id=request.id,
+        request_id=request_id,
+        stopovers=[stopover for stopover in stopovers if stopover.duration >= 0],
     )
 
     return trip
 
 
+async def request_reachable_stops(
+    origin: models.Location, database: AsyncSession
+) -> tuple[list[schemas.StopoverCreate], int]:
+    """A function for querying all stops which are reachable from the origin within the maximum duration
+    (see the settings) with a single request. Only requesters supporting this query are used.
+
+    Args:
+        origin (models.Location): the origin
+        database (AsyncSession): session to connected database (the requests are registered in its transaction,
+        the caller commits them along with the created location or trips)
+
+    Raises:
+        RequesterUnavailableError: raises if no requester (supporting the query) is available
+
+    Returns:
+        tuple[list[schemas.StopoverCreate], int]: the reachable stops with their duration (in minutes)
+        and the corresponding request id
+    """
+    origin_dict = convert_location_to_requesters_dict(origin)
+    reachable_stops = await query_with_failover(
+        lambda requester: requester.get_reachable_stops(
+            origin_dict, settings.reachable_stops_max_duration, TRAVELLING_DAYTIME
+        ),
+        excluded_requesters=[requester for requester in REQUESTERS if not requester.supports_reachable_stops],
+    )
+    request_id = (await crud.create_request(database=database, commit=False)).id
+    return parse_reachable_stops(reachable_stops), request_id
+
+
+def parse_reachable_stops(reachable_stops: list[dict]) -> list[schemas.StopoverCreate]:
+    """Validates the reachable stops of a requester. Malformed stops (e.g. without duration) are skipped,
+    as well as stops which are not reachable (duration -1).
+
+    Args:
+        reachable_stops (list[dict]): the reachable stops with longitude, latitude, name and duration
+
+    Raises:
+        ValueError: if the reachable stops are not a list
+
+    Returns:
+        list[schemas.StopoverCreate]: the (reachable) stops
+    """
+    if not isinstance(reachable_stops, list):
+        raise ValueError(f"The reachable stops need to be a list. Received: {type(reachable_stops).__name__}")
+    stops = []
+    for reachable_stop in reachable_stops:
+        try:
+            stop = schemas.StopoverCreate(**reachable_stop)
+        except (TypeError, ValueError) as error:  # pydantic's ValidationError is a ValueError
+            logger.warning("Skipping malformed reachable stop %s: %s", reachable_stop, error)
+            continue
+        if stop.duration >= 0:
+            stops.append(stop)
+    return stops
+
+
+def compute_duration(arrival_time: str) -> int:
+    """Compute the duration of a trip which started at the travelling daytime
+
+    Args:
+        arrival_time (str): the arrival time in the format HHMMSS (as returned by the requesters)
+
+    Returns:
+        int: the duration in minutes
+    """
+    arrivale_time = datetime.datetime.strptime(arrival_time, "%H%M%S").time()
+    # TODO replace this hacky fix of adding one hour to the output. Why does this return an hour of difference
+    arrivale_time = datetime.datetime.combine(TRAVELLING_DAYTIME.date(), arrivale_time) + datetime.timedelta(hours=1)
+    return int((arrivale_time - TRAVELLING_DAYTIME).total_seconds() / 60)  # in minutes
+
+
 def convert_location_to_requesters_dict(location: models.Location) -> dict:
     """Convert a sqlalchemy-type location to a dict understandable by a requester
 
@@ -121,7 +385,7 @@ def convert_location_to_requesters_dict(location: models.Location) -> dict:
     """
     location_dict = {}
     location_dict["address"] = location.address
-    location_dict["latitude"] = from_wkt(location.geom).y
-    location_dict["longitude"] = from_wkt(location.geom).x
+    location_dict["latitude"] = location.lat
+    location_dict["longitude"] = location.lon
 
     return location_dict
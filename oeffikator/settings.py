@@ -1,6 +1,8 @@
 """Implements the settings for the oeffikator container"""
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from oeffikator.requesters import CONNECTION_LIMIT, CONNECTION_LIMIT_PER_HOST, DNS_CACHE_TTL_IN_SECS
+
 
 # pylint: disable=R0903,R0801
 class Settings(BaseSettings):
@@ -10,9 +12,29 @@ class Settings(BaseSettings):
     db_name: str = ""
     db_user: str = ""
     db_pw: str = ""
+    db_pool_size: int = 10  # connections kept open in the pool ...
+    db_max_overflow: int = 20  # ... and opened additionally under load
+    db_pool_timeout: int = 30  # in seconds, waiting for a free connection
+    db_pool_recycle: int = 30 * 60  # in seconds, connections are renewed after this time
     bvg_api_container_name: str = "0.0.0.0"
+    use_public_requesters: bool = False
     max_west: float = 13.2
     max_east: float = 13.55
     max_south: float = 52.42
     max_north: float = 52.59
+    dead_zone_radius: float = (
+        0.002  # in degree, no points are sampled this close to destinations without a station nearby (0 to disable)
+    )
+    service_area_path: str = ""  # GeoJSON file with the (multi)polygon points are sampled in, empty for the box above
+    connection_limit: int = CONNECTION_LIMIT
+    connection_limit_per_host: int = CONNECTION_LIMIT_PER_HOST
+    dns_cache_ttl: int = DNS_CACHE_TTL_IN_SECS
+    geocode_cache_size: int = 10_000
+    geocode_cache_ttl: int = 30 * 24 * 60 * 60  # in seconds
+    geocode_cache_path: str = "cache/geocode_cache.sqlite3"  # empty to only cache in memory
+    journey_cache_size: int = 100_000
+    journey_cache_ttl: int = 24 * 60 * 60  # in seconds
+    journey_cache_grid_size: float = 0.001  # in degree, destinations within the same cell share their journey
+    gtfs_path: str = ""  # GTFS feed (zip file or directory) for local routing, empty to only use the apis
+    reachable_stops_max_duration: int = 60  # in minutes, new origins are seeded with the stops reachable within it
     model_config = SettingsConfigDict(env_prefix="OEFFI_", secrets_dir="/run/secrets")
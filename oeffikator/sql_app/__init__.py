@@ -0,0 +1,3 @@
+"""This module contains the database models, schemas, queries and migrations and their constants"""
+
+COORDINATE_DECIMALS = 6  # locations are considered the same if their coordinates are equal up to these decimals
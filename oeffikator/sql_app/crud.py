@@ -1,180 +1,421 @@
 """The C(reate)R(ead)U(pdate)Delete functions"""
-from sqlalchemy.orm import Session, aliased
-
-from oeffikator.sql_app.models import Location, LocationAlias, Request, Trip
+from geoalchemy2.elements import WKTElement
+from shapely import from_wkt
+from sqlalchemy import Row, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
+
+from oeffikator.sql_app import COORDINATE_DECIMALS
+from oeffikator.sql_app.models import ROUNDED_COORDINATES, Location, LocationAlias, Request, Trip
 
 from . import schemas
 
 
-def get_location_by_alias(database: Session, alias: str) -> Location | None:
+async def get_location_by_alias(database: AsyncSession, alias: str) -> Location | None:
     """Get a location by its location description(/alias)
 
     Args:
-        db (Session): database session
+        db (AsyncSession): database session
         alias (str): the location alias (/location description)
 
     Returns:
         Location: the queried location
     """
-    return database.query(Location).join(LocationAlias).filter(LocationAlias.address_alias == alias).first()
+    result = await database.execute(select(Location).join(LocationAlias).where(LocationAlias.address_alias == alias))
+    return result.scalars().first()
 
 
-def get_location_by_address(database: Session, address: str) -> Location | None:
+async def get_location_by_address(database: AsyncSession, address: str) -> Location | None:
     """Get a location by its location description(/alias)
 
     Args:
-        db (Session): database session
+        db (AsyncSession): database session
         alias (str): the location's address
 
     Returns:
         Location: the queried location
     """
-    return database.query(Location).filter(Location.address == address).first()
+    result = await database.execute(select(Location).where(Location.address == address))
+    return result.scalars().first()
 
 
-def get_location_by_id(database: Session, location_id: int) -> Location | None:
+async def get_location_by_id(database: AsyncSession, location_id: int) -> Location | None:
     """Get a location by its id
 
     Args:
-        db (Session): database session
+        db (AsyncSession): database session
         location_id (int): the location's id
 
     Returns:
         Location: the queried location
     """
-    return database.query(Location).filter(Location.id == location_id).first()
+    return await database.get(Location, location_id)
 
 
-def create_location(database: Session, location: schemas.LocationCreate) -> Location:
-    """Get a location by its location description(/alias)
+async def get_location_by_coordinates(database: AsyncSession, longitude: float, latitude: float) -> Location | None:
+    """Get a location by its exact coordinates
+
+    Args:
+        db (AsyncSession): database session
+        longitude (float): the location's longitude (in EPSG:4326)
+        latitude (float): the location's latitude (in EPSG:4326)
+
+    Returns:
+        Location: the queried location
+    """
+    point = WKTElement(f"POINT({longitude} {latitude})", srid=4326)
+    result = await database.execute(select(Location).where(Location._geom.ST_Equals(point)))  # pylint: disable=W0212
+    return result.scalars().first()
+
+
+async def get_locations_by_coordinates(
+    database: AsyncSession, coordinates: list[tuple[float, float]]
+) -> list[Location]:
+    """Get all locations which match one of the coordinates exactly (in a single query).
+    Locations without an address are saved with rounded coordinates, so they match the rounded coordinates.
 
     Args:
-        db (Session): database session
+        db (AsyncSession): database session
+        coordinates (list[tuple[float, float]]): longitude and latitude (in EPSG:4326) of the locations
+
+    Returns:
+        list[Location]: the queried locations
+    """
+    if not coordinates:
+        return []
+    coordinates = set(coordinates) | {
+        _get_location_key(None, location_coordinates) for location_coordinates in coordinates
+    }
+    points = [WKTElement(f"POINT({longitude} {latitude})", srid=4326) for longitude, latitude in coordinates]
+    result = await database.execute(
+        select(Location).where(or_(*(Location._geom.ST_Equals(point) for point in points)))  # pylint: disable=W0212
+    )
+    return list(result.scalars())
+
+
+async def create_location(database: AsyncSession, location: schemas.LocationCreate, commit: bool = True) -> Location:
+    """Create a location or get the existing one with the same address (see `create_locations`)
+
+    Args:
+        db (AsyncSession): database session
         location (schemas.LocationCreate): an object containing information on the location's address and coordinates
+        commit (bool): if the transaction shall be committed (otherwise the caller commits a whole batch at once)
 
     Returns:
-        Location: the created location with additional information on id and request_id
+        Location: the created (or existing) location with additional information on id and request_id
     """
-    db_item = Location(address=location.address, request_id=location.request_id)
-    # if not set seperately
-    # causes some transformation errors between geoalchemy2.elements.wkbeelement and wkt-string
-    db_item.geom = location.geom
-    database.add(db_item)
-    database.commit()
-    database.refresh(db_item)
-    return db_item
+    return (await create_locations(database, [location], commit=commit))[0]
 
 
-def create_alias(database: Session, alias: schemas.LocationAliasCreate, location_id: int) -> LocationAlias:
-    """Get a location by its location description(/alias)
+async def create_locations(
+    database: AsyncSession, locations: list[schemas.LocationCreate], commit: bool = True
+) -> list[Location]:
+    """Create several locations with (multi-row) upserts. Locations are unique by their address, the ones without
+    an address by their coordinates (rounded to `COORDINATE_DECIMALS`, they are saved rounded as well):
+    if such a location exists already (e.g. created concurrently), it is returned instead.
 
     Args:
-        db (Session): database session
+        db (AsyncSession): database session
+        locations (list[schemas.LocationCreate]): objects containing information on the locations' addresses
+        and coordinates
+        commit (bool): if the transaction shall be committed (otherwise the caller commits a whole batch at once)
+
+    Returns:
+        list[Location]: the created (or existing) locations (in the given order)
+        with additional information on id and request_id
+    """
+    rows = {}  # a row must not be upserted twice within a statement
+    for location in locations:
+        key = _get_location_key(location.address, from_wkt(location.geom).coords[0])
+        rows.setdefault(
+            key,
+            {
+                "address": location.address,
+                "name": location.name,
+                # converted explicitly, the WKT-string is not understood by geoalchemy2 otherwise
+                "_geom": WKTElement(
+                    location.geom if location.address is not None else f"POINT({key[0]} {key[1]})", srid=4326
+                ),
+                "request_id": location.request_id,
+            },
+        )
+    db_items = {}
+    # the conflict targets of the upserts: the address or the (rounded) coordinates for locations without one
+    for conflict_target, has_address in [
+        ({"index_elements": [Location.address]}, True),
+        ({"index_elements": list(ROUNDED_COORDINATES), "index_where": Location.address.is_(None)}, False),
+    ]:
+        upserted_rows = [row for row in rows.values() if (row["address"] is not None) == has_address]
+        if not upserted_rows:
+            continue
+        statement = insert(Location)
+        # the (no-op) update returns the existing location on conflict
+        statement = statement.on_conflict_do_update(**conflict_target, set_={"address": statement.excluded.address})
+        result = await database.scalars(statement.returning(Location), upserted_rows)
+        db_items |= {_get_location_key(db_item.address, (db_item.lon, db_item.lat)): db_item for db_item in result}
+    if commit:  # the transaction is committed nevertheless (it may contain other changes of the caller)
+        await database.commit()
+    return [db_items[_get_location_key(location.address, from_wkt(location.geom).coords[0])] for location in locations]
+
+
+def _get_location_key(address: str | None, coordinates: tuple[float, float]) -> str | tuple[float, float]:
+    """Get the key which identifies a location: its address or its (rounded) coordinates if it has no address
+
+    Args:
+        address (str | None): the location's address
+        coordinates (tuple[float, float]): the location's longitude and latitude
+
+    Returns:
+        str | tuple[float, float]: the address or the rounded longitude and latitude
+    """
+    if address is not None:
+        return address
+    return round(coordinates[0], COORDINATE_DECIMALS), round(coordinates[1], COORDINATE_DECIMALS)
+
+
+async def update_location_address(database: AsyncSession, location: Location, address: str) -> Location:
+    """Set the address of a location (e.g. for locations which were created from coordinates only).
+    If another location has the address already (e.g. a close-by sampled point), the address is not saved
+    (addresses are unique), but the location is returned with it nevertheless.
+
+    Args:
+        db (AsyncSession): database session
+        location (Location): the location to update
+        address (str): the location's address
+
+    Returns:
+        Location: the updated location
+    """
+    try:
+        async with database.begin_nested():
+            await database.execute(update(Location).where(Location.id == location.id).values(address=address))
+    except IntegrityError:
+        set_committed_value(location, "address", address)
+    await database.commit()
+    return location
+
+
+async def create_alias(
+    database: AsyncSession, alias: schemas.LocationAliasCreate, location_id: int, commit: bool = True
+) -> LocationAlias:
+    """Create an alias (/location description) of a location with a single upsert.
+    If the alias exists already (e.g. created concurrently), it is returned instead.
+
+    Args:
+        db (AsyncSession): database session
         location (schemas.LocationAliasCreate): an object containing information on the location's alias
         (/location description)
         location_id (int): the location id to which the alias connects
+        commit (bool): if the transaction shall be committed (otherwise the caller commits a whole batch at once)
 
     Returns:
-        LocationAlias: the created location alias with additional information on id and location_id
+        LocationAlias: the created (or existing) location alias with additional information on id and location_id
     """
-    db_item = LocationAlias(**alias.dict(), location_id=location_id)
-    database.add(db_item)
-    database.commit()
-    database.refresh(db_item)
+    statement = insert(LocationAlias).values(**alias.dict(), location_id=location_id)
+    # the (no-op) update returns the existing alias on conflict
+    statement = statement.on_conflict_do_update(
+        index_elements=[LocationAlias.address_alias], set_={"address_alias": statement.excluded.address_alias}
+    )
+    db_item = await database.scalar(statement.returning(LocationAlias))
+    if commit:
+        await database.commit()
     return db_item
 
 
-def create_trip(database: Session, trip: schemas.TripCreate) -> Trip:
-    """Create a trip given its origin and destination id
+async def create_trip(database: AsyncSession, trip: schemas.TripCreate, commit: bool = True) -> Trip:
+    """Create a trip given its origin and destination id or get the existing one (see `create_trips`)
 
     Args:
-        database (Session): the connection to the database
+        database (AsyncSession): the connection to the database
         trip (TripCreate): information on the trip (without database id yet)
+        commit (bool): if the transaction shall be committed (otherwise the caller commits a whole batch at once)
 
     Returns:
-        Trip: the created trip
+        Trip: the created (or existing) trip
     """
-    db_item = Trip(
-        duration=trip.duration,
-        origin_id=trip.origin.id,
-        destination_id=trip.destination.id,
-        request_id=trip.request_id,
-    )
-    database.add(db_item)
-    database.commit()
-    database.refresh(db_item)
-    return db_item
+    return (await create_trips(database, [trip], commit=commit))[0]
+
 
+async def create_trips(database: AsyncSession, trips: list[schemas.TripCreate], commit: bool = True) -> list[Trip]:
+    """Create several trips with a single (multi-row) upsert. Trips are unique by their origin and destination:
+    if a trip exists already (e.g. created concurrently), it is kept and returned instead.
 
-def get_trip(database: Session, origin_id: int, destination_id: int) -> Trip:
+    Args:
+        database (AsyncSession): the connection to the database
+        trips (list[TripCreate]): information on the trips (without database id yet)
+        commit (bool): if the transaction shall be committed (otherwise the caller commits a whole batch at once)
+
+    Returns:
+        list[Trip]: the created (or existing) trips (in the given order)
+    """
+    rows = {}  # a row must not be upserted twice within a statement
+    for trip in trips:
+        rows.setdefault(
+            (trip.origin.id, trip.destination.id),
+            {
+                "duration": trip.duration,
+                "origin_id": trip.origin.id,
+                "destination_id": trip.destination.id,
+                "request_id": trip.request_id,
+                "source": trip.source.value,
+                "invalid_reason": trip.invalid_reason.value if trip.invalid_reason else None,
+            },
+        )
+    db_items = {}
+    if rows:  # the transaction is committed nevertheless (it may contain other changes of the caller)
+        statement = insert(Trip)
+        # the (no-op) update returns the existing trip on conflict
+        statement = statement.on_conflict_do_update(
+            index_elements=[Trip.origin_id, Trip.destination_id], set_={"origin_id": statement.excluded.origin_id}
+        )
+        result = await database.scalars(statement.returning(Trip), list(rows.values()))
+        # origins and destinations are loaded along (see the model)
+        db_items = {(db_item.origin_id, db_item.destination_id): db_item for db_item in result}
+    if commit:
+        await database.commit()
+    return [db_items[(trip.origin.id, trip.destination.id)] for trip in trips]
+
+
+async def get_trip(database: AsyncSession, origin_id: int, destination_id: int) -> Trip:
     """Get a trip by origin and destination id
 
     Args:
-        database (Session): the connection to the database
+        database (AsyncSession): the connection to the database
         origin_id (int): the id of the origin location
         destination_id (int): the id of the destination location
 
     Returns:
         Trip: the trip for the desried origin and destination id
     """
-    return (
-        database.query(Trip)
-        .filter(
+    result = await database.execute(
+        select(Trip).where(
             Trip.origin_id == origin_id,
             Trip.destination_id == destination_id,
         )
-        .first()
     )
+    return result.scalars().first()
+
+
+async def get_destination_ids(database: AsyncSession, origin_id: int) -> set[int]:
+    """Get the ids of all destinations which have a trip from the origin (including invalid trips)
+
+    Args:
+        database (AsyncSession): the connection to the database
+        origin_id (int): the id of the origin location
+
+    Returns:
+        set[int]: the ids of the destinations
+    """
+    result = await database.execute(select(Trip.destination_id).where(Trip.origin_id == origin_id))
+    return set(result.scalars())
 
 
-def get_all_trips(database: Session, origin_id: int, has_invalid_trips: bool = False) -> list[Trip]:
-    """Get a all trips by origin id. Note: only trips which are known to the database
+async def get_all_trips(database: AsyncSession, origin_id: int, has_invalid_trips: bool = False) -> list[Row]:
+    """Get a all trips by origin id. Note: only trips which are known to the database.
+    The trips are fetched together with the (numeric) coordinates of their destinations in a single query
+    as plain rows (without creating ORM objects or converting the geometries).
 
     Args:
-        database (Session): the connection to the database
+        database (AsyncSession): the connection to the database
         origin_id (int): the id of the origin location
         has_invalid_trips (bool): if trips which we are not able to compute trips to shall be returned too
                                   the duration of these trips is set to -1
 
     Returns:
-        list[Trip]: get all trips
+        list[Row]: the trips (id, duration, request_id, source and invalid_reason) with the id, address, name,
+        request_id, longitude and latitude of their destinations (prefixed by destination_)
     """
     min_duration = 0 if not has_invalid_trips else -1
-    origin = aliased(Location)
-    destination = aliased(Location)
-    trips = (
-        database.query(Trip)
-        .join(origin, Trip.origin_id == origin.id)
-        .join(destination, Trip.destination_id == destination.id)
-        .filter(Trip.origin_id == origin_id)
-        .filter(Trip.duration >= min_duration)
+    result = await database.execute(
+        select(
+            Trip.id,
+            Trip.duration,
+            Trip.request_id,
+            Trip.source,
+            Trip.invalid_reason,
+            Location.id.label("destination_id"),
+            Location.address.label("destination_address"),
+            Location.name.label("destination_name"),
+            Location.request_id.label("destination_request_id"),
+            Location.lon.label("destination_longitude"),
+            Location.lat.label("destination_latitude"),
+        )
+        .join(Location, Trip.destination_id == Location.id)
+        .where(Trip.origin_id == origin_id)
+        .where(Trip.duration >= min_duration)
     )
-    return list(trips)
+    return list(result)
 
 
-def create_request(database: Session) -> Request:
-    """Get a location by its location description(/alias)
+async def get_invalid_destinations(database: AsyncSession) -> list[Row]:
+    """Get the destinations without a station nearby (of the invalid trips of all origins). Other reasons of invalid
+    trips may depend on the origin, so they are ignored. So are the trips of origins which do not reach any
+    destination, since the station which is missing may be the one close to the origin.
 
     Args:
-        db (Session): database session
+        database (AsyncSession): the connection to the database
+
+    Returns:
+        list[Row]: the (distinct) longitude and latitude of the destinations
+    """
+    valid_trip = aliased(Trip)
+    result = await database.execute(
+        select(Location.lon, Location.lat)
+        .join(Trip, Trip.destination_id == Location.id)
+        .where(Trip.invalid_reason == schemas.InvalidReason.NO_STATION_NEARBY.value)
+        .where(select(valid_trip.id).where(valid_trip.origin_id == Trip.origin_id, valid_trip.duration >= 0).exists())
+        .distinct()
+    )
+    return list(result)
+
+
+async def create_request(database: AsyncSession, commit: bool = True) -> Request:
+    """Create a request (with the current date)
+
+    Args:
+        db (AsyncSession): database session
+        commit (bool): if the transaction shall be committed (otherwise the caller commits a whole batch at once)
 
     Returns:
         Request: the request with current date and id
     """
-    db_item = Request()
-    database.add(db_item)
-    database.commit()
-    database.refresh(db_item)
+    db_item = await database.scalar(insert(Request).returning(Request))
+    if commit:
+        await database.commit()
     return db_item
 
 
-def get_number_of_total_requests(database: Session) -> int:
+async def create_requests(database: AsyncSession, number_of_requests: int, commit: bool = True) -> list[int]:
+    """Create several requests (with the current date) with a single INSERT ... RETURNING
+
+    Args:
+        db (AsyncSession): database session
+        number_of_requests (int): the number of requests to create
+        commit (bool): if the transaction shall be committed (otherwise the caller commits a whole batch at once)
+
+    Returns:
+        list[int]: the ids of the created requests
+    """
+    request_ids = []
+    if number_of_requests > 0:
+        # a row with the current date per request
+        dates = select(func.now()).select_from(func.generate_series(1, number_of_requests))  # pylint: disable=E1102
+        request_ids = list(await database.scalars(insert(Request).from_select(["date"], dates).returning(Request.id)))
+    if commit:
+        await database.commit()
+    return request_ids
+
+
+async def get_number_of_total_requests(database: AsyncSession) -> int:
     """Get the number of total requests which were sent to requesters so far
 
     Args:
-        db (Session): database session
+        db (AsyncSession): database session
 
     Returns:
         int: the total number of requests
     """
-    return database.query(Request).count()
+    return await database.scalar(select(func.count()).select_from(Request))  # pylint: disable=E1102
@@ -1,6 +1,8 @@
 """Database settings and its ORM relevant classes/instances"""
-from sqlalchemy import create_engine
-from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase
 
 from oeffikator import settings
 
@@ -8,11 +10,19 @@ from oeffikator import settings
 
 
 SQLALCHEMY_DATABASE_URL = (
-    f"postgresql+psycopg2://{settings.db_user}:{settings.db_pw}@{settings.db_container_name}:5432/{settings.db_name}"
+    f"postgresql+asyncpg://{settings.db_user}:{settings.db_pw}@{settings.db_container_name}:5432/{settings.db_name}"
 )
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=True,  # connections might be closed by the database (e.g. after a restart)
+)
+# objects stay usable after a commit, reloading expired attributes lazily is not possible with async sessions
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 
 
 class Base(DeclarativeBase):
@@ -20,14 +30,11 @@ class Base(DeclarativeBase):
 
 
 # Dependency
-def get_db():
-    """Dependency, SQLAlchemy-specific helper class
+async def get_db() -> AsyncIterator[AsyncSession]:
+    """Dependency, SQLAlchemy-specific helper class. Each request (or task) gets its own session from the pool.
 
     Yields:
-        sessionmaker: a database session
+        AsyncSession: a database session
     """
-    database = SessionLocal()
-    try:
+    async with SessionLocal() as database:
         yield database
-    finally:
-        database.close()
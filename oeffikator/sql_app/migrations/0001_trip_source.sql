@@ -0,0 +1,2 @@
+-- databases created before the provenance of trips was tracked lack the column
+ALTER TABLE geo.trips ADD COLUMN IF NOT EXISTS source TEXT NOT NULL DEFAULT 'journey';
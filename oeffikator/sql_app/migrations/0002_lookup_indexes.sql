@@ -0,0 +1,12 @@
+-- keep only the first trip of concurrently inserted duplicates, otherwise the unique index cannot be created
+DELETE FROM geo.trips AS duplicate
+    USING geo.trips AS original
+    WHERE duplicate.origin_id = original.origin_id
+    AND duplicate.destination_id = original.destination_id
+    AND duplicate.id > original.id;
+-- get_trip looks up (origin_id, destination_id), get_all_trips uses origin_id (the leading column)
+CREATE UNIQUE INDEX IF NOT EXISTS trips_origin_id_destination_id_key ON geo.trips (origin_id, destination_id);
+-- get_location_by_address
+CREATE INDEX IF NOT EXISTS locations_address_idx ON geo.locations (address);
+-- lookups by coordinates (ST_Equals), named like the index geoalchemy2 creates for new tables
+CREATE INDEX IF NOT EXISTS idx_locations_geom ON geo.locations USING GIST (geom);
@@ -0,0 +1,38 @@
+-- the names of stops are not unique (e.g. the platforms of a station), so they are kept apart from the addresses
+ALTER TABLE geo.locations ADD COLUMN IF NOT EXISTS name TEXT;
+-- stops were saved with their name as address: destinations of stop trips which were not geocoded (no alias)
+UPDATE geo.locations
+    SET name = address, address = NULL
+    WHERE address IS NOT NULL
+    AND id NOT IN (SELECT location_id FROM geo.location_aliases WHERE location_id IS NOT NULL)
+    AND id IN (SELECT destination_id FROM geo.trips WHERE source IN ('stopover', 'reachable'));
+-- locations sharing an address are merged into the first one, otherwise the unique index cannot be created
+CREATE TEMPORARY TABLE merged_locations ON COMMIT DROP AS
+    SELECT id AS duplicate_id, first_value(id) OVER (PARTITION BY address ORDER BY id) AS original_id
+    FROM geo.locations
+    WHERE address IS NOT NULL;
+DELETE FROM merged_locations WHERE duplicate_id = original_id;
+UPDATE geo.location_aliases AS alias
+    SET location_id = merged.original_id
+    FROM merged_locations AS merged
+    WHERE alias.location_id = merged.duplicate_id;
+-- trips of merged locations may duplicate existing ones, those are removed after moving them
+DROP INDEX IF EXISTS geo.trips_origin_id_destination_id_key;
+UPDATE geo.trips AS trip
+    SET origin_id = merged.original_id
+    FROM merged_locations AS merged
+    WHERE trip.origin_id = merged.duplicate_id;
+UPDATE geo.trips AS trip
+    SET destination_id = merged.original_id
+    FROM merged_locations AS merged
+    WHERE trip.destination_id = merged.duplicate_id;
+DELETE FROM geo.trips AS duplicate
+    USING geo.trips AS original
+    WHERE duplicate.origin_id = original.origin_id
+    AND duplicate.destination_id = original.destination_id
+    AND duplicate.id > original.id;
+CREATE UNIQUE INDEX trips_origin_id_destination_id_key ON geo.trips (origin_id, destination_id);
+DELETE FROM geo.locations WHERE id IN (SELECT duplicate_id FROM merged_locations);
+-- upserts of locations use the address as conflict target
+DROP INDEX IF EXISTS geo.locations_address_idx;
+CREATE UNIQUE INDEX IF NOT EXISTS locations_address_key ON geo.locations (address);
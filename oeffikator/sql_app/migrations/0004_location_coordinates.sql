@@ -0,0 +1,3 @@
+-- numeric coordinates generated from the geometry, so reading them does not require converting the geometry
+ALTER TABLE geo.locations ADD COLUMN IF NOT EXISTS lon DOUBLE PRECISION GENERATED ALWAYS AS (ST_X(geom)) STORED;
+ALTER TABLE geo.locations ADD COLUMN IF NOT EXISTS lat DOUBLE PRECISION GENERATED ALWAYS AS (ST_Y(geom)) STORED;
@@ -0,0 +1,2 @@
+-- why no journey was found for an invalid trip (see schemas.InvalidReason), it is not known for older invalid trips
+ALTER TABLE geo.trips ADD COLUMN IF NOT EXISTS invalid_reason TEXT;
@@ -0,0 +1,35 @@
+-- locations without an address were not unique, concurrent batches could create them at the same coordinates
+-- they are saved with rounded coordinates now (see crud.create_locations), older ones are rounded alike
+UPDATE geo.locations
+    SET geom = ST_SetSRID(ST_MakePoint(round(lon::numeric, 6), round(lat::numeric, 6)), 4326)
+    WHERE address IS NULL;
+-- locations sharing the coordinates are merged into the first one, otherwise the unique index cannot be created
+CREATE TEMPORARY TABLE merged_coordinates ON COMMIT DROP AS
+    SELECT id AS duplicate_id, first_value(id) OVER (PARTITION BY lon, lat ORDER BY id) AS original_id
+    FROM geo.locations
+    WHERE address IS NULL;
+DELETE FROM merged_coordinates WHERE duplicate_id = original_id;
+UPDATE geo.location_aliases AS alias
+    SET location_id = merged.original_id
+    FROM merged_coordinates AS merged
+    WHERE alias.location_id = merged.duplicate_id;
+-- trips of merged locations may duplicate existing ones, those are removed after moving them
+DROP INDEX IF EXISTS geo.trips_origin_id_destination_id_key;
+UPDATE geo.trips AS trip
+    SET origin_id = merged.original_id
+    FROM merged_coordinates AS merged
+    WHERE trip.origin_id = merged.duplicate_id;
+UPDATE geo.trips AS trip
+    SET destination_id = merged.original_id
+    FROM merged_coordinates AS merged
+    WHERE trip.destination_id = merged.duplicate_id;
+DELETE FROM geo.trips AS duplicate
+    USING geo.trips AS original
+    WHERE duplicate.origin_id = original.origin_id
+    AND duplicate.destination_id = original.destination_id
+    AND duplicate.id > original.id;
+CREATE UNIQUE INDEX trips_origin_id_destination_id_key ON geo.trips (origin_id, destination_id);
+DELETE FROM geo.locations WHERE id IN (SELECT duplicate_id FROM merged_coordinates);
+-- upserts of locations without an address use the rounded coordinates as conflict target
+CREATE UNIQUE INDEX IF NOT EXISTS locations_coordinates_key ON geo.locations
+    (round(CAST(lon AS NUMERIC), 6), round(CAST(lat AS NUMERIC), 6)) WHERE address IS NULL;
@@ -0,0 +1,89 @@
+"""Versioned migrations of the database schema, which are applied on startup.
+A migration is a file `<version>_<name>.sql` in this folder. The applied versions are recorded in the database,
+so each migration runs exactly once per database (databases created by `scripts/initial_db_queries.sql`
+or by the models start at version 0)."""
+import os
+import re
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from oeffikator import logger
+
+MIGRATIONS_DIRECTORY = os.path.dirname(__file__)
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d+)_(\w+)\.sql$")
+MIGRATIONS_LOCK_KEY = 7_262_001  # arbitrary key of the advisory lock, so only one app replica migrates at a time
+
+
+def split_statements(sql: str) -> list[str]:
+    """Splits a migration into its single statements (the asyncpg driver executes one statement at a time).
+    Statements end with a semicolon at the end of a line, comments are removed.
+
+    Args:
+        sql (str): the content of a migration file
+
+    Returns:
+        list[str]: the statements (without the semicolon)
+    """
+    lines = [line.split("--")[0].rstrip() for line in sql.splitlines()]
+    statements = re.split(r";\s*$", "\n".join(line for line in lines if line), flags=re.MULTILINE)
+    return [statement.strip() for statement in statements if statement.strip()]
+
+
+def load_migrations(directory: str = MIGRATIONS_DIRECTORY) -> list[tuple[int, str, list[str]]]:
+    """Loads the migrations of a folder
+
+    Args:
+        directory (str): the folder containing the migration files
+
+    Raises:
+        ValueError: if a version is used several times
+
+    Returns:
+        list[tuple[int, str, list[str]]]: version, name and statements of each migration (ordered by version)
+    """
+    migrations = {}
+    for file_name in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE_PATTERN.match(file_name)
+        if match is None:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"The migration version {version} is used several times ({file_name}).")
+        with open(os.path.join(directory, file_name), encoding="utf-8") as file:
+            migrations[version] = (version, match.group(2), split_statements(file.read()))
+    return [migrations[version] for version in sorted(migrations)]
+
+
+async def run_migrations(connection: AsyncConnection, directory: str = MIGRATIONS_DIRECTORY) -> list[int]:
+    """Applies the migrations which were not applied to the database yet (within the transaction of the connection)
+
+    Args:
+        connection (AsyncConnection): the connection to the database (within a transaction)
+        directory (str): the folder containing the migration files
+
+    Returns:
+        list[int]: the versions of the applied migrations
+    """
+    # held until the end of the transaction, other replicas wait and find the migrations applied afterwards
+    await connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATIONS_LOCK_KEY})
+    await connection.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS usage.schema_migrations(version INT PRIMARY KEY, name TEXT NOT NULL, "
+            "applied_at timestamp with time zone DEFAULT CURRENT_TIMESTAMP)"
+        )
+    )
+    applied_versions = set((await connection.execute(text("SELECT version FROM usage.schema_migrations"))).scalars())
+    new_versions = []
+    for version, name, statements in load_migrations(directory):
+        if version in applied_versions:
+            continue
+        logger.info("Applying database migration %d (%s)", version, name)
+        for statement in statements:
+            await connection.execute(text(statement))
+        await connection.execute(
+            text("INSERT INTO usage.schema_migrations (version, name) VALUES (:version, :name)"),
+            {"version": version, "name": name},
+        )
+        new_versions.append(version)
+    return new_versions
@@ -3,11 +3,24 @@
 from geoalchemy2 import Geometry
 from geoalchemy2.elements import WKTElement
 from geoalchemy2.shape import to_shape
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+from sqlalchemy import (
+    Column,
+    Computed,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    String,
+    cast,
+    literal_column,
+)
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import backref, mapped_column, relationship
 from sqlalchemy.sql import func
 
+from . import COORDINATE_DECIMALS
 from .database import Base
 
 # pylint: disable=R0903,E1102
@@ -25,15 +38,37 @@ class Request(Base):
     request = relationship("Location", backref=backref("request"))
 
 
+# locations without an address are unique by their rounded coordinates, the upserts repeat these expressions
+# (with the decimals as literal) as conflict target
+ROUNDED_COORDINATES = tuple(
+    func.round(cast(literal_column(column), Numeric), literal_column(str(COORDINATE_DECIMALS)))
+    for column in ("lon", "lat")
+)
+
+
 class Location(Base):
     "SQLAlchemy model for the locations table"
     __tablename__ = "locations"
     __bind_key__ = "geo"
-    __table_args__ = {"schema": "geo"}
+    # the indexes are added to existing databases by the migrations
+    __table_args__ = (
+        Index("locations_address_key", "address", unique=True),
+        Index(
+            "locations_coordinates_key",
+            *ROUNDED_COORDINATES,
+            unique=True,
+            postgresql_where=literal_column("address").is_(None),
+        ),
+        {"schema": "geo"},
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     address = Column(String)
+    name = Column(String)  # the name of a stop, not unique (unlike the address)
     _geom = mapped_column("geom", Geometry("Point", 4326), nullable=False)
+    # generated from the geometry, so the coordinates can be used without converting the geometry
+    lon = Column(Float, Computed("ST_X(geom)", persisted=True))
+    lat = Column(Float, Computed("ST_Y(geom)", persisted=True))
     request_id = Column(Integer, ForeignKey("usage.requests.id"))
 
     @hybrid_property
@@ -72,14 +107,22 @@ class Trip(Base):
     "SQLAlchemy model for the trips table"
     __tablename__ = "trips"
     __bind_key__ = "geo"
-    __table_args__ = {"schema": "geo"}
+    __table_args__ = (
+        Index("trips_origin_id_destination_id_key", "origin_id", "destination_id", unique=True),
+        {"schema": "geo"},
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     duration = Column(Integer, nullable=False)
     origin_id = Column(Integer, ForeignKey("geo.locations.id"))
-    origin = relationship("Location", backref=backref("origin"), foreign_keys=[origin_id])
+    # loaded together with the trip, lazy loading is not possible with async sessions
+    origin = relationship("Location", backref=backref("origin"), foreign_keys=[origin_id], lazy="selectin")
     destination_id = Column(Integer, ForeignKey("geo.locations.id"))
-    destination = relationship("Location", backref=backref("destination"), foreign_keys=[destination_id])
+    destination = relationship(
+        "Location", backref=backref("destination"), foreign_keys=[destination_id], lazy="selectin"
+    )
     request_id = Column(Integer, ForeignKey("usage.requests.id"))
+    source = Column(String, nullable=False, default="journey", server_default="journey")
+    invalid_reason = Column(String)  # see schemas.InvalidReason, null for valid trips (and older invalid ones)
 
     request = relationship("Request", backref=backref("trip"), foreign_keys=[request_id])
@@ -1,5 +1,7 @@
 """Pydantic database table models (and helpers)"""
-from pydantic import ConfigDict, BaseModel
+from enum import Enum
+
+from pydantic import BaseModel, ConfigDict, Field
 
 # pylint: disable=R0903
 
@@ -23,9 +25,10 @@ class Request(RequestBase):
 class LocationBase(BaseModel):
     """Pydantic model to have common attributes while creating or reading data"""
 
-    address: str
+    address: str | None = None  # None if the location was created from coordinates only (and not geocoded yet)
+    name: str | None = None  # the name of the stop at the location (stops sharing a name are distinct locations)
     geom: str
-    request_id: int
+    request_id: int | None = None
     model_config = ConfigDict(from_attributes=True)
 
 
@@ -37,6 +40,8 @@ class Location(LocationBase):
     """Pydantic model for adding attributes for reading"""
 
     id: int
+    lon: float  # generated from the geometry (in EPSG:4326)
+    lat: float
     model_config = ConfigDict(from_attributes=True)
 
 
@@ -58,18 +63,47 @@ class LocationAlias(LocationAliasBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class TripSource(str, Enum):
+    """The provenance of a trip"""
+
+    JOURNEY = "journey"  # the requested destination of a journey
+    STOPOVER = "stopover"  # a stop on the way to the requested destination of a journey
+    REACHABLE = "reachable"  # a stop reachable from the origin (seeded with a single request for new origins)
+
+
+class InvalidReason(str, Enum):
+    """The reason why no journey was found for a trip"""
+
+    NO_CONNECTION = "no_connection"  # may depend on the origin (e.g. if the origin has no station nearby)
+    NO_STATION_NEARBY = "no_station_nearby"  # no station close to the destination, regardless of the origin
+
+
+class StopoverCreate(BaseModel):
+    """Pydantic model for a stop (on the way of a journey or reachable from an origin)
+    which can be saved as (additional) trip"""
+
+    longitude: float
+    latitude: float
+    name: str | None = None
+    duration: int
+
+
 class TripBase(BaseModel):
     """Pydantic model to have common attributes while creating or reading data"""
 
     duration: int
     origin: Location
     destination: Location
-    request_id: int
+    request_id: int | None = None
+    source: TripSource = TripSource.JOURNEY
+    invalid_reason: InvalidReason | None = None  # set for invalid trips (duration -1)
 
 
 class TripCreate(TripBase):
     """Pydantic model to add attributes needed for creation"""
 
+    stopovers: list[StopoverCreate] = Field(default_factory=list, exclude=True)
+
 
 class Trip(TripBase):
     """Pydantic model for adding attributes for reading"""
@@ -28,6 +28,8 @@ CREATE TABLE geo.trips(
     origin_id INT,
     destination_id INT,
     request_id INT,
+    -- 'journey' for the requested destination, 'stopover' for stops on the way to it
+    source TEXT NOT NULL DEFAULT 'journey',
     CONSTRAINT request_id FOREIGN KEY(request_id) REFERENCES usage.requests(id),
     CONSTRAINT origin_id FOREIGN KEY(origin_id) REFERENCES geo.locations(id),
     CONSTRAINT destination_id FOREIGN KEY(destination_id) REFERENCES geo.locations(id),
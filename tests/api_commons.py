@@ -28,6 +28,17 @@ class AppTestClient:
         """
         return requests.get(f"{self.base_url}/location/{location_description}", timeout=5)
 
+    def get_address(self, location_id: int) -> Response:
+        """Get a location including its (lazily resolved) address from the app
+
+        Args:
+            location_id (int): the id of the location
+
+        Returns:
+            Response: the location including address, geometry and id
+        """
+        return requests.get(f"{self.base_url}/address/{location_id}", timeout=5)
+
     def get_trip(self, origin_id: int, destination_id: int) -> Response:
         """Get a trip from the app
 
@@ -51,6 +62,17 @@ class AppTestClient:
         """
         return requests.get(f"{self.base_url}/all_trips/{origin_id}", timeout=5)
 
+    def get_all_trips_npz(self, origin_id: int) -> Response:
+        """Get all trips for a given location id from the app as columnar .npz archive
+
+        Args:
+            origin_id (int): the location id of the origin
+
+        Returns:
+            Response: all trips (as archive)
+        """
+        return requests.get(f"{self.base_url}/all_trips/{origin_id}/npz", timeout=5)
+
     def request_trips(self, location_description: str, number_of_trips: int) -> Response:
         """Get all trips for a given location id from the app
 
@@ -67,6 +89,22 @@ class AppTestClient:
             timeout=5,
         )
 
+    def get_requester_statistics(self) -> Response:
+        """Get the load balancing statistics of the requesters
+
+        Returns:
+            Response: the statistics for each requester
+        """
+        return requests.get(f"{self.base_url}/requester-stats/", timeout=5)
+
+    def get_cache_statistics(self) -> Response:
+        """Get the statistics of the caches
+
+        Returns:
+            Response: the statistics for each cache
+        """
+        return requests.get(f"{self.base_url}/cache-stats/", timeout=5)
+
     def get_total_number_of_requests(self) -> int:
         """Get the total number of requests made so far
 
@@ -0,0 +1,45 @@
+"""Fixtures shared by the tests"""
+import os
+
+import psycopg2
+import pytest
+
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(__file__))
+
+
+@pytest.fixture(name="connection", scope="session")
+def fixture_connection():
+    """Connects to the test database (start it via `docker compose up` in the tests folder),
+    the test is skipped if it is not reachable
+
+    Yields:
+        connection: the connection to the test database
+    """
+    try:
+        with open(os.path.join(REPOSITORY_DIRECTORY, "oeffikator_db_user.txt"), encoding="utf-8") as file:
+            user = file.read().strip()
+        with open(os.path.join(REPOSITORY_DIRECTORY, "oeffikator_db_pw.txt"), encoding="utf-8") as file:
+            password = file.read().strip()
+        connection = psycopg2.connect(
+            host="0.0.0.0",
+            port=5432,
+            dbname=os.environ.get("OEFFI_DB_NAME", "oeffikator"),
+            user=user,
+            password=password,
+            connect_timeout=3,
+        )
+    except (OSError, psycopg2.OperationalError) as error:
+        pytest.skip(f"test-db not reachable: {error}")
+    yield connection
+    connection.close()
+
+
+@pytest.fixture(name="database_url", scope="session")
+def fixture_database_url(connection) -> str:
+    """The url of the test database for the async engine of the app (see `connection`)
+
+    Returns:
+        str: the url of the test database
+    """
+    info = connection.info
+    return f"postgresql+asyncpg://{info.user}:{info.password}@{info.host}:{info.port}/{info.dbname}"
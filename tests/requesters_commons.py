@@ -1,9 +1,15 @@
 """A module for the common functions used for the requesters"""
 import asyncio
+import contextlib
+import json
+import os
+from types import SimpleNamespace
+from typing import Callable
 
 import numpy as np
 
 from oeffikator.requesters.bvg_rest_requester import BVGRestRequester
+from oeffikator.requesters.circuit_breaker import RequesterUnavailableError
 
 
 def is_alive(url: str) -> bool:
@@ -15,8 +21,148 @@ def is_alive(url: str) -> bool:
         raise ValueError(f"The url {url} is not supported")
     try:
         location = asyncio.run(requester.query_location("Brandenburger Tor"))
-    except TypeError:
+    except (TypeError, RequesterUnavailableError):
         return False
     coordinates_is = np.array([location["latitude"], location["longitude"]])
     np.testing.assert_array_almost_equal(coordinates_should_be, coordinates_is, decimal=3)
     return True
+
+
+GTFS_STOPS = {  # stop id: (name, longitude, latitude)
+    "A": ("Stop A", 13.400, 52.500),
+    "B": ("Stop B", 13.420, 52.500),
+    "B2": ("Stop B2", 13.4205, 52.5003),  # within walking distance of B
+    "C": ("Stop C", 13.440, 52.500),
+    "D": ("Stop D", 13.440, 52.520),
+    "E": ("Stop E", 13.460, 52.530),
+}
+GTFS_TRIPS = {  # trip id: (service id, [(stop id, arrival, departure), ...])
+    "L1-1": ("WEEK", [("A", "12:00:00", "12:00:00"), ("B", "12:05:00", "12:05:00"), ("C", "12:10:00", "12:10:00")]),
+    "L1-2": ("WEEK", [("A", "12:10:00", "12:10:00"), ("B", "12:15:00", "12:15:00"), ("C", "12:20:00", "12:20:00")]),
+    "L2-1": ("WEEK", [("C", "12:05:00", "12:05:00"), ("D", "12:09:00", "12:09:00")]),
+    "L2-2": ("WEEK", [("C", "12:12:00", "12:12:00"), ("D", "12:16:00", "12:16:00")]),
+    "L2-3": ("WEEK", [("C", "12:20:00", "12:20:00"), ("D", "12:24:00", "12:24:00")]),
+    "L3-1": ("WEEK", [("B2", "12:06:00", "12:06:00"), ("E", "12:15:00", "12:15:00")]),
+    "L4-1": ("NEVER", [("A", "12:01:00", "12:01:00"), ("C", "12:04:00", "12:04:00")]),  # does not operate
+}
+
+
+def write_gtfs_feed(directory: str) -> str:
+    """Writes a small synthetic GTFS feed: line 1 (A -> B -> C) connects to line 2 (C -> D) at C
+    and (with a short walk from B to B2) to line 3 (B2 -> E). Line 4 (A -> C) would be faster, but never operates.
+
+    Args:
+        directory (str): the directory to write the feed to
+
+    Returns:
+        str: the directory of the feed
+    """
+    tables = {
+        "stops": ["stop_id,stop_name,stop_lon,stop_lat"]
+        + [f"{stop_id},{name},{longitude},{latitude}" for stop_id, (name, longitude, latitude) in GTFS_STOPS.items()],
+        "trips": ["route_id,service_id,trip_id"]
+        + [
+            f"{trip_id.split('-', maxsplit=1)[0]},{service_id},{trip_id}"
+            for trip_id, (service_id, _) in GTFS_TRIPS.items()
+        ],
+        "stop_times": ["trip_id,arrival_time,departure_time,stop_id,stop_sequence"]
+        + [
+            f"{trip_id},{arrival},{departure},{stop_id},{sequence}"
+            for trip_id, (_, stop_times) in GTFS_TRIPS.items()
+            for sequence, (stop_id, arrival, departure) in enumerate(stop_times)
+        ],
+        "calendar": [
+            "service_id,monday,tuesday,wednesday,thursday,friday,saturday,sunday,start_date,end_date",
+            "WEEK,1,1,1,1,1,1,1,20200101,20991231",
+            "NEVER,0,0,0,0,0,0,0,20200101,20991231",
+        ],
+    }
+    for name, rows in tables.items():
+        with open(os.path.join(directory, f"{name}.txt"), "w", encoding="utf-8") as file:
+            file.write("\n".join(rows) + "\n")
+    return directory
+
+
+class FakeResponse:  # pylint: disable=R0903
+    """A canned response of an api"""
+
+    def __init__(self, status: int, body: str) -> None:
+        """
+        Args:
+            status (int): the http status of the response
+            body (str): the body of the response, e.g. json or an html error page
+        """
+        self.status = status
+        self.body = body
+
+    async def json(self, content_type: str = None) -> dict:  # pylint: disable=W0613
+        """Parses the body like aiohttp would"""
+        return json.loads(self.body)
+
+
+def get_session_responding_with(response: FakeResponse) -> contextlib.AbstractAsyncContextManager:
+    """Creates a replacement of the pooled session of a requester which answers all requests with the same response
+
+    Args:
+        response (FakeResponse): the response
+
+    Returns:
+        contextlib.AbstractAsyncContextManager: the factory of the session
+    """
+
+    @contextlib.asynccontextmanager
+    async def respond(*args, **kwargs):  # pylint: disable=W0613
+        yield response
+
+    @contextlib.asynccontextmanager
+    async def get_session():
+        yield SimpleNamespace(request=respond)
+
+    return get_session
+
+
+class FakeClock:
+    """A monotonic clock which only advances if told so or if one sleeps on it"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        """Gets the current time (in seconds)"""
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        """Lets time pass
+
+        Args:
+            seconds (float): the time which passes
+        """
+        self.now += seconds
+
+    async def sleep(self, seconds: float) -> None:
+        """Lets time pass instead of waiting for it (but still gives other tasks a turn)
+
+        Args:
+            seconds (float): the time which passes
+        """
+        self.sleeps.append(seconds)
+        self.advance(seconds)
+        await asyncio.sleep(0)
+
+
+async def wait_until(condition: Callable[[], bool], max_turns: int = 100) -> None:
+    """Gives the other tasks turns until a condition holds
+
+    Args:
+        condition (Callable[[], bool]): the condition
+        max_turns (int): the number of turns after which the condition is expected to hold
+
+    Raises:
+        AssertionError: if the condition does not hold after the turns
+    """
+    for _ in range(max_turns):
+        if condition():
+            return
+        await asyncio.sleep(0)
+    raise AssertionError(f"The condition did not hold after {max_turns} turns.")
@@ -1,11 +1,15 @@
 """Tests on the functionality of the api (and indirectly on the database too)"""
+import io
 import random
 import string
 import time
 
+import numpy as np
+import pytest
 import requests.exceptions
 
-from oeffikator.sql_app.schemas import Location, Trip
+from oeffikator.settings import Settings
+from oeffikator.sql_app.schemas import Location, Trip, TripSource
 from tests.api_commons import AppTestClient
 
 client = AppTestClient("http://0.0.0.0:8001")
@@ -37,6 +41,8 @@ def test_getting_location():
         geom="POINT (13.412904 52.521149)",
         id=-1,
         request_id=-1,
+        lon=13.412904,
+        lat=52.521149,
     )
     response = client.get_location(location_description)
 
@@ -45,6 +51,7 @@ def test_getting_location():
     response_location = Location(**response.json())
     assert response_location.address == expected_location.address
     assert response_location.geom == expected_location.geom
+    assert (response_location.lon, response_location.lat) == (expected_location.lon, expected_location.lat)
 
 
 def test_location_alias():
@@ -163,11 +170,142 @@ def test_requesting_trips_creation():
     client.request_trips(origin.address, number_of_trips)
     time.sleep(4)
     trips = [Trip(**trip) for trip in client.get_all_trips(origin.id).json()]
+    # new origins may be seeded with reachable stops, stopovers are saved as trips too
+    journey_trips = [trip for trip in trips if trip.source == TripSource.JOURNEY]
 
-    assert len(trips) == 1
+    assert len(trips) >= 1
+    assert len(journey_trips) <= 1
 
     client.request_trips(origin.address, number_of_trips).json()
     time.sleep(4)
     trips = [Trip(**trip) for trip in client.get_all_trips(origin.id).json()]
 
-    assert len(trips) == 2
+    assert len([trip for trip in trips if trip.source == TripSource.JOURNEY]) == len(journey_trips) + 1
+
+
+def test_new_origins_are_seeded_with_reachable_stops():
+    """Test whether the trips of a new origin are seeded with the stops reachable from it (with a single request)"""
+    origin_description = "".join(random.choice(string.ascii_letters) for i in range(10))
+    origin = Location(**client.get_location(origin_description).json())
+    initial_count = client.get_total_number_of_requests().json()["number_of_total_requests"]
+    client.request_trips(origin.address, 1)
+    time.sleep(4)
+    trips = [Trip(**trip) for trip in client.get_all_trips(origin.id).json()]
+    reachable_trips = [trip for trip in trips if trip.source == TripSource.REACHABLE]
+    post_count = client.get_total_number_of_requests().json()["number_of_total_requests"]
+
+    assert len(reachable_trips) > 1
+    assert post_count == initial_count + 1
+    assert len({trip.destination.id for trip in reachable_trips}) == len(reachable_trips)
+
+
+def test_stopovers_are_saved_as_trips():
+    """Test whether the stops on the way of a requested journey are saved as additional trips from the origin"""
+    origin_description = "".join(random.choice(string.ascii_letters) for i in range(10))
+    origin = Location(**client.get_location(origin_description).json())
+    destination = Location(**client.get_location(LOCATION_3).json())
+    trip = Trip(**client.get_trip(origin.id, destination.id).json())
+    trips = [Trip(**trip) for trip in client.get_all_trips(origin.id).json()]
+    stopover_trips = [trip for trip in trips if trip.source == TripSource.STOPOVER]
+
+    assert trip.source == TripSource.JOURNEY
+    assert all(0 <= stopover_trip.duration <= trip.duration for stopover_trip in stopover_trips)
+    assert len({stopover_trip.destination.id for stopover_trip in stopover_trips}) == len(stopover_trips)
+    assert origin.id not in {stopover_trip.destination.id for stopover_trip in stopover_trips}
+    # stops sharing a name (e.g. platforms) are distinct locations, so their names are not saved as unique addresses
+    assert all(stopover_trip.destination.name is not None for stopover_trip in stopover_trips)
+    assert all(stopover_trip.destination.address is None for stopover_trip in stopover_trips)
+
+
+def test_requester_statistics():
+    """Test whether the oeffikator reports the statistics of its requesters after using them"""
+    random_string = "".join(random.choice(string.ascii_letters) for i in range(10))
+    client.get_location(random_string)
+
+    response = client.get_requester_statistics()
+    assert response.status_code == 200
+    statistics = response.json()["requesters"]
+    assert statistics, "no requester seems to be available"
+    assert sum(requester["number_of_requests"] for requester in statistics) >= 1
+    assert all(requester["in_flight"] >= 0 for requester in statistics)
+
+
+def test_geocoding_cache_statistics():
+    """Test whether new location descriptions are registered as misses of the geocoding cache"""
+    initial_misses = client.get_cache_statistics().json()["geocode"]["misses"]
+
+    random_string = "".join(random.choice(string.ascii_letters) for i in range(10))
+    client.get_location(random_string)
+    post_misses = client.get_cache_statistics().json()["geocode"]["misses"]
+
+    assert post_misses == initial_misses + 1
+
+
+def test_journey_cache_serves_repeated_trips(connection):
+    """Test whether a trip to a new destination close to a known one (in the same cell of the journey cache's grid)
+    is served by the journey cache, i.e. without another request"""
+    grid_size = Settings().journey_cache_grid_size
+    # the center of a random cell within Berlin, which no other test samples
+    cell_longitude = round(random.uniform(13.3, 13.5) / grid_size) * grid_size
+    cell_latitude = round(random.uniform(52.45, 52.55) / grid_size) * grid_size
+    with connection.cursor() as cursor:
+        destination_ids = []
+        for offset in (-0.2 * grid_size, 0.2 * grid_size):  # both destinations are snapped to the same cell
+            longitude, latitude = cell_longitude + offset, cell_latitude + offset
+            cursor.execute(
+                "INSERT INTO geo.locations (address, geom) VALUES (%s, ST_SetSRID(ST_MakePoint(%s, %s), 4326))"
+                " RETURNING id",
+                (f"{longitude} {latitude}", longitude, latitude),
+            )
+            destination_ids.append(cursor.fetchone()[0])
+    connection.commit()
+    origin = Location(**client.get_location(LOCATION_1).json())
+
+    client.get_trip(origin.id, destination_ids[0])  # requested
+    initial_hits = client.get_cache_statistics().json()["journey"]["hits"]
+    initial_requests = client.get_total_number_of_requests().json()["number_of_total_requests"]
+    response = client.get_trip(origin.id, destination_ids[1])  # taken from the journey cache
+
+    assert response.status_code == 200
+    statistics = client.get_cache_statistics().json()["journey"]
+    assert statistics["hits"] == initial_hits + 1
+    assert statistics["in_flight"] == 0
+    assert client.get_total_number_of_requests().json()["number_of_total_requests"] == initial_requests
+    assert Trip(**response.json()).request_id is None
+
+
+def test_sampled_destinations_are_geocoded_lazily():
+    """Test whether sampled destinations are stored without address, which is resolved once asked for"""
+    origin_description = "".join(random.choice(string.ascii_letters) for i in range(10))
+    origin = Location(**client.get_location(origin_description).json())
+    client.request_trips(origin.address, 1)  # new origins may be seeded with (named) reachable stops first
+    time.sleep(4)
+    client.request_trips(origin.address, 1)
+    time.sleep(4)
+    trips = [Trip(**trip) for trip in client.get_all_trips(origin.id).json()]
+    trips = [trip for trip in trips if trip.source == TripSource.JOURNEY]  # stopovers are named by their stop
+    assert trips and trips[0].destination.address is None
+
+    destination = Location(**client.get_address(trips[0].destination.id).json())
+    assert destination.address is not None
+    assert destination.geom == trips[0].destination.geom
+    assert (destination.lon, destination.lat) == (trips[0].destination.lon, trips[0].destination.lat)
+
+
+def test_all_trips_as_columns():
+    """Test whether the columnar export of all trips matches the trips returned as JSON"""
+    origin = Location(**client.get_location(LOCATION_1).json())
+    trips = [Trip(**trip) for trip in client.get_all_trips(origin.id).json()]
+    response = client.get_all_trips_npz(origin.id)
+
+    assert response.status_code == 200
+    columns = np.load(io.BytesIO(response.content))
+    assert columns["origin"] == pytest.approx([origin.lon, origin.lat])
+    assert columns["duration"].dtype == np.int16 and columns["longitude"].dtype == np.float32
+    trips_by_destination = {trip.destination.id: trip for trip in trips}
+    assert sorted(columns["destination_id"].tolist()) == sorted(trips_by_destination)
+    for destination_id, longitude, duration in zip(
+        columns["destination_id"], columns["longitude"], columns["duration"]
+    ):
+        assert duration == trips_by_destination[destination_id].duration
+        assert longitude == pytest.approx(trips_by_destination[destination_id].destination.lon)
@@ -0,0 +1,193 @@
+"""Tests related to the caches which spare requests to the requesters."""
+import asyncio
+import datetime
+
+import pytest
+
+from oeffikator.caching.geocode_cache import GeocodeCache
+from oeffikator.caching.journey_cache import JourneyCache
+from oeffikator.caching.ttl_cache import TTLCache
+
+LOCATION = {"address": "10178 Berlin-Mitte, Alexanderplatz 1", "latitude": 52.521149, "longitude": 13.412904}
+
+
+# TTL cache
+def test_ttl_cache_needs_positive_size_and_ttl():
+    """Test if the ttl cache checks its size and time to live"""
+    with pytest.raises(ValueError):
+        TTLCache(0, 1)
+    with pytest.raises(ValueError):
+        TTLCache(1, 0)
+
+
+def test_ttl_cache_evicts_least_recently_used_entry():
+    """Test if the least recently used entry is evicted once the cache is full"""
+    cache = TTLCache(2, 60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is the least recently used entry now
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.get_statistics()["evictions"] == 1
+
+
+def test_ttl_cache_expires_entries():
+    """Test if entries are not returned after their time to live"""
+    cache = TTLCache(2, 60)
+    cache.set("a", 1, ttl=-1)
+    assert cache.get("a") is None
+    statistics = cache.get_statistics()
+    assert statistics["expirations"] == 1 and statistics["misses"] == 1 and statistics["size"] == 0
+
+
+# Geocode cache
+def test_geocode_cache_normalizes_queries():
+    """Test if differently written location descriptions hit the same entry"""
+    cache = GeocodeCache(10, 60)
+    cache.set("Alexanderplatz  1", LOCATION)
+    assert cache.get("  alexanderplatz 1") == LOCATION
+    assert cache.get("alexanderplatz 2") is None
+    statistics = cache.get_statistics()
+    assert statistics["hits"] == 1 and statistics["misses"] == 1
+
+
+def test_geocode_cache_persists_on_disk(tmp_path):
+    """Test if a new cache (e.g. after a restart) finds the locations on disk"""
+    path = str(tmp_path / "cache" / "geocode.sqlite3")
+    cache = GeocodeCache(10, 60, path)
+    cache.set("Alexanderplatz 1", {**LOCATION, "id": "irrelevant"})
+    cache.close()
+
+    restarted_cache = GeocodeCache(10, 60, path)
+    assert restarted_cache.get("alexanderplatz 1") == LOCATION
+    assert restarted_cache.get("alexanderplatz 1") == LOCATION  # from memory now
+    statistics = restarted_cache.get_statistics()
+    assert statistics["hits"] == 2 and statistics["disk_hits"] == 1 and statistics["misses"] == 0
+    restarted_cache.close()
+
+
+def test_geocode_cache_ignores_expired_locations_on_disk(tmp_path):
+    """Test if expired locations on disk are not used anymore"""
+    path = str(tmp_path / "geocode.sqlite3")
+    cache = GeocodeCache(10, 60, path)
+    cache.set("Alexanderplatz 1", LOCATION)
+    cache.close()
+
+    restarted_cache = GeocodeCache(10, 1e-9, path)
+    assert restarted_cache.get("alexanderplatz 1") is None
+    restarted_cache.close()
+
+
+# Journey cache
+ORIGIN = {"longitude": 13.412904, "latitude": 52.521149}
+DESTINATION = {"longitude": 13.37766, "latitude": 52.51627}
+START_DATE = datetime.datetime(2023, 1, 2, 12)
+
+
+def test_journey_cache_snaps_destinations_to_grid():
+    """Test if close-by destinations share the same key but different departures do not"""
+    cache = JourneyCache(10, 60, grid_size=0.001)
+    close_destination = {"longitude": DESTINATION["longitude"] + 0.0001, "latitude": DESTINATION["latitude"]}
+    far_destination = {"longitude": DESTINATION["longitude"] + 0.01, "latitude": DESTINATION["latitude"]}
+    key = cache.get_key(ORIGIN, DESTINATION, START_DATE)
+    assert key == cache.get_key(ORIGIN, close_destination, START_DATE)
+    assert key != cache.get_key(ORIGIN, far_destination, START_DATE)
+    assert key != cache.get_key(ORIGIN, DESTINATION, START_DATE + datetime.timedelta(hours=1))
+
+
+def test_journey_cache_deduplicates_concurrent_requests():
+    """Test if concurrent identical requests are only sent once and later ones are served from the cache"""
+    cache = JourneyCache(10, 60, grid_size=0.001)
+    number_of_requests = []
+
+    async def request() -> dict:
+        number_of_requests.append(1)
+        await asyncio.sleep(0.01)
+        return {"arrivalTime": "121400"}
+
+    async def request_concurrently() -> list:
+        return await asyncio.gather(*[cache.get_or_request(ORIGIN, DESTINATION, START_DATE, request) for _ in range(5)])
+
+    results = asyncio.run(request_concurrently())
+    assert len(number_of_requests) == 1
+    assert all(journey == {"arrivalTime": "121400"} for journey, _ in results)
+    assert [is_cached for _, is_cached in results].count(False) == 1
+
+    journey, is_cached = asyncio.run(cache.get_or_request(ORIGIN, DESTINATION, START_DATE, request))
+    assert is_cached and journey == {"arrivalTime": "121400"}
+    assert len(number_of_requests) == 1
+    statistics = cache.get_statistics()
+    assert statistics["deduplicated_requests"] == 4 and statistics["in_flight"] == 0
+
+
+def test_journey_cache_shares_but_does_not_cache_errors():
+    """Test if a failing request raises for all concurrent callers and is not cached"""
+    cache = JourneyCache(10, 60, grid_size=0.001)
+
+    async def failing_request() -> dict:
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    async def request_concurrently() -> list:
+        return await asyncio.gather(
+            *[cache.get_or_request(ORIGIN, DESTINATION, START_DATE, failing_request) for _ in range(2)],
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(request_concurrently())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(cache.memory) == 0
+
+
+def test_journey_cache_requests_missing_journeys_at_once():
+    """Test if only missing journeys are requested (at once, each key once) and single failures are not cached"""
+    cache = JourneyCache(10, 60, grid_size=0.001)
+    cache.memory.set(cache.get_key(ORIGIN, DESTINATION, START_DATE), {"arrivalTime": "121400"})
+    close_destination = {"longitude": DESTINATION["longitude"] + 0.0001, "latitude": DESTINATION["latitude"]}
+    other_destinations = [{"longitude": 13.5, "latitude": 52.5}, {"longitude": 13.6, "latitude": 52.5}]
+    requested_batches = []
+
+    async def request_many(destinations: list[dict]) -> list[dict | Exception]:
+        requested_batches.append(destinations)
+        return [{"arrivalTime": "123000"}, ValueError("upstream failed")]
+
+    results = asyncio.run(
+        cache.get_or_request_many(
+            ORIGIN,
+            [DESTINATION, *other_destinations, close_destination, other_destinations[0]],
+            START_DATE,
+            request_many,
+        )
+    )
+    assert requested_batches == [other_destinations]
+    assert results[0] == ({"arrivalTime": "121400"}, True)
+    assert results[1] == ({"arrivalTime": "123000"}, False)
+    assert isinstance(results[2][0], ValueError) and not results[2][1]
+    assert results[3] == ({"arrivalTime": "121400"}, True)  # same grid cell as the cached destination
+    assert results[4] == ({"arrivalTime": "123000"}, True)  # requested once for this call
+    assert len(cache.memory) == 2 and cache.get_statistics()["in_flight"] == 0
+
+
+def test_journey_cache_fails_if_journeys_are_missing_in_bulk_response():
+    """Test if a bulk request returning fewer journeys than destinations fails instead of leaving shared requests
+    unresolved"""
+    cache = JourneyCache(10, 60, grid_size=0.001)
+    destinations = [{"longitude": 13.5, "latitude": 52.5}, {"longitude": 13.6, "latitude": 52.5}]
+
+    async def request_many(_: list[dict]) -> list[dict | Exception]:
+        await asyncio.sleep(0.01)
+        return [{"arrivalTime": "123000"}]
+
+    async def request() -> dict:
+        return {"arrivalTime": "124500"}
+
+    async def request_concurrently() -> list:
+        bulk_request = asyncio.ensure_future(cache.get_or_request_many(ORIGIN, destinations, START_DATE, request_many))
+        await asyncio.sleep(0)  # the bulk request is in flight now
+        shared_request = cache.get_or_request(ORIGIN, destinations[1], START_DATE, request)
+        return await asyncio.wait_for(asyncio.gather(bulk_request, shared_request, return_exceptions=True), 1)
+
+    results = asyncio.run(request_concurrently())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(cache.memory) == 0 and cache.get_statistics()["in_flight"] == 0
@@ -0,0 +1,136 @@
+"""Tests on the database schema: its migrations, the query plans of the hot lookups and the results of the
+optimized queries (the latter require the test database, see the `connection` fixture)"""
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from oeffikator.main import get_all_trips
+from oeffikator.sql_app import models, schemas
+from oeffikator.sql_app.migrations import load_migrations, split_statements
+
+
+def test_split_statements():
+    """Test whether migrations are split into their statements (without comments)"""
+    sql = "-- a comment\nCREATE TABLE a (id INT); -- trailing comment\nINSERT INTO a\n    VALUES (1);\n"
+    assert split_statements(sql) == ["CREATE TABLE a (id INT)", "INSERT INTO a\n    VALUES (1)"]
+
+
+def test_migrations_are_versioned():
+    """Test whether the shipped migrations have unique, increasing versions and contain statements"""
+    migrations = load_migrations()
+    versions = [version for version, _, _ in migrations]
+    assert versions == list(range(1, len(migrations) + 1))
+    assert all(statements for _, _, statements in migrations)
+
+
+def test_duplicate_migration_versions(tmp_path):
+    """Test whether a migration version which is used several times is refused"""
+    (tmp_path / "0001_first.sql").write_text("SELECT 1;")
+    (tmp_path / "001_second.sql").write_text("SELECT 2;")
+    with pytest.raises(ValueError):
+        load_migrations(str(tmp_path))
+
+
+def test_migrations_are_applied(connection):
+    """Test whether the app applied all migrations on startup"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT max(version) FROM usage.schema_migrations")
+        assert cursor.fetchone()[0] == load_migrations()[-1][0]
+
+
+@pytest.mark.parametrize(
+    "query, index_name",
+    [
+        (  # crud.get_trip
+            "SELECT * FROM geo.trips WHERE origin_id = 1 AND destination_id = 2",
+            "trips_origin_id_destination_id_key",
+        ),
+        (  # crud.get_all_trips
+            "SELECT * FROM geo.trips WHERE origin_id = 1 AND duration >= -1",
+            "trips_origin_id_destination_id_key",
+        ),
+        (  # crud.get_location_by_address
+            "SELECT * FROM geo.locations WHERE address = '10178 Berlin-Mitte, Alexanderplatz 1'",
+            "locations_address_key",
+        ),
+        (  # crud.get_locations_by_coordinates
+            "SELECT * FROM geo.locations WHERE ST_Equals(geom, ST_GeomFromText('POINT(13.41 52.52)', 4326))",
+            "idx_locations_geom",
+        ),
+    ],
+)
+def test_lookups_use_indexes(connection, query: str, index_name: str):
+    """Test whether the hot lookups can use an index instead of scanning the whole table.
+    Sequential scans are discouraged, so the (small) test tables are not just scanned since this would be cheaper."""
+    with connection.cursor() as cursor:
+        cursor.execute("SET enable_seqscan = off")
+        cursor.execute(f"EXPLAIN {query}")
+        plan = "\n".join(row[0] for row in cursor.fetchall())
+    connection.rollback()
+    assert index_name in plan, plan
+
+
+def test_locations_without_address_are_unique_by_coordinates(connection):
+    """Test whether locations without an address conflict on their rounded coordinates, as the upserts expect"""
+    upsert = (
+        "INSERT INTO geo.locations (geom) VALUES (ST_GeomFromText(%s, 4326)) "
+        "ON CONFLICT (round(CAST(lon AS NUMERIC), 6), round(CAST(lat AS NUMERIC), 6)) WHERE address IS NULL "
+        "DO UPDATE SET address = excluded.address RETURNING id"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(upsert, ("POINT(13.123456 52.654321)",))
+        location_id = cursor.fetchone()[0]
+        cursor.execute(upsert, ("POINT(13.1234561 52.6543209)",))
+        same_location_id = cursor.fetchone()[0]
+    connection.rollback()
+    assert location_id == same_location_id
+
+
+def test_all_trips_rows_match_orm_trips(connection, database_url):
+    """Test whether /all_trips, which is built from the rows of crud.get_all_trips, returns the same trips
+    as the ORM objects of the trips did before, for a seeded origin"""
+    with connection.cursor() as cursor:
+        location_ids = []
+        for address, name, point in [
+            ("oeffikator test origin", None, "POINT(13.4 52.5)"),
+            ("oeffikator test destination", None, "POINT(13.123456789012 52.987654321098)"),
+            (None, "oeffikator test stop", "POINT(13.1 52.100001)"),
+            (None, None, "POINT(13.000007 52.9)"),
+        ]:
+            cursor.execute(
+                "INSERT INTO geo.locations (address, name, geom) VALUES (%s, %s, ST_GeomFromText(%s, 4326)) "
+                "RETURNING id",
+                (address, name, point),
+            )
+            location_ids.append(cursor.fetchone()[0])
+        origin_id = location_ids[0]
+        for destination_id, duration, source, invalid_reason in zip(
+            location_ids[1:], [12, 7, -1], ["journey", "stopover", "journey"], [None, None, "no_station_nearby"]
+        ):
+            cursor.execute(
+                "INSERT INTO geo.trips (origin_id, destination_id, duration, source, invalid_reason) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                (origin_id, destination_id, duration, source, invalid_reason),
+            )
+    connection.commit()
+
+    async def get_trips() -> tuple[list[dict], list[dict]]:
+        engine = create_async_engine(database_url)
+        async with async_sessionmaker(engine, expire_on_commit=False)() as database:
+            trips = await get_all_trips(origin_id, has_invalid_trips=True, database=database)
+            orm_trips = await database.scalars(select(models.Trip).where(models.Trip.origin_id == origin_id))
+            expected_trips = [schemas.Trip.model_validate(trip).model_dump() for trip in orm_trips]
+        await engine.dispose()
+        return [schemas.Trip.model_validate(trip).model_dump() for trip in trips], expected_trips
+
+    try:
+        trips, expected_trips = asyncio.run(get_trips())
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM geo.trips WHERE origin_id = %s", (origin_id,))
+            cursor.execute("DELETE FROM geo.locations WHERE id = ANY(%s)", (location_ids,))
+        connection.commit()
+    assert len(trips) == 3
+    assert sorted(trips, key=lambda trip: trip["id"]) == sorted(expected_trips, key=lambda trip: trip["id"])
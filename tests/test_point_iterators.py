@@ -1,9 +1,17 @@
 """This module contains all the test for the point iterators currently implemented."""
+import json
+from collections import defaultdict
+
 import numpy as np
 import pytest
-from scipy.spatial import cKDTree
+import shapely
+from scipy.spatial import Delaunay, cKDTree
 
+from oeffikator.point_iterator import INITIAL_POINT_CAPACITY
+from oeffikator.point_iterator.dead_zone_index import DeadZoneIndex
+from oeffikator.point_iterator.error_driven_point_iterator import ErrorDrivenPointIterator
 from oeffikator.point_iterator.grid_point_iterator import GridPointIterator
+from oeffikator.point_iterator.service_area import load_service_area
 from oeffikator.point_iterator.triangular_iterator_interface import TriangularPointIterator
 
 BOUNDING_BOX = (0, 1, 2.5, 3.5)  # ("west", "east", "south", "north")
@@ -73,6 +81,16 @@ def test_has_points_remaining():
     assert not point_iterator.has_points_remaining()
 
 
+def test_next_batch_from_grid_point_iterator():
+    """Test if the grid iterator returns the grid in batches (the last one is smaller)"""
+    point_iterator = GridPointIterator(BOUNDING_BOX, POINTS_PER_AXIS)
+    batches = [point_iterator.next_batch(4) for _ in range(3)]
+    assert [len(batch) for batch in batches] == [4, 4, 1]
+    np.testing.assert_array_equal(np.concatenate(batches), list(GridPointIterator(BOUNDING_BOX, POINTS_PER_AXIS)))
+    assert not point_iterator.has_points_remaining()
+    assert point_iterator.next_batch(4).shape == (0, 2)
+
+
 # Test on TriangularPointIterator
 
 STARTING_POINTS = np.array([[0, 0], [0, 1], [1, 1]])
@@ -169,3 +187,207 @@ def test_smaller_triangles_for_triangular_point_iterator():
         next(point_iterator)
     assert largest_distance_for_current_points == sorted(largest_distance_for_current_points, reverse=True)
     assert largest_distance_for_current_points[0] > largest_distance_for_current_points[-1]
+
+
+def test_incremental_triangulation_matches_delaunay():
+    """Test if the incrementally updated triangulation equals the Delaunay triangulation of all points
+    (also once the point buffer had to grow) and if the triangles at each point are indexed"""
+    initial_points = np.random.default_rng(0).random((50, 2))
+    point_iterator = TriangularPointIterator(initial_points)
+    for _ in range(INITIAL_POINT_CAPACITY):
+        next(point_iterator)
+    assert len(point_iterator.points) == len(initial_points) + INITIAL_POINT_CAPACITY
+    np.testing.assert_array_equal(point_iterator.points[: len(initial_points)], initial_points)
+    expected_triangles = {tuple(sorted(simplex)) for simplex in Delaunay(point_iterator.points).simplices.tolist()}
+    assert {tuple(sorted(triangle)) for triangle in point_iterator.triangles.values()} == expected_triangles
+    point_triangles = defaultdict(set)
+    for triangle_id, triangle in point_iterator.triangles.items():
+        for index in triangle:
+            point_triangles[index].add(triangle_id)
+    assert {index: point_iterator.get_triangles_at(index) for index in range(len(point_iterator.points))} == (
+        point_triangles
+    )
+
+
+def test_next_batch_from_triangular_point_iterator():
+    """Test if the points of a batch are the centers of large triangles which share no point with each other
+    and if the triangulation stays the Delaunay triangulation of all points"""
+    initial_points = np.random.default_rng(1).random((50, 2))
+    point_iterator = TriangularPointIterator(initial_points)
+    first_batch = point_iterator.next_batch(5)
+    assert first_batch.shape == (5, 2)
+    np.testing.assert_array_equal(point_iterator.points[len(initial_points) :], first_batch)
+    # the largest triangle is chosen first, as for a single point
+    np.testing.assert_almost_equal(first_batch[0], next(TriangularPointIterator(initial_points)))
+    triangles = Delaunay(initial_points).simplices
+    centers = np.mean(initial_points[triangles], 1)
+    chosen_triangles = [triangles[np.argmin(np.linalg.norm(centers - point, axis=1))] for point in first_batch]
+    assert len(set(np.concatenate(chosen_triangles).tolist())) == 3 * len(first_batch)
+
+    assert point_iterator.next_batch(500).shape == (500, 2)
+    expected_triangles = {tuple(sorted(simplex)) for simplex in Delaunay(point_iterator.points).simplices.tolist()}
+    assert {tuple(sorted(triangle)) for triangle in point_iterator.triangles.values()} == expected_triangles
+
+
+def test_locate_point_in_triangular_point_iterator():
+    """Test if the triangle containing a point is found (it is used if a batch replaced the triangle of a point)"""
+    point_iterator = TriangularPointIterator(np.random.default_rng(2).random((50, 2)))
+    point_iterator.next_batch(50)
+    triangulation = Delaunay(point_iterator.points)
+    for point in np.random.default_rng(3).uniform(0.3, 0.7, (20, 2)):
+        expected_triangle = sorted(triangulation.simplices[triangulation.find_simplex(point)].tolist())
+        assert sorted(point_iterator.triangles[point_iterator.locate(point)]) == expected_triangle
+
+
+# Test on ErrorDrivenPointIterator
+
+SQUARE = np.array([[0, 0], [1, 0], [0, 1], [1, 1], [0.5, 0.5]])
+
+
+def test_one_duration_per_point_for_error_driven_point_iterator():
+    """Test if the error driven iterator raises an error if the durations do not match the points"""
+    with pytest.raises(ValueError):
+        ErrorDrivenPointIterator(SQUARE, np.zeros(4))
+
+
+def test_error_driven_point_iterator_refines_duration_changes():
+    """Test if the error driven iterator samples the triangles where the durations change, not the largest ones.
+    The four triangles of the square are equally large, the durations differ the most in the northern one."""
+    point_iterator = ErrorDrivenPointIterator(SQUARE, np.array([10, 30, 10, 60, 10]))
+    np.testing.assert_almost_equal(next(point_iterator), [0.5, 5 / 6])
+    np.testing.assert_almost_equal(next(TriangularPointIterator(SQUARE)), [0.5, 1 / 6])
+
+
+def test_set_durations_for_error_driven_point_iterator():
+    """Test if setting the duration of a generated point updates the priorities of its triangles.
+    Invalid trips (NaN) are ignored."""
+    point_iterator = ErrorDrivenPointIterator(SQUARE, np.array([10, 10, 10, 10, np.nan]))
+    point = next(point_iterator)  # all triangles are equal, the southern one is taken
+    np.testing.assert_almost_equal(point, [0.5, 1 / 6])
+    priorities = point_iterator.priorities
+    point_iterator.set_durations([tuple(point.tolist())], [100])
+    new_priorities = point_iterator.priorities
+    assert max(new_priorities.values()) > max(priorities.values())
+    np.testing.assert_almost_equal(next(point_iterator)[1], 1 / 6, decimal=1)
+    with pytest.raises(KeyError):
+        point_iterator.set_durations([tuple(point.tolist())], [100])
+
+
+# Test on the service area
+
+WESTERN_HALF = shapely.box(-1, -1, 0.6, 4)
+
+
+def test_load_service_area(tmp_path):
+    """Test if the polygons of a GeoJSON feature collection are united to the service area"""
+    polygons = [shapely.box(0, 0, 1, 1), shapely.box(2, 0, 3, 1)]
+    path = tmp_path / "service_area.geojson"
+    path.write_text(
+        json.dumps(
+            {
+                "type": "FeatureCollection",
+                "features": [
+                    {"type": "Feature", "properties": {}, "geometry": shapely.geometry.mapping(polygon)}
+                    for polygon in polygons
+                ],
+            }
+        )
+    )
+    service_area = load_service_area(str(path))
+    assert service_area.equals(shapely.MultiPolygon(polygons))
+    assert shapely.is_prepared(service_area)
+
+
+def test_load_service_area_without_polygons(tmp_path):
+    """Test if a service area which is not a (multi)polygon is refused"""
+    path = tmp_path / "service_area.geojson"
+    path.write_text(json.dumps(shapely.geometry.mapping(shapely.Point(0, 0))))
+    with pytest.raises(ValueError):
+        load_service_area(str(path))
+
+
+def test_service_area_for_grid_point_iterator():
+    """Test if the grid iterator skips the points outside the service area"""
+    point_iterator = GridPointIterator(BOUNDING_BOX, POINTS_PER_AXIS, WESTERN_HALF)
+    assert list(point_iterator) == [[0, 2.5], [0, 3.0], [0, 3.5], [0.5, 2.5], [0.5, 3.0], [0.5, 3.5]]
+
+
+def test_service_area_for_triangular_point_iterator():
+    """Test if the triangles outside the service area get no priority,
+    i.e. the points are sampled in the service area first"""
+    initial_points = np.random.default_rng(4).random((50, 2))
+    for point_iterator in [
+        TriangularPointIterator(initial_points, WESTERN_HALF),
+        ErrorDrivenPointIterator(initial_points, initial_points[:, 0] * 60, WESTERN_HALF),
+    ]:
+        points = point_iterator.next_batch(50)
+        assert shapely.contains_xy(WESTERN_HALF, points[:, 0], points[:, 1]).all()
+        for triangle_id, priority in point_iterator.priorities.items():
+            is_outside = point_iterator.points[list(point_iterator.triangles[triangle_id]), 0].min() > 0.6
+            assert (priority == 0) == is_outside
+
+
+def test_snapping_to_concave_service_area_for_triangular_point_iterator():
+    """Test if the center of a triangle which is outside the service area (but the triangle is not) is snapped into
+    the part of the triangle within the service area and if triangles outside the service area are skipped"""
+    triangle = np.array([[0, 0], [1, 0], [0.5, 1]])
+    service_area = shapely.box(0, 0, 1, 1).difference(shapely.box(0.2, 0.1, 0.8, 0.6))  # the center is in the hole
+    point = next(TriangularPointIterator(triangle, service_area))
+    assert shapely.contains_xy(service_area, *point)
+    assert shapely.contains_xy(shapely.Polygon(triangle), *point)
+    assert not TriangularPointIterator(triangle, shapely.box(2, 2, 3, 3)).next_batch(3).size
+    with pytest.raises(StopIteration):
+        next(TriangularPointIterator(triangle, shapely.box(2, 2, 3, 3)))
+
+
+# Test on DeadZoneIndex
+
+
+def test_negative_radius_for_dead_zone_index():
+    """Test if the dead zone index raises an error if the radius is negative"""
+    with pytest.raises(ValueError):
+        DeadZoneIndex(-0.1)
+
+
+def test_dead_zone_index():
+    """Test if points are within a dead zone if an invalid destination is within the radius
+    and if the index is updated once further invalid destinations are added"""
+    dead_zones = DeadZoneIndex(0.15)
+    points = np.array([[0, 0], [0.05, 0.05], [1, 1], [1.2, 1]])
+    assert not dead_zones.contains(points).any()
+    dead_zones.add(np.array([[0, 0]]))
+    np.testing.assert_array_equal(dead_zones.contains(points), [True, True, False, False])
+    dead_zones.add([(1.1, 1.0)])
+    assert len(dead_zones) == 2
+    np.testing.assert_array_equal(dead_zones.contains(points), [True, True, True, True])
+    assert dead_zones.contains(np.empty((0, 2))).shape == (0,)
+
+
+def test_dead_zones_for_triangular_point_iterator():
+    """Test if the triangles whose center is within a dead zone get no priority,
+    i.e. the points are sampled outside the dead zones first"""
+    initial_points = np.random.default_rng(4).random((50, 2))
+    dead_zones = DeadZoneIndex(0.3)
+    dead_zones.add([(1.0, 1.0)])
+    for point_iterator in [
+        TriangularPointIterator(initial_points, dead_zones=dead_zones),
+        ErrorDrivenPointIterator(initial_points, initial_points[:, 0] * 60, dead_zones=dead_zones),
+    ]:
+        points = point_iterator.next_batch(50)
+        assert not dead_zones.contains(points).any()
+
+
+def test_disabled_dead_zone_index():
+    """Test if no point is within a dead zone if the radius is zero"""
+    dead_zones = DeadZoneIndex(0)
+    dead_zones.add(np.array([[0, 0]]))
+    assert not dead_zones.contains(np.array([[0, 0]])).any()
+
+
+def test_dead_zone_index_scales_longitudes():
+    """Test if the dead zones are circular on the ground, i.e. a degree of longitude counts as much as
+    the cosine of the latitude times a degree of latitude"""
+    dead_zones = DeadZoneIndex(0.002)
+    dead_zones.add([(13.4, 60.0)])  # a degree of longitude is half a degree of latitude here
+    points = np.array([[13.4035, 60.0], [13.4045, 60.0], [13.4, 60.0015], [13.4, 60.0025]])
+    np.testing.assert_array_equal(dead_zones.contains(points), [True, False, True, False])
@@ -1,15 +1,37 @@
 """Tests related to the requesters."""
 import asyncio
+import contextlib
 import datetime
+import json
 import random
+import zipfile
 
 import numpy as np
 import pytest
 
 from oeffikator.requesters.bvg_rest_requester import BVGRestRequester
+from oeffikator.requesters.circuit_breaker import (
+    CircuitBreaker,
+    CircuitState,
+    RequesterResponseError,
+    RequesterUnavailableError,
+)
+from oeffikator.requesters.concurrency_limiter import ConcurrencyLimiter
 from oeffikator.requesters.oeffi_requester import OeffiRequester
+from oeffikator.requesters.raptor_requester import RaptorRequester, read_gtfs_stop_times
+from oeffikator.requesters.rate_limiter import TokenBucket
+from oeffikator.requesters.requester_statistics import RequesterStatistics
+from oeffikator.requests import parse_reachable_stops, query_journeys_with_failover
 from tests import TRAVELLING_DAYTIME
-from tests.requesters_commons import is_alive
+from tests.requesters_commons import (
+    GTFS_STOPS,
+    FakeClock,
+    FakeResponse,
+    get_session_responding_with,
+    is_alive,
+    wait_until,
+    write_gtfs_feed,
+)
 
 BVG_V5_URL = "https://v5.bvg.transport.rest"
 BVG_V6_URL = "https://v6.bvg.transport.rest"
@@ -87,25 +109,64 @@ def test_get_journey_for_bvg_requester():
     assert time_is in time_should_be
 
 
+def test_get_reachable_stops_for_bvg_requester():
+    """Tests if the bvg rest requester gets the stops reachable from S+U Alexanderplatz Bhf (Berlin) properly"""
+    if URL is None:
+        pytest.skip("No Requester is alive")
+    max_duration = 10
+
+    requester = BVGRestRequester(URL)
+    origin = asyncio.run(requester.query_location("10178 Berlin-Mitte, Alexanderplatz 1"))
+    stops = asyncio.run(requester.get_reachable_stops(origin, max_duration, TRAVELLING_DAYTIME))
+
+    assert requester.supports_reachable_stops
+    assert len(stops) > 1
+    assert all(0 <= stop["duration"] <= max_duration for stop in stops)
+    assert all({"longitude", "latitude", "name", "duration"} <= stop.keys() for stop in stops)
+
+
 def test_catch_wrong_requests_for_wrong_journey_for_bvg_requester():
-    """Tests if the bvg rest requester catches wrong get_journey request"""
+    """Tests if the bvg rest requester raises for wrong get_journey requests (instead of returning no journey)"""
     if URL is None:
         pytest.skip("No Requester is alive")
     origin = {"address": "", "latitude": -1, "longitude": -1}
     destination = {"address": "", "latitude": -1, "longitude": -1}
-    excepted_response = {
-        "arrivalTime": None,
-        "stopovers": None,
-        "origin": {"longitude": origin["longitude"], "latitude": origin["latitude"]},
-        "destination": {"longitude": destination["longitude"], "latitude": destination["latitude"]},
-        "noConnectionFound": False,
-        "noStationFoundNearby": False,
-    }
     requester = BVGRestRequester(URL)
-    response = asyncio.run(
-        requester.get_journey(origin=origin, destination=destination, start_date=datetime.datetime.today())
-    )
-    assert response == excepted_response
+    with pytest.raises(RequesterUnavailableError):
+        asyncio.run(requester.get_journey(origin=origin, destination=destination, start_date=datetime.datetime.today()))
+
+
+@pytest.mark.parametrize(
+    "status, body, has_found_no_connection, has_no_station_nearby",
+    [
+        (200, '{"journeys": []}', True, False),
+        (404, '{"msg": "No connection found."}', True, False),
+        (400, '{"msg": "no stations found close to the address"}', False, True),
+    ],
+)
+def test_bvg_requester_returns_no_journey_without_connection(
+    status, body, has_found_no_connection, has_no_station_nearby
+):
+    """Tests if the bvg rest requester returns no journey if the api responds that there is no connection"""
+    requester = BVGRestRequester("http://127.0.0.1:1")
+    requester._get_session = get_session_responding_with(FakeResponse(status, body))  # pylint: disable=W0212
+    location = {"address": "", "latitude": 52.52, "longitude": 13.41}
+    journey = asyncio.run(requester.get_journey(location, location, TRAVELLING_DAYTIME))
+    assert journey["arrivalTime"] is None
+    assert journey["noConnectionFound"] == has_found_no_connection
+    assert journey["noStationFoundNearby"] == has_no_station_nearby
+
+
+@pytest.mark.parametrize(
+    "status, body", [(200, '{"error": true}'), (200, "[]"), (400, '{"msg": "invalid request"}'), (404, "<html/>")]
+)
+def test_bvg_requester_raises_for_responses_without_journey(status, body):
+    """Tests if the bvg rest requester raises for responses which are neither journeys nor say that there is none"""
+    requester = BVGRestRequester("http://127.0.0.1:1")
+    requester._get_session = get_session_responding_with(FakeResponse(status, body))  # pylint: disable=W0212
+    location = {"address": "", "latitude": 52.52, "longitude": 13.41}
+    with pytest.raises(RequesterUnavailableError):
+        asyncio.run(requester.get_journey(location, location, TRAVELLING_DAYTIME))
 
 
 # Oeffi requester
@@ -123,6 +184,164 @@ def test_for_none_auth_key_for_oeffi_requester():
         OeffiRequester(authkey)
 
 
+def test_oeffi_requester_batches_service_requests():
+    """Check if the journeys to several destinations are queried with two batched calls
+    and if the lid of the origin is cached for further journeys."""
+    requester = OeffiRequester("authkey")
+    bodies = []
+
+    async def post(url: str, data: str, headers: dict[str, str]) -> dict:  # pylint: disable=W0613
+        body = json.loads(data)
+        bodies.append(body)
+        results = [{"meth": "ServerInfo", "err": "OK", "res": {}}]
+        for index, service_request in enumerate(body["svcReqL"][1:]):
+            if service_request["meth"] == "LocGeoPos":
+                results.append({"err": "OK", "res": {"locL": [{"lid": f"L{index}", "extId": str(index), "type": "S"}]}})
+            else:
+                arrival_time = f"12{service_request['req']['arrLocL'][0]['extId']:0>2}00"
+                results.append({"err": "OK", "res": {"outConL": [{"arr": {"aTimeS": arrival_time}}]}})
+        return {"svcResL": results}
+
+    requester.post = post
+    origin = {"longitude": 13.41, "latitude": 52.52}
+    destinations = [{"longitude": 13.4 + index / 100, "latitude": 52.5} for index in range(3)]
+
+    journeys = asyncio.run(requester.get_journeys(origin, destinations, TRAVELLING_DAYTIME))
+    assert [journey["arrivalTime"] for journey in journeys] == ["120100", "120200", "120300"]
+    assert len(bodies) == 2
+    assert [service_request["meth"] for service_request in bodies[0]["svcReqL"][1:]] == ["LocGeoPos"] * 4
+    assert [service_request["meth"] for service_request in bodies[1]["svcReqL"][1:]] == ["TripSearch"] * 3
+
+    journey = asyncio.run(requester.get_journey(origin, destinations[0], TRAVELLING_DAYTIME))
+    assert journey["arrivalTime"] == "120000"  # the origin is cached, thus the destination is the first location
+    assert len(bodies) == 4
+    assert len(bodies[2]["svcReqL"][1:]) == 1
+
+
+def test_reachable_stops_are_not_supported_by_oeffi_requester():
+    """Check if requesters without support for reachable stops say so (and raise if asked anyway)."""
+    requester = OeffiRequester("authkey")
+    origin = {"address": "", "latitude": 52.52, "longitude": 13.41}
+
+    assert not requester.supports_reachable_stops
+    with pytest.raises(NotImplementedError):
+        asyncio.run(requester.get_reachable_stops(origin, 10, TRAVELLING_DAYTIME))
+
+
+# RAPTOR requester
+def get_stop_location(stop_id: str) -> dict:
+    """Get the location of a stop of the synthetic GTFS feed as the requesters expect it"""
+    _, longitude, latitude = GTFS_STOPS[stop_id]
+    return {"longitude": longitude, "latitude": latitude}
+
+
+def test_get_journey_for_raptor_requester(tmp_path):
+    """Tests if the raptor requester routes with transfers (at the same stop and with a short walk)"""
+    requester = RaptorRequester(write_gtfs_feed(tmp_path))
+
+    journey_to_d = asyncio.run(
+        requester.get_journey(get_stop_location("A"), get_stop_location("D"), TRAVELLING_DAYTIME)
+    )
+    journey_to_e = asyncio.run(
+        requester.get_journey(get_stop_location("A"), get_stop_location("E"), TRAVELLING_DAYTIME)
+    )
+
+    assert journey_to_d["duration"] == 16  # line 4 does not operate, thus line 2 is caught at 12:12
+    assert journey_to_d["arrivalTime"] == "121600"
+    assert journey_to_e["duration"] == 15  # line 3 is caught after walking from B to B2
+
+
+def test_raptor_requester_waits_for_next_trip(tmp_path):
+    """Tests if the raptor requester takes the next trip if the first one is missed"""
+    requester = RaptorRequester(write_gtfs_feed(tmp_path))
+    start_date = TRAVELLING_DAYTIME.replace(minute=1)
+
+    journey = asyncio.run(requester.get_journey(get_stop_location("A"), get_stop_location("D"), start_date))
+
+    assert journey["duration"] == 23
+
+
+def test_raptor_requester_walks_or_finds_no_station(tmp_path):
+    """Tests if the raptor requester walks to close destinations and reports destinations without stops nearby
+    (but not destinations which are unreachable, since the origin has no stops nearby)"""
+    requester = RaptorRequester(write_gtfs_feed(tmp_path))
+    close_destination = {"longitude": 13.401, "latitude": 52.5}
+    far_destination = {"longitude": 13.0, "latitude": 52.0}
+
+    walk = asyncio.run(requester.get_journey(get_stop_location("A"), close_destination, TRAVELLING_DAYTIME))
+    no_journey = asyncio.run(requester.get_journey(get_stop_location("A"), far_destination, TRAVELLING_DAYTIME))
+    no_journey_back = asyncio.run(requester.get_journey(far_destination, get_stop_location("A"), TRAVELLING_DAYTIME))
+
+    assert walk["duration"] == 1
+    assert no_journey["arrivalTime"] is None
+    assert no_journey["noStationFoundNearby"]
+    # the station missing close to the origin is no property of the destination
+    assert no_journey_back["noConnectionFound"] and not no_journey_back["noStationFoundNearby"]
+
+
+def test_get_reachable_stops_for_raptor_requester(tmp_path):
+    """Tests if the raptor requester gets all stops reachable within the maximum duration with a single run"""
+    requester = RaptorRequester(write_gtfs_feed(tmp_path))
+
+    stops = asyncio.run(requester.get_reachable_stops(get_stop_location("A"), 10, TRAVELLING_DAYTIME))
+    durations = {stop["name"]: stop["duration"] for stop in stops}
+
+    assert durations == {"Stop A": 0, "Stop B": 5, "Stop B2": 6, "Stop C": 10}
+    assert requester.statistics.number_of_requests == 1
+
+
+def test_read_gtfs_stop_times_from_zip_file(tmp_path):
+    """Tests if the stop times are read into a compact array (also from a zipped feed),
+    skipping unknown trips and stops and taking the departure if the arrival is missing"""
+    feed_path = tmp_path / "feed.zip"
+    with zipfile.ZipFile(feed_path, "w") as feed:
+        feed.writestr(
+            "stop_times.txt",
+            "trip_id,arrival_time,departure_time,stop_id,stop_sequence\n"
+            "T1,,12:00:00,A,1\nT1,12:05:00,12:06:00,B,2\nT1,12:07:00,12:07:00,X,3\nT2,25:00:00,25:00:00,A,1\n",
+        )
+
+    stop_times = read_gtfs_stop_times(str(feed_path), {"T1": 0}, {"A": 0, "B": 1})
+
+    assert stop_times.dtype == np.int64
+    np.testing.assert_array_equal(stop_times, [[0, 0, 1, 43200, 43200], [0, 1, 2, 43500, 43560]])
+    assert read_gtfs_stop_times(str(tmp_path), {"T1": 0}, {"A": 0}).shape == (0, 5)  # no stop times
+
+
+def test_malformed_reachable_stops_are_skipped():
+    """Tests if malformed reachable stops (of any requester) are skipped instead of failing the seeding of an origin"""
+    reachable_stops = [
+        {"longitude": 13.4, "latitude": 52.5, "name": "Stop A", "duration": 5},
+        {"longitude": 13.4, "latitude": 52.5, "name": "no duration"},
+        {"longitude": "east", "latitude": 52.5, "duration": 3},
+        "not a stop",
+        {"longitude": 13.4, "latitude": 52.5, "duration": -1},
+    ]
+    assert [stop.name for stop in parse_reachable_stops(reachable_stops)] == ["Stop A"]
+    with pytest.raises(ValueError):
+        parse_reachable_stops({"stops": reachable_stops})
+
+
+def test_raptor_requester_routes_once_for_several_journeys(tmp_path):
+    """Tests if the raptor requester answers journeys to several destinations with a single routing run"""
+    requester = RaptorRequester(write_gtfs_feed(tmp_path))
+    destinations = [get_stop_location("D"), get_stop_location("E")]
+
+    journeys = asyncio.run(requester.get_journeys(get_stop_location("A"), destinations, TRAVELLING_DAYTIME))
+
+    assert [journey["duration"] for journey in journeys] == [16, 15]
+    assert requester.statistics.number_of_requests == 1
+
+
+def test_raptor_requester_does_not_geocode(tmp_path):
+    """Tests if the raptor requester says that it is not able to geocode (and raises if asked anyway)"""
+    requester = RaptorRequester(write_gtfs_feed(tmp_path))
+
+    assert not requester.supports_geocoding
+    with pytest.raises(NotImplementedError):
+        asyncio.run(requester.query_location("Brandenburger Tor"))
+
+
 # requester interface check
 def test_has_reached_limit_for_requester_interface():
     """Tests if the bvg rest requester queries the location properly"""
@@ -131,17 +350,282 @@ def test_has_reached_limit_for_requester_interface():
     requester = BVGRestRequester(URL)
     assert not requester.has_reached_request_limit()
     _ = asyncio.run(requester.query_location("Brandenburger Tor"))
-    requester.request_rate = 0
+    requester.rate_limiter.rate = 0
     assert requester.has_reached_request_limit()
 
 
-def test_if_requests_are_poped_after_timeout():
-    """Tests if the bvg rest requester queries the location properly"""
+def test_if_tokens_are_refilled_after_period():
+    """Tests if the token bucket regains its capacity after one period"""
+    clock = FakeClock()
+    bucket = TokenBucket(1, period=60, clock=clock)
+    assert bucket.try_acquire()
+    clock.advance(59)
+    assert not bucket.has_capacity()
+    clock.advance(1)
+    assert bucket.has_capacity()
+
+
+def test_token_bucket_waits_for_free_slot():
+    """Tests if the token bucket lets callers wait (asynchronously) for a free slot instead of failing"""
+    clock = FakeClock()
+    bucket = TokenBucket(2, period=60, clock=clock, sleep=clock.sleep)
+
+    async def acquire_three_times() -> None:
+        for _ in range(3):
+            await bucket.acquire()
+
+    asyncio.run(acquire_three_times())
+    assert clock.sleeps == [pytest.approx(30)]  # the third request waits for the next token
+    assert bucket.get_waiting_time() == pytest.approx(30)
+
+
+def test_token_bucket_without_rate_raises():
+    """Tests if the token bucket raises instead of waiting forever if no requests are tolerated"""
+    bucket = TokenBucket(0)
+    with pytest.raises(ValueError):
+        asyncio.run(bucket.acquire())
+
+
+def test_pooled_session_is_reused_for_requests():
+    """Tests if the requester keeps using its pooled session once opened and closes it properly"""
     if URL is None:
         pytest.skip("No Requester is alive")
-    requester = BVGRestRequester(URL)
-    _ = asyncio.run(requester.query_location("Brandenburger Tor"))
-    requester.request_rate = 0
-    assert requester.has_reached_request_limit()
-    requester.past_requests[0]["time"] = datetime.datetime.now() - datetime.timedelta(seconds=61)
-    assert not requester.has_reached_request_limit()
+
+    async def query_twice() -> tuple:
+        requester = BVGRestRequester(URL)
+        await requester.open_session()
+        session = requester._session  # pylint: disable=W0212
+        await requester.query_location("Brandenburger Tor")
+        await requester.query_location("Alexanderplatz")
+        is_same_session = session is requester._session and not session.closed  # pylint: disable=W0212
+        await requester.close_session()
+        return is_same_session, session.closed
+
+    is_same_session, is_closed = asyncio.run(query_twice())
+    assert is_same_session
+    assert is_closed
+
+
+def test_statistics_track_latency_and_errors():
+    """Tests if the requester statistics keep track of requests in flight, latency and errors"""
+    statistics = RequesterStatistics(smoothing_factor=0.5)
+    start_time = statistics.start_request()
+    assert statistics.in_flight == 1
+    statistics.finish_request(start_time - 3, has_failed=False)
+    assert statistics.in_flight == 0
+    assert statistics.average_latency > 1.5
+    statistics.finish_request(statistics.start_request(), has_failed=True)
+    assert statistics.error_rate == 0.5
+    assert statistics.number_of_requests == 2 and statistics.number_of_errors == 1
+
+
+def test_routing_weight_prefers_healthy_and_idle_requesters():
+    """Tests if the routing weight prefers requesters with less requests in flight, errors and used budget"""
+    requester = BVGRestRequester("http://127.0.0.1:1")
+    busy_requester = BVGRestRequester("http://127.0.0.1:2")
+    busy_requester.statistics.in_flight = 3
+    assert requester.get_routing_weight() > busy_requester.get_routing_weight()
+
+    failing_requester = BVGRestRequester("http://127.0.0.1:3")
+    failing_requester.statistics.error_rate = 0.9
+    assert requester.get_routing_weight() > failing_requester.get_routing_weight()
+
+    exhausted_requester = BVGRestRequester("http://127.0.0.1:4")
+    exhausted_requester.rate_limiter.rate = 0
+    assert exhausted_requester.get_routing_weight() == 0
+
+
+def test_circuit_breaker_opens_after_consecutive_failures():
+    """Tests if the circuit breaker opens after the failure threshold and lets a single probe pass after recovery"""
+    clock = FakeClock()
+    circuit_breaker = CircuitBreaker(failure_threshold=2, recovery_time=60, clock=clock)
+    circuit_breaker.record_failure()
+    assert circuit_breaker.allow_request()
+    circuit_breaker.record_failure()
+    assert circuit_breaker.state == CircuitState.OPEN
+    assert not circuit_breaker.allow_request()
+
+    clock.advance(59)
+    assert circuit_breaker.state == CircuitState.OPEN
+    clock.advance(1)
+    assert circuit_breaker.state == CircuitState.HALF_OPEN
+    assert circuit_breaker.allow_request()
+    assert not circuit_breaker.allow_request()  # only a single probe
+    circuit_breaker.record_success()
+    assert circuit_breaker.state == CircuitState.CLOSED
+
+
+def test_circuit_breaker_reopens_after_failed_probe():
+    """Tests if the circuit breaker opens again if the probe request fails"""
+    circuit_breaker = CircuitBreaker(failure_threshold=1, recovery_time=0)
+    circuit_breaker.record_failure()
+    assert circuit_breaker.allow_request()  # half-open since recovery time is 0
+    circuit_breaker.recovery_time = 60
+    circuit_breaker.record_failure()
+    assert circuit_breaker.state == CircuitState.OPEN
+
+
+def test_cancelled_probe_is_released():
+    """Tests if a probe request which is cancelled (while waiting for the concurrency window or while being sent)
+    does not block the half-open circuit breaker"""
+    requester = BVGRestRequester("http://127.0.0.1:1")
+    requester.circuit_breaker = CircuitBreaker(failure_threshold=1, recovery_time=0)
+    requester.circuit_breaker.record_failure()
+    requester.concurrency_limiter = ConcurrencyLimiter(initial_window=1, max_window=1)
+
+    @contextlib.asynccontextmanager
+    async def get_hanging_session():
+        is_sending.set()
+        await asyncio.Event().wait()  # the api never responds, the request hangs until it is cancelled
+        yield None
+
+    requester._get_session = get_hanging_session  # pylint: disable=W0212
+    is_sending = asyncio.Event()
+
+    async def cancel_probes() -> list[bool]:
+        availabilities = []
+        blocking_start_time = await requester.concurrency_limiter.acquire()  # the probe waits for the window
+        probe = asyncio.ensure_future(requester.query_location("Brandenburger Tor"))
+        await wait_until(lambda: requester.concurrency_limiter.as_dict()["queue_depth"] == 1)
+        availabilities.append(requester.is_responding())
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+        availabilities.append(requester.is_responding())
+        await requester.concurrency_limiter.release(blocking_start_time, has_failed=False, is_overloaded=False)
+
+        probe = asyncio.ensure_future(requester.query_location("Brandenburger Tor"))  # the probe is being sent
+        await is_sending.wait()
+        availabilities.append(requester.is_responding())
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+        return availabilities + [requester.is_responding()]
+
+    assert asyncio.run(cancel_probes()) == [False, True, False, True]
+    assert requester.circuit_breaker.state == CircuitState.HALF_OPEN
+
+
+@pytest.mark.parametrize("status", [503, 429])
+def test_overload_statuses_are_checked_before_parsing(monkeypatch, status):
+    """Tests if 429 and 5xx responses (e.g. with an html error page) count as overload of the api"""
+    monkeypatch.setattr("oeffikator.requesters.requester_interface.MAX_ATTEMPTS", 1)
+    requester = BVGRestRequester("http://127.0.0.1:1")
+    requester.concurrency_limiter = ConcurrencyLimiter(initial_window=4)
+    response = FakeResponse(status, "<html>Error</html>")
+    requester._get_session = get_session_responding_with(response)  # pylint: disable=W0212
+    with pytest.raises(RequesterUnavailableError) as error:
+        asyncio.run(requester.query_location("Brandenburger Tor"))
+    assert isinstance(error.value.__cause__, RequesterUnavailableError)
+    assert requester.statistics.number_of_errors == 1
+    assert requester.concurrency_limiter.window < 4
+
+
+@pytest.mark.parametrize(
+    "body, content", [("<html>Not found</html>", None), ('{"msg": "Not found"}', {"msg": "Not found"})]
+)
+def test_client_error_statuses_are_failures_without_retry(body, content):
+    """Tests if other error statuses fail at once (without counting as overload) and keep the body of the response"""
+    requester = BVGRestRequester("http://127.0.0.1:1")
+    requester.concurrency_limiter = ConcurrencyLimiter(initial_window=4)
+    requester._get_session = get_session_responding_with(FakeResponse(404, body))  # pylint: disable=W0212
+    with pytest.raises(RequesterResponseError) as error:
+        asyncio.run(requester.query_location("Brandenburger Tor"))
+    assert error.value.status == 404
+    assert error.value.content == content
+    assert requester.statistics.number_of_requests == requester.statistics.number_of_errors == 1
+    assert requester.concurrency_limiter.window == 4
+
+
+def test_concurrency_limiter_increases_additively_and_decreases_multiplicatively():
+    """Tests if the concurrency window grows with fast successful requests and halves once per overload burst"""
+    limiter = ConcurrencyLimiter(initial_window=4, max_window=8)
+
+    async def send_requests(number_of_requests: int, is_overloaded: bool) -> None:
+        start_times = [await limiter.acquire() for _ in range(number_of_requests)]
+        for start_time in start_times:
+            await limiter.release(start_time, has_failed=is_overloaded, is_overloaded=is_overloaded)
+
+    asyncio.run(send_requests(4, is_overloaded=False))
+    assert 4.9 < limiter.window < 5.1  # one request more per window of successful requests
+
+    asyncio.run(send_requests(4, is_overloaded=True))
+    assert 2.4 < limiter.window < 2.6  # the requests failed in the same burst, thus the window halves once
+
+    asyncio.run(send_requests(2, is_overloaded=True))
+    asyncio.run(send_requests(1, is_overloaded=True))
+    assert limiter.window == 1  # never below the minimum window
+
+
+def test_concurrency_limiter_queues_requests_beyond_window():
+    """Tests if requests beyond the window wait for a free slot and show up in the queue depth"""
+    limiter = ConcurrencyLimiter(initial_window=1, max_window=1)
+
+    async def send_requests() -> list[dict]:
+        start_time = await limiter.acquire()
+        waiting_request = asyncio.ensure_future(limiter.acquire())
+        await wait_until(lambda: limiter.as_dict()["queue_depth"] == 1)
+        states = [limiter.as_dict()]
+        await limiter.release(start_time, has_failed=False, is_overloaded=False)
+        await limiter.release(await waiting_request, has_failed=False, is_overloaded=False)
+        return states + [limiter.as_dict()]
+
+    waiting_state, final_state = asyncio.run(send_requests())
+    assert waiting_state == {"concurrency_window": 1, "concurrency_in_use": 1, "queue_depth": 1}
+    assert final_state == {"concurrency_window": 1, "concurrency_in_use": 0, "queue_depth": 0}
+
+
+def test_get_journeys_reports_failures_per_journey():
+    """Tests if the default bulk query of journeys returns the error of a single failing journey
+    instead of failing all of them"""
+    requester = BVGRestRequester("http://127.0.0.1:1")  # nothing should listen here, the journeys are not sent
+
+    async def get_journey(origin: dict, destination: dict, start_date: datetime, amount_of_results: int = 1) -> dict:
+        del origin, start_date, amount_of_results
+        if destination["longitude"] < 0:
+            raise RequesterUnavailableError("upstream failed")
+        return {"arrivalTime": "121400", "destination": destination}
+
+    requester.get_journey = get_journey
+    destinations = [{"longitude": 13.4, "latitude": 52.5}, {"longitude": -1, "latitude": -1}]
+    journeys = asyncio.run(requester.get_journeys({"longitude": 13.41, "latitude": 52.52}, destinations, None))
+
+    assert journeys[0] == {"arrivalTime": "121400", "destination": destinations[0]}
+    assert isinstance(journeys[1], RequesterUnavailableError)
+
+
+def test_bulk_journeys_fail_over_to_next_requester(monkeypatch):
+    """Tests if the journeys of a bulk query which failed because of an unavailable requester
+    are retried with the next requester"""
+    failing_requester = BVGRestRequester("http://127.0.0.1:1")  # nothing should listen here
+    healthy_requester = BVGRestRequester("http://127.0.0.1:2")
+    failing_requester.get_routing_weight = lambda: 1.0
+    healthy_requester.get_routing_weight = lambda: 0.0
+
+    async def fail_journey(origin: dict, destination: dict, start_date: datetime, amount_of_results: int = 1) -> dict:
+        del origin, destination, start_date, amount_of_results
+        raise RequesterUnavailableError("upstream failed")
+
+    async def get_journey(origin: dict, destination: dict, start_date: datetime, amount_of_results: int = 1) -> dict:
+        del origin, start_date, amount_of_results
+        return {"arrivalTime": "121400", "destination": destination}
+
+    failing_requester.get_journey = fail_journey
+    healthy_requester.get_journey = get_journey
+    monkeypatch.setattr("oeffikator.requests.REQUESTERS", [failing_requester, healthy_requester])
+    destinations = [{"longitude": 13.4, "latitude": 52.5}, {"longitude": 13.3, "latitude": 52.4}]
+    journeys = asyncio.run(query_journeys_with_failover({"longitude": 13.41, "latitude": 52.52}, destinations, None))
+    assert journeys == [{"arrivalTime": "121400", "destination": destination} for destination in destinations]
+
+    monkeypatch.setattr("oeffikator.requests.REQUESTERS", [failing_requester])
+    with pytest.raises(RequesterUnavailableError):
+        asyncio.run(query_journeys_with_failover({"longitude": 13.41, "latitude": 52.52}, destinations, None))
+
+
+def test_unresponsive_requester_fails_fast():
+    """Tests if requests to an unresponsive requester raise a proper error and open its circuit breaker"""
+    requester = BVGRestRequester("http://127.0.0.1:1")  # nothing should listen here
+    requester.circuit_breaker = CircuitBreaker(failure_threshold=1)
+    with pytest.raises(RequesterUnavailableError):
+        asyncio.run(requester.query_location("Brandenburger Tor"))
+    assert requester.circuit_breaker.state == CircuitState.OPEN
+    assert not requester.is_responding()
+    assert requester.statistics.number_of_errors == 1
@@ -6,7 +6,6 @@ import matplotlib.colors as mcolors
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-from shapely import from_wkt
 
 COLOR_DICT = {
     "red": ((0.0, 0.0, 0.0), (0.5, 0.0, 0.0), (1.0, 1.0, 1.0)),
@@ -27,8 +26,8 @@ def get_heatmap(trip_response: dict) -> list[io.BytesIO, list[float, float], lis
     """
     trips = pd.DataFrame.from_dict(
         {
-            "lon": [from_wkt(trip["destination"]["geom"]).x for trip in trip_response],
-            "lat": [from_wkt(trip["destination"]["geom"]).y for trip in trip_response],
+            "lon": [trip["destination"]["lon"] for trip in trip_response],
+            "lat": [trip["destination"]["lat"] for trip in trip_response],
             "duration": [trip["duration"] for trip in trip_response],
         }
     )
@@ -1,7 +1,6 @@
 """Module to create the map with overlaying image."""
 import imageio.v3 as iio
 from folium import Map, Marker, raster_layers
-from shapely import from_wkt
 
 from visualization.heatmap import get_heatmap
 
@@ -25,12 +24,11 @@ def get_folium_map(trip_response: dict, slider_value: float) -> str:
         img = iio.imread(buf)
 
         origin = trip_response[0]["origin"]
-        origin_geom = from_wkt(origin["geom"])
-        origin_coordinates = [origin_geom.y, origin_geom.x]
+        origin_coordinates = [origin["lat"], origin["lon"]]
 
         # Create a map using Stamen Terrain, centered on study area with set zoom level
         map_object = Map(
-            location=[from_wkt(trip_response[0]["origin"]["geom"]).y, from_wkt(trip_response[0]["origin"]["geom"]).x],
+            location=origin_coordinates,
             min_lon=settings.max_west + 0.01,
             max_lon=settings.max_east - 0.01,
             min_lat=settings.max_south + 0.005,